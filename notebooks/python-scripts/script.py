@@ -1,7 +1,16 @@
+import os
+import sys
 from datetime import datetime
 
 import pandas as pd
 
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.comfort_rules import load_rules  # noqa: E402
+
 locations = pd.read_csv("locations.csv")
 weather = pd.read_csv("../data/merge/all_weather_data.csv")
 
@@ -26,16 +35,9 @@ df["timestamp"] = pd.to_datetime(df["time"])
 df["extracted_at"] = datetime.now()
 
 
-df["is_ideal_temp"] = df["temp_C"].between(22, 28)
-df["is_low_rain"] = df["rain_1d"] == 0
-df["is_low_wind"] = df["wind_speed"] < 5
-df["is_ideal_humidity"] = False
-df["comfort_score"] = (
-    df["is_ideal_temp"].astype(int) * 0.4
-    + df["is_low_rain"].astype(int) * 0.3
-    + df["is_low_wind"].astype(int) * 0.2
-)
-df["is_ideal_day"] = df["is_ideal_temp"] & df["is_low_rain"] & df["is_low_wind"]
+for column, values in load_rules().evaluate(df).items():
+    df[column] = values
+
 df["month"] = df["timestamp"].dt.month_name()
 df["year"] = df["timestamp"].dt.year
 df["day_of_week"] = df["timestamp"].dt.day_name()
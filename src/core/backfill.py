@@ -0,0 +1,116 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+
+from src.core.base import Process
+from src.core.transform import Transform
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def backfill_partition(input_dir, output_dir, date_str, single_file=False):
+    transform = Transform(batch=True, single_file=single_file)
+    transform.input_dir = Path(input_dir)
+    transform.output_dir = Path(output_dir)
+    transform.transform_partition(date_str)
+    return date_str
+
+
+class Backfill(Process):
+    def __init__(
+        self, start=None, end=None, max_workers=None, force=False, single_file=False
+    ):
+        base_dir = Path(__file__).resolve().parents[2]
+        self.input_dir = base_dir / "data" / "raw"
+        self.output_dir = base_dir / "data" / "processed"
+        self.start = _as_date(start)
+        self.end = _as_date(end)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.force = force
+        self.single_file = single_file
+
+    def dates(self):
+        if not Path(self.input_dir).exists():
+            return []
+
+        dates = []
+        for path in Path(self.input_dir).iterdir():
+            try:
+                day = datetime.strptime(path.name, "%Y-%m-%d").date()
+            except ValueError:
+                continue
+            if self.start is not None and day < self.start:
+                continue
+            if self.end is not None and day > self.end:
+                continue
+            if path.is_dir():
+                dates.append(path.name)
+        return sorted(dates)
+
+    def is_up_to_date(self, date_str):
+        inputs = list((Path(self.input_dir) / date_str).glob("*.csv"))
+        if not inputs:
+            return True
+
+        output_dir = Path(self.output_dir) / date_str
+        if self.single_file:
+            outputs = [output_dir / Transform.DAY_FILE_NAME]
+        else:
+            outputs = [output_dir / file.name for file in inputs]
+
+        newest_input = max(file.stat().st_mtime for file in inputs)
+        try:
+            return min(file.stat().st_mtime for file in outputs) >= newest_input
+        except FileNotFoundError:
+            return False
+
+    def apply(self):
+        dates = self.dates()
+        pending = [d for d in dates if self.force or not self.is_up_to_date(d)]
+        logger.info(
+            f"Backfilling {len(pending)} of {len(dates)} date(s) "
+            f"with {self.max_workers} worker(s)..."
+        )
+        if not pending:
+            return []
+
+        done = []
+        if self.max_workers == 1 or len(pending) == 1:
+            for date_str in pending:
+                try:
+                    done.append(self._backfill(date_str))
+                except Exception as e:
+                    logger.error(f"Failed to backfill {date_str}: {e}")
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(
+                        backfill_partition,
+                        self.input_dir,
+                        self.output_dir,
+                        date_str,
+                        self.single_file,
+                    )
+                    for date_str in pending
+                ]
+                for date_str, future in zip(pending, futures):
+                    try:
+                        done.append(future.result())
+                    except Exception as e:
+                        logger.error(f"Failed to backfill {date_str}: {e}")
+
+        logger.info(f"Backfill completed: {len(done)} date(s) transformed.")
+        return done
+
+    def _backfill(self, date_str):
+        return backfill_partition(
+            self.input_dir, self.output_dir, date_str, self.single_file
+        )
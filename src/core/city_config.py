@@ -3,23 +3,79 @@ from pathlib import Path
 
 from src.core.base import Process
 from src.utils.city_geo_coordinates.city_geocoder import CityGeocoder
+from src.utils.city_geo_coordinates.city_registry import CityRegistry
+from src.utils.city_geo_coordinates.gazetteer import Gazetteer
+from src.utils.city_geo_coordinates.geocode_cache import GeocodeCache
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
 class CityConfigurer(Process):
-    def __init__(self, cities_name):
+    def __init__(self, cities_name, use_cache=False, gazetteer_path=None):
         self.city_names = cities_name
+        self.use_cache = use_cache
+        self.gazetteer_path = gazetteer_path
 
-    def establish_cities_config(self, city_names, output_path=None):
-        geocoder = CityGeocoder()
-        cities_data = geocoder.geocode_cities(city_names)
+    def _load_gazetteer(self):
+        if self.gazetteer_path is None:
+            return None
+        if not Path(self.gazetteer_path).exists():
+            logger.warning(
+                f"Gazetteer {self.gazetteer_path} not found, using Nominatim only."
+            )
+            return None
+        return Gazetteer.from_tsv(self.gazetteer_path)
+
+    def _load_existing(self, output_path):
+        try:
+            return CityRegistry.from_json(output_path)
+        except FileNotFoundError:
+            return None
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cities config {output_path}: {e}")
+            return None
 
+    def establish_cities_config(self, city_names, output_path=None):
         base_dir = Path(__file__).resolve().parents[2]
         if output_path is None:
             output_path = base_dir / "config" / "cities.json"
 
+        registry = self._load_existing(output_path)
+        # A missing or unreadable config is always rewritten.
+        existing = None if registry is None else [c.to_dict() for c in registry]
+        # Cities are matched by normalized name or alias, so a spelling
+        # variant of a configured city is not geocoded again.
+        resolved = {}
+        for name in city_names:
+            city = None if registry is None else registry.get(name)
+            if city is not None and city.latitude is not None:
+                resolved[name] = {
+                    "name": name,
+                    "lat": city.latitude,
+                    "lon": city.longitude,
+                }
+        missing = [name for name in city_names if name not in resolved]
+
+        if missing:
+            cache = (
+                GeocodeCache(base_dir / "data" / "cache" / "geocode.sqlite")
+                if self.use_cache
+                else None
+            )
+            logger.info(f"Geocoding {len(missing)} new or unresolved cities...")
+            try:
+                geocoder = CityGeocoder(cache=cache, gazetteer=self._load_gazetteer())
+                resolved.update(zip(missing, geocoder.geocode_cities(missing)))
+            finally:
+                if cache is not None:
+                    cache.close()
+
+        cities_data = [resolved[name] for name in city_names]
+        if cities_data == existing:
+            logger.info(f"✅ Cities config already up to date at {output_path}")
+            return
+
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
         with open(output_path, "w") as f:
             json.dump(cities_data, f, indent=2)
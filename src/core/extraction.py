@@ -1,122 +1,267 @@
 import json
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
-from statistics import mean
 
-import pandas as pd
 import requests
 from airflow.models import Variable
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 from src.core.base import Process
+from src.utils.city_geo_coordinates.city_registry import CityRegistry
+from src.utils.coalesce import group_by_cell
+from src.utils.forecast import (
+    ForecastSkipped,
+    aggregate_daily_forecasts,
+    flatten_forecasts,
+    split_city_csv,
+)
 from src.utils.logger import get_logger
+from src.utils.openweather_schema import decode_forecast
+from src.utils.rate_limit import CircuitBreaker, TokenBucket
+from src.utils.raw_log import RawResponseLog
+from src.utils.response_cache import ResponseCache
+from src.utils.run_manifest import RunManifest
+from src.utils.weather_providers.hedged import HedgedProvider
+from src.utils.weather_providers.open_meteo import OpenMeteoProvider
+from src.utils.weather_providers.open_weather import OpenWeatherProvider
 
 logger = get_logger(__name__)
 load_dotenv()
 
 
 class Extract(Process):
-    BASE_URL = "https://api.openweathermap.org/data/2.5/forecast"
+    BASE_URL = OpenWeatherProvider.BASE_URL
+    DEFAULT_MAX_WORKERS = 8
+    DEFAULT_CALLS_PER_MINUTE = 60
+    DEFAULT_GRID_RESOLUTION = 0.1
+    MAX_RETRIES = OpenWeatherProvider.MAX_RETRIES
+    SAVE_BATCH_SIZE = 500
+    MANIFEST_NAME = "_manifest.json"
 
-    def __init__(self, cities_path=None):
+    def __init__(
+        self,
+        cities_path=None,
+        max_workers=1,
+        calls_per_minute=DEFAULT_CALLS_PER_MINUTE,
+        use_cache=False,
+        fast_decode=False,
+        forecast_horizon=False,
+        log_responses=False,
+        resume=False,
+        retry_failed_only=False,
+        hedged=False,
+        provider=None,
+        grid_resolution=None,
+    ):
         self.api_key = Variable.get("OPENWEATHER_API_KEY")
+        self.max_workers = max(1, int(max_workers))
+        self.fast_decode = fast_decode
+        self.forecast_horizon = forecast_horizon
+        self.resume = resume or retry_failed_only
+        self.retry_failed_only = retry_failed_only
+        self.grid_resolution = grid_resolution
+        self.rate_limiter = TokenBucket(calls_per_minute)
+        self.circuit_breaker = CircuitBreaker()
+
         self.session = requests.Session()
+        # One pool per provider host.
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.provider = provider or self._build_provider(hedged)
 
         base_dir = Path(__file__).resolve().parents[2]
         self.output_dir = base_dir / "data" / "raw"
+        self.forecast_dir = base_dir / "data" / "forecast"
+        self.raw_log = (
+            RawResponseLog(base_dir / "data" / "raw_log") if log_responses else None
+        )
+        self.cache = (
+            ResponseCache(base_dir / "data" / "cache" / "openweather")
+            if use_cache
+            else None
+        )
 
         if cities_path is None:
             cities_path = base_dir / "config" / "cities.json"
 
-        with open(cities_path, "r") as f:
-            self.cities = json.load(f)
+        self.cities = CityRegistry.from_json(cities_path)
 
         Path(self.output_dir).mkdir(parents=True, exist_ok=True)
 
-    def fetch_weather(self, lat, lon, units="metric"):
-        params = {"lat": lat, "lon": lon, "appid": self.api_key, "units": units}
-        response = self.session.get(self.BASE_URL, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+    def _build_provider(self, hedged):
+        primary = OpenWeatherProvider(
+            self.api_key, self.session, self.rate_limiter, self.circuit_breaker
+        )
+        if not hedged:
+            return primary
+        return HedgedProvider(
+            primary,
+            OpenMeteoProvider(self.session),
+            max_workers=2 * self.max_workers,
+        )
+
+    def fetch_weather(self, lat, lon, units="metric", city_names=()):
+        if self.cache is None and self.raw_log is None:
+            if self.fast_decode:
+                return self._decode(self.provider.fetch(lat, lon, units))
+            return self.provider.fetch_json(lat, lon, units)
+
+        key = self.cache.key(lat, lon, units) if self.cache is not None else None
+        content = self.cache.get(key) if key is not None else None
+        if content is None:
+            content = self.provider.fetch(lat, lon, units)
+            if key is not None:
+                self.cache.put(key, content)
+            if self.raw_log is not None:
+                try:
+                    self.raw_log.append(content, city_names, lat, lon, units)
+                except Exception as e:
+                    logger.error(f"Failed to log raw response for ({lat}, {lon}): {e}")
+        else:
+            logger.info(f"Using cached forecast for ({lat}, {lon}).")
+        return self._decode(content)
+
+    def _decode(self, content: bytes):
+        if self.fast_decode:
+            return decode_forecast(content)
+        return json.loads(content)
 
     def save(self, city_name: str, data: dict):
-        forecasts = data.get("list", [])
-        if not forecasts:
-            logger.warning(f"No forecast data for {city_name}. Skipping.")
-            return
+        self.save_many({city_name: data})
 
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        today_entries = [
-            f for f in forecasts if f.get("dt_txt", "").startswith(today_str)
-        ]
+    def save_many(self, payloads: dict) -> dict:
+        now = datetime.now()
+        if self.forecast_horizon:
+            self.save_horizon(payloads, now)
 
-        if not today_entries:
-            logger.warning(f"No 3-hour forecasts for today for {city_name}. Skipping.")
-            return
+        frame, errors = aggregate_daily_forecasts(payloads, now)
 
-        try:
+        outcomes = {}
+        for city_name, error in errors.items():
+            if isinstance(error, ForecastSkipped):
+                logger.warning(f"{error} for {city_name}. Skipping.")
+                outcomes[city_name] = (RunManifest.SKIPPED, error)
+            else:
+                logger.error(
+                    f"Failed to build/save forecast row for {city_name}: {error}"
+                )
+                outcomes[city_name] = (RunManifest.FAILED, error)
 
-            def safe_mean(values):
-                filtered = [v for v in values if v is not None]
-                return mean(filtered) if filtered else None
-
-            row = {
-                "city": city_name,
-                "timestamp": datetime.now(),
-                "sunrise": datetime.fromtimestamp(data["city"]["sunrise"]),
-                "sunset": datetime.fromtimestamp(data["city"]["sunset"]),
-                "temp_C": safe_mean([e["main"]["temp"] for e in today_entries]),
-                "temp_min_C": safe_mean([e["main"]["temp_min"] for e in today_entries]),
-                "temp_max_C": safe_mean([e["main"]["temp_max"] for e in today_entries]),
-                "feels_like_C": safe_mean(
-                    [e["main"]["feels_like"] for e in today_entries]
-                ),
-                "pressure": safe_mean([e["main"]["pressure"] for e in today_entries]),
-                "humidity": safe_mean([e["main"]["humidity"] for e in today_entries]),
-                "wind_speed": safe_mean([e["wind"]["speed"] for e in today_entries]),
-                "wind_deg": safe_mean([e["wind"]["deg"] for e in today_entries]),
-                "wind_gust": safe_mean([e["wind"].get("gust") for e in today_entries]),
-                "cloudiness": safe_mean([e["clouds"]["all"] for e in today_entries]),
-                "precipitation_prob": safe_mean(
-                    [e.get("pop", 0.0) for e in today_entries]
-                ),
-                "rain_1d": safe_mean(
-                    [e.get("rain", {}).get("3h", 0.0) for e in today_entries]
-                ),
-                "weather_main": Counter(
-                    [e["weather"][0]["main"] for e in today_entries if e.get("weather")]
-                ).most_common(1)[0][0],
-                "weather_description": Counter(
-                    [
-                        e["weather"][0]["description"]
-                        for e in today_entries
-                        if e.get("weather")
-                    ]
-                ).most_common(1)[0][0],
-                "summary": None,
-                "extracted_at": datetime.now(),
-            }
-
-            df = pd.DataFrame([row])
-            date_str = datetime.now().strftime("%Y-%m-%d")
-            final_output_dir = Path(self.output_dir) / date_str
+        if frame.empty:
+            return outcomes
+
+        final_output_dir = Path(self.output_dir) / now.strftime("%Y-%m-%d")
+        final_output_dir.mkdir(parents=True, exist_ok=True)
+
+        for city_name, document in split_city_csv(frame):
             file_path = final_output_dir / f"{city_name}.csv"
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            df.to_csv(file_path, index=False)
+            try:
+                file_path.write_text(document, encoding="utf-8")
+                logger.info(f"Saved aggregated forecast for {city_name} → {file_path}")
+                outcomes[city_name] = (RunManifest.DONE, None)
+            except Exception as e:
+                logger.error(f"Failed to build/save forecast row for {city_name}: {e}")
+                outcomes[city_name] = (RunManifest.FAILED, e)
+        return outcomes
+
+    def save_horizon(self, payloads: dict, issued_at: datetime):
+        frame, errors = flatten_forecasts(payloads, issued_at)
+        for city_name, error in errors.items():
+            logger.warning(f"Skipping forecast horizon for {city_name}: {error}")
+
+        if frame.empty:
+            return
 
-            logger.info(f"Saved aggregated forecast for {city_name} → {file_path}")
+        output_dir = Path(self.forecast_dir) / issued_at.strftime("%Y-%m-%d")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        file_path = output_dir / f"forecast_{issued_at.strftime('%H%M%S%f')}.csv.gz"
+        try:
+            frame.to_csv(file_path, index=False, compression="gzip")
+            logger.info(
+                f"Saved {len(frame)} forecast slots for "
+                f"{frame['city'].nunique()} cities → {file_path}"
+            )
+        except Exception as e:
+            logger.error(f"Failed to save forecast horizon to {file_path}: {e}")
+
+    def _fetch_cell(self, cell: dict):
+        names = cell["names"]
+        try:
+            logger.info(f"Fetching weather for {', '.join(map(str, names))}...")
+            if cell["lat"] is None or cell["lon"] is None:
+                raise ValueError("Missing coordinates")
+            data = self.fetch_weather(cell["lat"], cell["lon"], city_names=names)
+            return [(name, data, None) for name in names]
         except Exception as e:
-            logger.error(f"Failed to build/save forecast row for {city_name}: {e}")
+            logger.error(f"Failed to extract for {', '.join(map(str, names))}: {e}")
+            return [(name, None, e) for name in names]
+
+    def _save_in_batches(self, results, manifest=None):
+        batch, statuses = {}, {}
+        for name, data, error in results:
+            if error is not None:
+                statuses[name] = (RunManifest.FAILED, error)
+                continue
+            batch[name] = data
+            if len(batch) >= self.SAVE_BATCH_SIZE:
+                self._flush(batch, statuses, manifest)
+                batch, statuses = {}, {}
+        self._flush(batch, statuses, manifest)
+
+    def _flush(self, batch, statuses, manifest):
+        outcomes = self.save_many(batch) if batch else {}
+        if manifest is not None and (outcomes or statuses):
+            manifest.mark_many({**statuses, **outcomes})
+
+    def _iter_cities(self):
+        return (city.to_dict() for city in self.cities)
+
+    def _pending_cities(self, manifest, day_dir):
+        if self.retry_failed_only:
+            failed = set(manifest.failed())
+            return [city for city in self._iter_cities() if city["name"] in failed]
+
+        return [
+            city
+            for city in self._iter_cities()
+            if manifest.status(city["name"]) != RunManifest.DONE
+            or not (day_dir / f"{city['name']}.csv").exists()
+        ]
 
     def apply(self):
-        logger.info("Starting extraction process...")
-        for city in self.cities:
-            try:
-                name = city["name"]
-                logger.info(f"Fetching weather for {name}...")
-                data = self.fetch_weather(city["lat"], city["lon"])
-                self.save(name, data)
-            except Exception as e:
-                logger.error(f"Failed to extract for {city.get('name')}: {e}")
+        cities, manifest = self._iter_cities(), None
+        n_cities = len(self.cities)
+        if self.resume:
+            day_dir = Path(self.output_dir) / datetime.now().strftime("%Y-%m-%d")
+            manifest = RunManifest(day_dir / self.MANIFEST_NAME)
+            cities = self._pending_cities(manifest, day_dir)
+            n_cities = len(cities)
+            logger.info(
+                f"Resuming extraction: {len(self.cities) - n_cities} cities "
+                f"already done, {n_cities} left."
+            )
+
+        cells = group_by_cell(cities, self.grid_resolution)
+        logger.info(
+            f"Starting extraction process for {n_cities} cities in "
+            f"{len(cells)} request(s) with {self.max_workers} worker(s)..."
+        )
+        try:
+            if self.max_workers == 1:
+                results = chain.from_iterable(map(self._fetch_cell, cells))
+                self._save_in_batches(results, manifest)
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    results = chain.from_iterable(executor.map(self._fetch_cell, cells))
+                    self._save_in_batches(results, manifest)
+        finally:
+            self.provider.close()
+
+        if manifest is not None and manifest.failed():
+            logger.warning(
+                f"{len(manifest.failed())} cities failed: {', '.join(manifest.failed())}"
+            )
         logger.info("Extraction completed.")
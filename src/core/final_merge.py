@@ -1,8 +1,12 @@
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from src.core.base import Process
+from src.utils import external_sort, schema, storage
+from src.utils.external_sort import ExternalSort
+from src.utils.key_index import KEY_COLUMNS, KeyIndex, hash_rows, signature
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -15,27 +19,55 @@ class FinalMerge(Process):
         historical_path: str = None,
         new_data_path: str = None,
         output_path: str = None,
+        backend: str = "csv",
+        key_index: bool = False,
+        memory_budget: int = None,
+        full_rebuild: bool = False,
     ):
         base_dir = Path(__file__).resolve().parents[2]
+        # Segments only hold the history and the final dataset.
+        new_data_backend = (
+            storage.SegmentStorage.FORMAT if backend == "segments" else backend
+        )
 
         self.historical_path = (
             Path(historical_path)
             if historical_path
-            else base_dir / "data" / "historical" / "cleaned_historical_data.csv"
+            else storage.data_path(
+                base_dir / "data" / "historical" / "cleaned_historical_data", backend
+            )
         )
         self.new_data_path = (
             Path(new_data_path)
             if new_data_path
-            else base_dir / "data" / "merged" / "all_weather_data.csv"
+            else storage.data_path(
+                base_dir / "data" / "merged" / "all_weather_data", new_data_backend
+            )
         )
         self.output_path = (
             Path(output_path)
             if output_path
-            else base_dir / "data" / "merged" / "ready_data.csv"
+            else storage.data_path(base_dir / "data" / "merged" / "ready_data", backend)
         )
+        self.key_index = key_index
+        self.memory_budget = memory_budget
+        self.full_rebuild = full_rebuild
+        self._index = None
 
     def apply(self) -> pd.DataFrame:
         logger.info("🔄 FinalMerge: Starting merge process.")
+        if self._can_append():
+            rows = self._append_segments()
+            logger.info(
+                f"✅ FinalMerge: Merge completed. Appended {rows} new or changed rows."
+            )
+            return None
+        if self.memory_budget:
+            rows = self._merge_streaming()
+            logger.info(
+                f"✅ FinalMerge: Merge completed. Final dataset contains {rows} rows."
+            )
+            return None
         merged_df = self._merge()
         logger.info(
             f"✅ FinalMerge: Merge completed. Final dataset contains {len(merged_df)} rows."
@@ -43,51 +75,337 @@ class FinalMerge(Process):
         return merged_df
 
     def _merge(self) -> pd.DataFrame:
-        logger.info(f"📂 Reading historical data from: {self.historical_path}")
-        historical_df = pd.read_csv(
-            self.historical_path,
-            parse_dates=["timestamp", "sunrise", "sunset", "extracted_at"],
-        )
+        # A parquet history is seeded from the CSV one until its first commit.
+        historical_path = storage.resolve(self.historical_path)
+        logger.info(f"📂 Reading historical data from: {historical_path}")
+        historical_df = storage.get_storage(historical_path).read()
         logger.info(f"📊 Historical data loaded: {len(historical_df)} rows")
 
         logger.info(f"📂 Reading new extracted data from: {self.new_data_path}")
-        new_df = pd.read_csv(
-            self.new_data_path,
-            parse_dates=["timestamp", "sunrise", "sunset", "extracted_at"],
-        )
+        new_df = storage.get_storage(self.new_data_path).read()
         logger.info(f"📊 New data loaded: {len(new_df)} rows")
 
         if not historical_df.columns.equals(new_df.columns):
             logger.error("❌ Schema mismatch between historical and new data.")
             raise ValueError("Schema mismatch: columns do not align.")
 
-        logger.info(
-            "🔗 Concatenating datasets and removing duplicates based on ['city', 'timestamp']"
-        )
-        combined_df = pd.concat([historical_df, new_df], ignore_index=True)
-        before_dedup = len(combined_df)
-        combined_df.drop_duplicates(
-            subset=["city", "timestamp"], keep="last", inplace=True
-        )
-        after_dedup = len(combined_df)
-        logger.info(f"🧹 Removed {before_dedup - after_dedup} duplicate rows")
+        if self.key_index:
+            historical_part, new_part = self._merge_indexed(
+                historical_path, historical_df, new_df
+            )
+        else:
+            historical_part, new_part = historical_df, new_df
 
-        combined_df.sort_values(by=["city", "timestamp"], inplace=True)
+        if self._is_sorted(historical_path, historical_df) and self._is_sorted(
+            self.new_data_path, new_df
+        ):
+            logger.info(
+                "🔀 Both datasets are sorted by ['city', 'timestamp']: merging them in one pass"
+            )
+            combined_df = external_sort.merge_sorted(historical_part, new_part)
+        else:
+            logger.info(
+                "🔗 Concatenating datasets and removing duplicates based on ['city', 'timestamp']"
+            )
+            combined_df = schema.apply_schema(
+                pd.concat([historical_part, new_part], ignore_index=True)
+            )
+            combined_df.drop_duplicates(
+                subset=["city", "timestamp"], keep="last", inplace=True
+            )
+            combined_df.sort_values(by=["city", "timestamp"], inplace=True)
+        before_dedup = len(historical_part) + len(new_part)
+        logger.info(f"🧹 Removed {before_dedup - len(combined_df)} duplicate rows")
 
         if self.output_path == self.historical_path:
-            backup_path = self.historical_path.with_suffix(".bak.csv")
-            historical_df.to_csv(backup_path, index=False)
+            backup_path = self.historical_path.with_name(
+                f"{self.historical_path.stem}.bak{self.historical_path.suffix}"
+            )
+            storage.copy(historical_path, backup_path)
             logger.info(f"📦 Backed up historical file to: {backup_path}")
 
         logger.info(f"💾 Saving merged dataset to: {self.output_path}")
-        combined_df.to_csv(self.output_path, index=False)
+        self._output(historical_path).write(combined_df)
+        storage.mark_sorted(self.output_path, KEY_COLUMNS)
+        if self._index is not None:
+            self._index.save(self.output_path)
 
         return combined_df
 
+    def _is_sorted(self, path, df) -> bool:
+        # The sort order is recorded next to each input once it has been
+        # checked, and next to every output written sorted.
+        if storage.sorted_by(path) == KEY_COLUMNS:
+            return True
+        if not external_sort.is_sorted(df):
+            logger.info(f"🔀 {path} is not sorted by ['city', 'timestamp']")
+            return False
+        self._mark_sorted(path)
+        return True
+
+    @staticmethod
+    def _mark_sorted(path):
+        if storage.sorted_by(path) != KEY_COLUMNS:
+            storage.mark_sorted(path, KEY_COLUMNS)
+
+    def _merge_streaming(self) -> int:
+        # Both inputs are read in chunks and sorted through temporary runs:
+        # keeping the last row per key still lets new data supersede history.
+        historical_path = storage.resolve(self.historical_path)
+        historical = storage.get_storage(historical_path)
+        new = storage.get_storage(self.new_data_path)
+        columns = historical.columns()
+        if columns != new.columns():
+            logger.error("❌ Schema mismatch between historical and new data.")
+            raise ValueError("Schema mismatch: columns do not align.")
+
+        rows = external_sort.chunk_rows(self.memory_budget)
+        index = KeyIndex.load(historical_path, columns) if self.key_index else None
+        history_keys, history_values = [], []
+        historical_rows = new_rows = changed_rows = 0
+
+        with ExternalSort(
+            self.memory_budget, dedupe="keys", temp_dir=self.output_path.parent
+        ) as sorter:
+            logger.info(f"📂 Streaming historical data from: {historical_path}")
+
+            def historical_chunks():
+                nonlocal historical_rows
+                for chunk in historical.iter_chunks(rows):
+                    historical_rows += len(chunk)
+                    if self.key_index and index is None:
+                        history_keys.append(hash_rows(chunk, KEY_COLUMNS))
+                        history_values.append(hash_rows(chunk))
+                    yield chunk
+
+            # Sorted inputs are kept as runs; others are sorted as they spill.
+            if sorter.add_sorted(historical_chunks()):
+                self._mark_sorted(historical_path)
+            logger.info(f"📊 Historical data loaded: {historical_rows} rows")
+
+            if self.key_index and index is None:
+                logger.info("🗂️ Building the key index of the historical data")
+                index = KeyIndex.build(
+                    np.concatenate(history_keys or [np.empty(0, np.uint64)]),
+                    np.concatenate(history_values or [np.empty(0, np.uint64)]),
+                    columns,
+                )
+                if len(index) == historical_rows:
+                    index.save(historical_path)
+
+            logger.info(f"📂 Streaming new extracted data from: {self.new_data_path}")
+
+            def new_chunks():
+                nonlocal new_rows, changed_rows
+                for chunk in new.iter_chunks(rows):
+                    new_rows += len(chunk)
+                    if index is not None:
+                        # Rows already in history are skipped; the index is
+                        # updated per chunk so later chunks are compared to
+                        # earlier ones.
+                        chunk = chunk.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+                        keys = hash_rows(chunk, KEY_COLUMNS)
+                        values = hash_rows(chunk)
+                        changed = index.changed(keys, values)
+                        index.update(keys[changed], values[changed])
+                        chunk = chunk[changed]
+                    changed_rows += len(chunk)
+                    yield chunk
+
+            # Filtered chunks can be in order when the file is not.
+            if sorter.add_sorted(new_chunks()) and index is None:
+                self._mark_sorted(self.new_data_path)
+            logger.info(
+                f"📊 New data loaded: {new_rows} rows, {changed_rows} new or changed"
+            )
+
+            if self.output_path == self.historical_path:
+                backup_path = self.historical_path.with_name(
+                    f"{self.historical_path.stem}.bak{self.historical_path.suffix}"
+                )
+                storage.copy(historical_path, backup_path, rows)
+                logger.info(f"📦 Backed up historical file to: {backup_path}")
+
+            logger.info(
+                f"💾 Saving merged dataset to: {self.output_path} "
+                f"from {max(1, len(sorter.runs))} sorted run(s)"
+            )
+            written = 0
+
+            def chunks():
+                nonlocal written
+                for chunk in sorter.merged():
+                    written += len(chunk)
+                    yield chunk
+
+            if self._output(historical_path).write_chunks(chunks(), sorter.formats()):
+                storage.mark_sorted(self.output_path, KEY_COLUMNS)
+
+        if index is not None:
+            self._index = index
+            index.save(self.output_path)
+        return written
+
+    def _output(self, historical_path):
+        # A segment store records the history and the new data rebuild it was
+        # built from: later runs only append to it while both are unchanged.
+        output = storage.get_storage(self.output_path)
+        if (
+            isinstance(output, storage.SegmentStorage)
+            and self.output_path != self.historical_path
+        ):
+            output.meta["base"] = signature(historical_path)
+            output.meta["input"] = storage.rebuilt(self.new_data_path)
+        return output
+
+    def _can_append(self) -> bool:
+        output = storage.get_storage(self.output_path)
+        if (
+            self.full_rebuild
+            or not isinstance(output, storage.SegmentStorage)
+            or not output.exists()
+        ):
+            return False
+        if self.output_path == self.historical_path:
+            return True
+        historical_path = storage.resolve(self.historical_path)
+        meta = output.manifest()["meta"]
+        if meta.get("base") != signature(historical_path):
+            logger.info("🔁 Historical data changed. Rebuilding the merged dataset.")
+            return False
+        # Rows that left the new data on its rebuild would stay in the store.
+        if meta.get("input") != storage.rebuilt(self.new_data_path):
+            logger.info("🔁 New data was rebuilt. Rebuilding the merged dataset.")
+            return False
+        return True
+
+    def _append_segments(self) -> int:
+        # The merged dataset already holds the history and earlier new data:
+        # only rows missing from it or changed are written, as a new segment.
+        output = storage.get_storage(self.output_path)
+        new = storage.get_storage(self.new_data_path)
+        columns = output.columns()
+        if columns != new.columns():
+            logger.error("❌ Schema mismatch between merged and new data.")
+            raise ValueError("Schema mismatch: columns do not align.")
+
+        rows = external_sort.chunk_rows(
+            self.memory_budget or external_sort.DEFAULT_MEMORY_BUDGET
+        )
+        index = KeyIndex.load(self.output_path, columns)
+        if index is None:
+            logger.info("🗂️ Building the key index of the merged data")
+            keys, values = [], []
+            for chunk in output.iter_chunks(rows):
+                keys.append(hash_rows(chunk, KEY_COLUMNS))
+                values.append(hash_rows(chunk))
+            index = KeyIndex.build(
+                np.concatenate(keys or [np.empty(0, np.uint64)]),
+                np.concatenate(values or [np.empty(0, np.uint64)]),
+                columns,
+            )
+
+        logger.info(f"📂 Reading new extracted data from: {self.new_data_path}")
+        changes, new_rows = [], 0
+        for chunk in new.iter_chunks(rows) if self.memory_budget else [new.read()]:
+            new_rows += len(chunk)
+            chunk = chunk.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+            keys = hash_rows(chunk, KEY_COLUMNS)
+            values = hash_rows(chunk)
+            changed = index.changed(keys, values)
+            index.update(keys[changed], values[changed])
+            changes.append(chunk[changed])
+        delta = (
+            schema.apply_schema(pd.concat(changes, ignore_index=True))
+            if changes
+            else None
+        )
+        changed_rows = 0 if delta is None else len(delta)
+        logger.info(f"🧮 {changed_rows} of {new_rows} new rows are new or changed")
+
+        if changed_rows and output.append(delta):
+            manifest = output.manifest()
+            logger.info(
+                f"🧩 Appended them to {self.output_path} as version "
+                f"{manifest['version']} ({len(manifest['segments'])} segments)"
+            )
+        storage.mark_sorted(self.output_path, KEY_COLUMNS)
+        index.save(self.output_path)
+        self._index = index
+        return changed_rows
+
+    def compact(self) -> bool:
+        output = storage.get_storage(self.output_path)
+        if not isinstance(output, storage.SegmentStorage) or not output.exists():
+            return False
+        # The content does not change, so the index and sort order carry over.
+        index = KeyIndex.load(self.output_path)
+        is_sorted = storage.sorted_by(self.output_path) == KEY_COLUMNS
+        if not output.compact(
+            memory_budget=self.memory_budget or external_sort.DEFAULT_MEMORY_BUDGET
+        ):
+            return False
+        manifest = output.manifest()
+        logger.info(
+            f"🗜️ Compacted {self.output_path} to {len(manifest['segments'])} "
+            f"segments (version {manifest['version']})"
+        )
+        if is_sorted:
+            storage.mark_sorted(self.output_path, KEY_COLUMNS)
+        if index is not None:
+            index.save(self.output_path)
+        return True
+
+    def _merge_indexed(self, historical_path, historical_df, new_df):
+        # New rows are checked against the (city, timestamp) index of the
+        # history: only new keys and changed rows reach the combined frame.
+        index = KeyIndex.load(historical_path, historical_df.columns)
+        if index is None:
+            logger.info("🗂️ Building the key index of the historical data")
+            deduplicated_df = historical_df.drop_duplicates(
+                subset=KEY_COLUMNS, keep="last"
+            )
+            index = KeyIndex.build(
+                hash_rows(deduplicated_df, KEY_COLUMNS),
+                hash_rows(deduplicated_df),
+                list(deduplicated_df.columns),
+            )
+            if len(deduplicated_df) == len(historical_df):
+                index.save(historical_path)
+            historical_df = deduplicated_df
+
+        new_df = new_df.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+        keys = hash_rows(new_df, KEY_COLUMNS)
+        values = hash_rows(new_df)
+        changed = index.changed(keys, values)
+        superseding = changed & index.contains(keys)
+        logger.info(
+            f"🧮 {changed.sum()} new or changed rows ({superseding.sum()} superseding), "
+            f"{len(new_df) - changed.sum()} already in history"
+        )
+
+        if superseding.any():
+            cities = new_df.loc[superseding, "city"].unique()
+            candidates = historical_df["city"].isin(cities).to_numpy()
+            stale = np.zeros(len(historical_df), dtype=bool)
+            stale[candidates] = np.isin(
+                hash_rows(historical_df[candidates], KEY_COLUMNS), keys[superseding]
+            )
+            historical_df = historical_df[~stale]
+
+        self._index = index.update(keys[changed], values[changed])
+        return historical_df, new_df[changed]
+
     def commit(self):
         if self.output_path != self.historical_path:
             logger.info(f"📥 Committing merged data to: {self.historical_path}")
-            pd.read_csv(self.output_path).to_csv(self.historical_path, index=False)
+            # The merged files are linked into place rather than rewritten.
+            storage.copy(self.output_path, self.historical_path)
+            if storage.sorted_by(self.output_path) == KEY_COLUMNS:
+                storage.mark_sorted(self.historical_path, KEY_COLUMNS)
+            index = KeyIndex.load(self.output_path)
+            if index is not None:
+                index.save(self.historical_path)
             logger.info("✅ Commit complete.")
         else:
             logger.warning(
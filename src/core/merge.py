@@ -1,49 +1,378 @@
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from src.core.base import Process
+from src.utils import external_sort, schema, storage
+from src.utils.external_sort import ExternalSort
+from src.utils.key_index import KEY_COLUMNS, KeyIndex, hash_rows
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
 class Merge(Process):
-    def __init__(self):
+    MANIFEST_NAME = "merge_manifest.json"
+    MANIFEST_VERSION = 1
+    DEFAULT_MAX_WORKERS = 8
+
+    def __init__(
+        self,
+        incremental=False,
+        full_rebuild=False,
+        backend="csv",
+        max_workers=1,
+        key_index=False,
+        memory_budget=None,
+    ):
         base_dir = Path(__file__).resolve().parents[2]
-        self.output_file = base_dir / "data" / "merged" / "all_weather_data.csv"
+        self.output_file = storage.data_path(
+            base_dir / "data" / "merged" / "all_weather_data", backend
+        )
         self.input_dir = base_dir / "data" / "processed"
         self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self.incremental = incremental
+        self.full_rebuild = full_rebuild
+        self.max_workers = max(1, int(max_workers))
+        self.key_index = key_index
+        self.memory_budget = memory_budget
+
+    @property
+    def manifest_file(self):
+        return Path(self.output_file).with_name(self.MANIFEST_NAME)
 
     def apply(self):
         logger.info("🔄 Starting merge process...")
 
-        all_files = list(self.input_dir.glob("**/*.csv"))
+        all_files = sorted(self.input_dir.glob("**/*.csv"))
         logger.info(f"📂 Found {len(all_files)} files to merge.")
 
-        df_list = []
-        for file in all_files:
-            try:
-                df = pd.read_csv(file, encoding="utf-8")
-                df_list.append(df)
-            except Exception as e:
-                logger.error(f"❌ Failed to read {file}: {e}")
+        if self.incremental:
+            signatures = self._signatures(all_files)
+            pending = self._pending_files(signatures)
+            if pending is not None:
+                self._append(pending, signatures)
+                return
+        else:
+            signatures = None
 
-        if not df_list:
+        if self.memory_budget:
+            self._merge_streaming(all_files, signatures)
+            return
+
+        merged_df, merged = self._read_files(all_files)
+        if merged_df is None:
             logger.warning("⚠️ No files read successfully. Exiting merge.")
             return
 
-        merged_df = pd.concat(df_list, ignore_index=True)
         logger.info(
             f"📊 Merged {len(all_files)} files with total {len(merged_df)} rows before cleanup."
         )
+        merged_df = self._clean(merged_df)
+        if not self._write(merged_df):
+            return
+        storage.mark_rebuilt(self.output_file)
+        if self.key_index:
+            index = KeyIndex.build(hash_rows(merged_df), columns=list(merged_df))
+            index.save(self.output_file)
+        if signatures is not None:
+            self._save_manifest({key: signatures[key] for key in merged})
+
+    def _append(self, files, signatures):
+        if not files:
+            logger.info("✅ Merged data is up to date. Nothing to append.")
+            return
+
+        logger.info(f"➕ Appending {len(files)} new file(s) to {self.output_file}")
+        if self.memory_budget:
+            self._append_streaming(files, signatures)
+            return
+
+        new_df, merged = self._read_files(files)
+        if new_df is None:
+            logger.warning("⚠️ No new files read successfully. Exiting merge.")
+            return
+
+        index = None
+        if self.key_index:
+            merged_df, index = self._append_indexed(new_df)
+        else:
+            existing_df = self._read_output()
+            logger.info(
+                f"📊 Appended {len(new_df)} rows to {len(existing_df)} merged rows before cleanup."
+            )
+            merged_df = self._clean(
+                schema.apply_schema(pd.concat([existing_df, new_df], ignore_index=True))
+            )
+
+        if merged_df is not None:
+            if not self._write(merged_df):
+                return
+            if index is not None:
+                index.save(self.output_file)
+
+        manifest = self._load_manifest()
+        manifest.update({key: signatures[key] for key in merged})
+        self._save_manifest(manifest)
+
+    def _append_indexed(self, new_df):
+        # New rows are checked against a persisted index of the merged rows'
+        # hashes: the merged data is only read back when something changes.
+        new_df = self._clean(new_df)
+        existing_df = None
+        index = KeyIndex.load(self.output_file)
+        if index is None:
+            existing_df = self._read_output()
+            logger.info("🗂️ Building the row index of the merged data")
+            index = KeyIndex.build(hash_rows(existing_df), columns=list(existing_df))
+
+        if not set(new_df.columns) <= set(index.columns):
+            logger.info("🗂️ New columns appeared. Deduplicating the full merged data.")
+            if existing_df is None:
+                existing_df = self._read_output()
+            merged_df = self._clean(
+                schema.apply_schema(pd.concat([existing_df, new_df], ignore_index=True))
+            )
+            return merged_df, KeyIndex.build(
+                hash_rows(merged_df), columns=list(merged_df)
+            )
+
+        rows = hash_rows(schema.apply_schema(new_df.reindex(columns=index.columns)))
+        fresh = index.changed(rows)
+        logger.info(f"🧮 {fresh.sum()} of {len(new_df)} rows are not merged yet.")
+        if not fresh.any():
+            return None, index
+
+        if existing_df is None:
+            existing_df = self._read_output()
+        merged_df = schema.apply_schema(
+            pd.concat([existing_df, new_df[fresh]], ignore_index=True)
+        )
+        return merged_df, index.update(rows[fresh])
+
+    def _merge_streaming(self, files, signatures):
+        # Files are read in batches that fit the memory budget and sorted
+        # through temporary runs, so the merged data is never fully in memory.
+        with ExternalSort(
+            self.memory_budget, temp_dir=self.output_file.parent
+        ) as sorter:
+            columns, merged, rows = [], [], 0
+            for df, batch_merged in self._read_batches(files):
+                merged.extend(batch_merged)
+                if df is not None:
+                    rows += len(df)
+                    columns = list(dict.fromkeys([*columns, *df.columns]))
+                    sorter.add(self._drop_incomplete(df))
+
+            if not columns:
+                logger.warning("⚠️ No files read successfully. Exiting merge.")
+                return
+            logger.info(
+                f"📊 Merged {len(files)} files with total {rows} rows "
+                f"in {max(1, len(sorter.runs))} sorted run(s)."
+            )
+            hashes = [] if self.key_index else None
+            if not self._write_chunks(sorter, columns, hashes):
+                return
+        storage.mark_rebuilt(self.output_file)
+
+        if hashes is not None:
+            index = KeyIndex.build(np.concatenate(hashes), columns=columns)
+            index.save(self.output_file)
+        if signatures is not None:
+            self._save_manifest({key: signatures[key] for key in merged})
+
+    def _append_streaming(self, files, signatures):
+        output = storage.get_storage(self.output_file)
+        columns = output.columns()
+        index = KeyIndex.load(self.output_file) if self.key_index else None
+        merged, rows, fresh_rows = [], 0, 0
+
+        with ExternalSort(self.memory_budget, temp_dir=self.output_file.parent) as new:
+            for df, batch_merged in self._read_batches(files):
+                merged.extend(batch_merged)
+                if df is None:
+                    continue
+                df = self._drop_incomplete(df).drop_duplicates()
+                rows += len(df)
+                columns = list(dict.fromkeys([*columns, *df.columns]))
+                if index is not None and not set(df.columns) <= set(index.columns):
+                    logger.info(
+                        "🗂️ New columns appeared. Deduplicating the full merged data."
+                    )
+                    index = None
+                if index is not None:
+                    hashes = hash_rows(
+                        schema.apply_schema(df.reindex(columns=index.columns))
+                    )
+                    fresh = index.changed(hashes)
+                    index.update(hashes[fresh])
+                    df = df[fresh]
+                fresh_rows += len(df)
+                new.add(df)
+
+            if not merged:
+                logger.warning("⚠️ No new files read successfully. Exiting merge.")
+                return
+            if index is not None:
+                logger.info(f"🧮 {fresh_rows} of {rows} rows are not merged yet.")
 
-        merged_df.dropna(subset=["city", "timestamp"], inplace=True)
+            if index is None or fresh_rows:
+                with ExternalSort(
+                    self.memory_budget, temp_dir=self.output_file.parent
+                ) as sorter:
+                    # The merged data is written sorted, so both inputs are
+                    # kept as runs unless a chunk turns out of order.
+                    sorter.add_sorted(
+                        output.iter_chunks(external_sort.chunk_rows(self.memory_budget))
+                    )
+                    sorter.add_sorted(new.merged())
+                    logger.info(
+                        f"📊 Appended {rows} rows to the merged data in "
+                        f"{max(1, len(sorter.runs))} sorted run(s)."
+                    )
+                    hashes = [] if self.key_index and index is None else None
+                    if not self._write_chunks(sorter, columns, hashes):
+                        return
+                if hashes is not None:
+                    index = KeyIndex.build(np.concatenate(hashes), columns=columns)
+                if index is not None:
+                    index.save(self.output_file)
+
+        manifest = self._load_manifest()
+        manifest.update({key: signatures[key] for key in merged})
+        self._save_manifest(manifest)
+
+    def _read_batches(self, files):
+        # Batches follow the header groups of _read_files so rows keep the
+        # order, and therefore the tie order, of an in-memory merge.
+        groups = {}
+        for file in files:
+            groups.setdefault(self._read_header(file), []).append(file)
+
+        # CSV text takes several times its size once split into lines.
+        limit = max(1, self.memory_budget // 8)
+        for group in groups.values():
+            batch, size = [], 0
+            for file in group:
+                file_size = file.stat().st_size
+                if batch and size + file_size > limit:
+                    yield self._read_files(batch)
+                    batch, size = [], 0
+                batch.append(file)
+                size += file_size
+            yield self._read_files(batch)
+
+    def _read_header(self, file):
+        try:
+            with open(file, encoding="utf-8") as f:
+                return f.readline().rstrip("\r\n")
+        except Exception:
+            return None
+
+    def _write_chunks(self, sorter, columns, hashes=None):
+        def chunks():
+            for chunk in sorter.merged():
+                chunk = schema.apply_schema(chunk.reindex(columns=columns))
+                if hashes is not None:
+                    hashes.append(hash_rows(chunk))
+                yield chunk
+
+        try:
+            written = storage.get_storage(self.output_file).write_chunks(
+                chunks(), sorter.formats()
+            )
+        except Exception as e:
+            logger.error(f"💥 Failed to save merged data: {e}")
+            return False
+        if not written:
+            logger.warning(
+                "No valid rows after cleanup. Merged file will not be written."
+            )
+            return False
+        storage.mark_sorted(self.output_file, KEY_COLUMNS)
+        logger.info(f"✅ Successfully saved merged data → {self.output_file}")
+        return True
+
+    def _read_output(self):
+        existing_df = storage.get_storage(self.output_file).read()
+        logger.info(f"📂 Loaded {len(existing_df)} merged rows from {self.output_file}")
+        return existing_df
+
+    def _read_files(self, files):
+        if self.max_workers == 1 or len(files) == 1:
+            contents = list(map(self._read_text, files))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                contents = list(executor.map(self._read_text, files))
+
+        # Files sharing a header are parsed together in one read_csv call.
+        groups = {}
+        for file, content in zip(files, contents):
+            if content is not None:
+                header, lines = content
+                group = groups.setdefault(header, ([], []))
+                group[0].append(file)
+                group[1].extend(lines)
+
+        df_list = []
+        merged = []
+        for header, (group_files, lines) in groups.items():
+            try:
+                df_list.append(self._parse(header, lines))
+                merged.extend(group_files)
+            except Exception as e:
+                logger.warning(
+                    f"⚠️ Could not parse {len(group_files)} file(s) together: {e}. "
+                    "Reading them one by one."
+                )
+                for file in group_files:
+                    try:
+                        df_list.append(schema.read_csv(file))
+                        merged.append(file)
+                    except Exception as e:
+                        logger.error(f"❌ Failed to read {file}: {e}")
+
+        merged = [self._key(file) for file in merged]
+        if not df_list:
+            return None, merged
+        return schema.apply_schema(pd.concat(df_list, ignore_index=True)), merged
+
+    def _read_text(self, file):
+        try:
+            lines = file.read_text(encoding="utf-8").splitlines()
+            if not lines:
+                raise ValueError("File is empty")
+            return lines[0], lines[1:]
+        except Exception as e:
+            logger.error(f"❌ Failed to read {file}: {e}")
+            return None
+
+    def _parse(self, header, lines):
+        columns = pd.read_csv(io.StringIO(header), nrows=0).columns
+        document = io.StringIO("\n".join([header, *lines]))
+        return pd.read_csv(document, **schema.read_options(columns))
+
+    def _drop_incomplete(self, df):
+        df = df.dropna(subset=["city", "timestamp"])
+        try:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not convert 'timestamp' to datetime: {e}")
+        return df
+
+    def _clean(self, merged_df):
+        merged_df = merged_df.dropna(subset=["city", "timestamp"])
         logger.info(
             f"🧹 Dropped rows with missing city/timestamp. Remaining: {len(merged_df)}"
         )
 
-        merged_df.drop_duplicates(inplace=True)
+        merged_df = merged_df.drop_duplicates()
         logger.info(f"✨ Dropped duplicate rows. Remaining: {len(merged_df)}")
 
         try:
@@ -52,17 +381,90 @@ class Merge(Process):
             )
         except Exception as e:
             logger.warning(f"⚠️ Could not convert 'timestamp' to datetime: {e}")
+        return merged_df
 
+    def _write(self, merged_df):
         merged_df.sort_values(by=["city", "timestamp"], inplace=True)
 
         if merged_df.empty:
             logger.warning(
                 "No valid rows after cleanup. Merged file will not be written."
             )
-            return
+            return False
 
         try:
-            merged_df.to_csv(self.output_file, index=False, encoding="utf-8")
+            storage.get_storage(self.output_file).write(merged_df)
+            storage.mark_sorted(self.output_file, KEY_COLUMNS)
             logger.info(f"✅ Successfully saved merged data → {self.output_file}")
+            return True
         except Exception as e:
             logger.error(f"💥 Failed to save merged data: {e}")
+            return False
+
+    def _pending_files(self, signatures):
+        # Rows of a rewritten or deleted file cannot be retracted from the
+        # merged CSV, so those cases fall back to a full rebuild.
+        if self.full_rebuild:
+            logger.info("🔁 Full rebuild requested.")
+            return None
+        if not self.output_file.exists():
+            logger.info("🔁 No merged data yet. Running a full rebuild.")
+            return None
+
+        manifest = self._load_manifest()
+        if manifest is None:
+            logger.info("🔁 No usable merge manifest. Running a full rebuild.")
+            return None
+
+        removed = manifest.keys() - signatures.keys()
+        changed = [
+            key
+            for key, signature in signatures.items()
+            if key in manifest and manifest[key] != signature
+        ]
+        if removed or changed:
+            logger.info(
+                f"🔁 {len(changed)} merged file(s) changed and {len(removed)} "
+                "removed since the last merge. Running a full rebuild."
+            )
+            return None
+
+        return [
+            self.input_dir / key for key in sorted(signatures.keys() - manifest.keys())
+        ]
+
+    def _signatures(self, files):
+        signatures = {}
+        for file in files:
+            stat = file.stat()
+            signatures[self._key(file)] = [stat.st_mtime_ns, stat.st_size]
+        return signatures
+
+    def _key(self, file):
+        return Path(file).relative_to(self.input_dir).as_posix()
+
+    def _load_manifest(self):
+        try:
+            manifest = json.loads(self.manifest_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != self.MANIFEST_VERSION:
+            return None
+        if manifest.get("output", self.output_file.name) != self.output_file.name:
+            return None
+        return manifest.get("files", {})
+
+    def _save_manifest(self, files):
+        temp_file = self.manifest_file.with_suffix(".tmp")
+        temp_file.write_text(
+            json.dumps(
+                {
+                    "version": self.MANIFEST_VERSION,
+                    "output": self.output_file.name,
+                    "files": files,
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(temp_file, self.manifest_file)
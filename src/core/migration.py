@@ -3,17 +3,24 @@ from pathlib import Path
 import psycopg2
 
 from src.core.base import Process
+from src.utils import storage
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
 class Migration(Process):
-    def __init__(self, db_config, csv_path=None):
+    COPY_ROWS = 100_000
+
+    def __init__(self, db_config, csv_path=None, backend="csv"):
         self.db_config = db_config
 
         base_dir = Path(__file__).resolve().parents[2]
-        self.csv_path = base_dir / "data" / "merged" / "ready_data.csv"
+        self.csv_path = (
+            Path(csv_path)
+            if csv_path
+            else storage.data_path(base_dir / "data" / "merged" / "ready_data", backend)
+        )
         self.conn = None
 
     def apply(self):
@@ -42,12 +49,13 @@ class Migration(Process):
         with self.conn.cursor() as cur:
             logger.info("Loading data into staging_ready_data from CSV...")
             cur.execute("TRUNCATE TABLE staging_ready_data;")
-            with open(self.csv_path, "r", encoding="utf-8") as f:
+            # COPY only reads CSV: other backends are exported chunk by chunk.
+            for part in storage.get_storage(self.csv_path).iter_csv(self.COPY_ROWS):
                 cur.copy_expert(
                     """
                     COPY staging_ready_data FROM STDIN WITH CSV HEADER DELIMITER ',';
                     """,
-                    f,
+                    part,
                 )
             logger.info("staging_ready_data loaded successfully.")
 
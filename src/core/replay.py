@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from src.core.base import Process
+from src.utils.forecast import (
+    ForecastSkipped,
+    aggregate_daily_forecasts,
+    split_city_csv,
+)
+from src.utils.logger import get_logger
+from src.utils.raw_log import RawResponseLog
+
+logger = get_logger(__name__)
+
+
+def replay_partition(log_dir, output_dir, day_str):
+    latest = {}
+    for record in RawResponseLog(log_dir).read_partition(day_str):
+        fetched_at = datetime.fromisoformat(record["fetched_at"])
+        for city_name in record["city_names"]:
+            if city_name not in latest or latest[city_name][0] <= fetched_at:
+                latest[city_name] = (fetched_at, record["payload"])
+
+    if not latest:
+        logger.warning(f"No logged responses for {day_str}. Skipping.")
+        return 0
+
+    now = max(fetched_at for fetched_at, _ in latest.values())
+    payloads = {city_name: payload for city_name, (_, payload) in latest.items()}
+    frame, errors = aggregate_daily_forecasts(payloads, now)
+
+    for city_name, error in errors.items():
+        if isinstance(error, ForecastSkipped):
+            logger.warning(f"{error} for {city_name}. Skipping.")
+        else:
+            logger.error(f"Failed to build/save forecast row for {city_name}: {error}")
+
+    day_dir = Path(output_dir) / day_str
+    day_dir.mkdir(parents=True, exist_ok=True)
+    for city_name, document in split_city_csv(frame):
+        (day_dir / f"{city_name}.csv").write_text(document, encoding="utf-8")
+
+    logger.info(f"Rebuilt {len(frame)} raw rows for {day_str} → {day_dir}")
+    return len(frame)
+
+
+class Replay(Process):
+    def __init__(self, dates=None, max_workers=None):
+        base_dir = Path(__file__).resolve().parents[2]
+        self.log_dir = base_dir / "data" / "raw_log"
+        self.output_dir = base_dir / "data" / "raw"
+        self.dates = dates
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def apply(self):
+        dates = self.dates or RawResponseLog(self.log_dir).dates()
+        if not dates:
+            logger.warning(f"No raw response log found in {self.log_dir}.")
+            return
+
+        logger.info(f"Replaying raw responses for {len(dates)} date(s)...")
+        if self.max_workers == 1 or len(dates) == 1:
+            results = [self._replay(day_str) for day_str in dates]
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(
+                        replay_partition, self.log_dir, self.output_dir, day_str
+                    )
+                    for day_str in dates
+                ]
+                results = []
+                for day_str, future in zip(dates, futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.error(f"Failed to replay {day_str}: {e}")
+                        results.append(0)
+
+        logger.info(f"Replay completed: {sum(results)} rows rebuilt.")
+
+    def _replay(self, day_str):
+        try:
+            return replay_partition(self.log_dir, self.output_dir, day_str)
+        except Exception as e:
+            logger.error(f"Failed to replay {day_str}: {e}")
+            return 0
@@ -1,3 +1,4 @@
+import io
 import logging
 from datetime import datetime
 from pathlib import Path
@@ -5,6 +6,8 @@ from pathlib import Path
 import pandas as pd
 
 from src.core.base import Process
+from src.utils import schema
+from src.utils.comfort_rules import load_rules
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +17,16 @@ def get_now():
 
 
 class Transform(Process):
-    def __init__(self):
+    DAY_FILE_NAME = "all_cities.csv"
+    SOURCE_COLUMN = "__source_file"
+
+    def __init__(self, batch=False, single_file=False, rules_path=None):
         base_dir = Path(__file__).resolve().parents[2]
         self.output_dir = base_dir / "data" / "processed"
         self.input_dir = base_dir / "data" / "raw"
+        self.batch = batch or single_file
+        self.single_file = single_file
+        self.rules = load_rules(rules_path)
 
     def transform_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         logger.info("Starting transformation logic")
@@ -30,38 +39,113 @@ class Transform(Process):
             ]
         )
 
-        df["is_ideal_temp"] = df["temp_C"].between(22, 28)
-        df["is_low_rain"] = df["rain_1d"] == 0
-        df["is_low_wind"] = df["wind_speed"] < 5.0
-        df["is_ideal_humidity"] = df["humidity"].between(30, 70)
-
-        df["comfort_score"] = (
-            df["is_ideal_temp"].astype(int) * 0.4
-            + df["is_low_rain"].astype(int) * 0.3
-            + df["is_low_wind"].astype(int) * 0.2
-            + df["is_ideal_humidity"].astype(int) * 0.1
-        )
-
-        df["is_ideal_day"] = df["is_ideal_temp"] & df["is_low_rain"] & df["is_low_wind"]
-
         df["timestamp"] = pd.to_datetime(df["timestamp"])
+        for column, values in self.rules.evaluate(df).items():
+            df[column] = values
+
         df["month"] = df["timestamp"].dt.month_name()
         df["year"] = df["timestamp"].dt.year
         df["day_of_week"] = df["timestamp"].dt.day_name()
 
         logger.info("Transformation logic completed")
-        return df
+        return schema.apply_schema(df)
 
-    def apply(self):
-        logger.info("Starting transformation step")
-        date_str = get_now().strftime("%Y-%m-%d")
+    def _read_partition(self, files):
+        # Files sharing a header are stitched into one CSV document and parsed
+        # in a single read_csv call, tagged with the index of their source file.
+        groups = {}
+        for index, file in enumerate(files):
+            try:
+                header, *lines = file.read_text(encoding="utf-8").splitlines()
+            except Exception as e:
+                logger.error(f"Failed to transform {file.name}: {e}")
+                continue
+            group = groups.setdefault(header, ([], []))
+            group[0].append(index)
+            group[1].extend(f"{index},{line}" for line in lines if line)
+
+        for header, (indexes, lines) in groups.items():
+            document = "\n".join([f"{self.SOURCE_COLUMN},{header}", *lines])
+            columns = [self.SOURCE_COLUMN, *header.split(",")]
+            try:
+                df = pd.read_csv(io.StringIO(document), **schema.read_options(columns))
+            except Exception as e:
+                logger.warning(
+                    f"Could not parse {len(indexes)} file(s) together: {e}. "
+                    "Reading them one by one."
+                )
+                yield from self._read_each(files, indexes)
+                continue
+            yield indexes, df
+
+    def _read_each(self, files, indexes):
+        for index in indexes:
+            try:
+                df = schema.read_csv(files[index])
+            except Exception as e:
+                logger.error(f"Failed to transform {files[index].name}: {e}")
+                continue
+            df.insert(0, self.SOURCE_COLUMN, index)
+            yield [index], df
+
+    def _write_partitioned(self, df, files, indexes, output_path):
+        sources = df.pop(self.SOURCE_COLUMN).to_numpy()
+        content = df.to_csv(index=False, lineterminator="\n")
+        header, *lines = content.rstrip("\n").split("\n")
+
+        if len(lines) != len(df):
+            # A quoted value spans several lines: fall back to one write per file.
+            for index in indexes:
+                df[sources == index].to_csv(
+                    output_path / files[index].name, index=False
+                )
+            return
+
+        by_source = {index: [] for index in indexes}
+        for source, line in zip(sources, lines):
+            by_source[source].append(line)
+
+        for index, source_lines in by_source.items():
+            output_file = output_path / files[index].name
+            output_file.write_text(
+                "\n".join([header, *source_lines]) + "\n", encoding="utf-8"
+            )
+        logger.info(f"Saved {len(lines)} transformed rows → {output_path}")
+
+    def apply_batch(self, input_path, output_path):
+        files = sorted(input_path.glob("*.csv"))
+        logger.info(f"Transforming {len(files)} files from {input_path} in batch")
+
+        frames = []
+        for indexes, df in self._read_partition(files):
+            names = ", ".join(files[i].name for i in indexes)
+            try:
+                df_clean = Transform.transform_dataframe(self, df)
+                if self.single_file:
+                    frames.append(df_clean.drop(columns=self.SOURCE_COLUMN))
+                else:
+                    self._write_partitioned(df_clean, files, indexes, output_path)
+            except Exception as e:
+                logger.error(f"Failed to transform {names}: {e}")
+
+        if frames:
+            output_file = output_path / self.DAY_FILE_NAME
+            day_df = pd.concat(frames, ignore_index=True)
+            day_df.to_csv(output_file, index=False)
+            logger.info(f"Saved {len(day_df)} transformed rows → {output_file}")
+
+    def transform_partition(self, date_str):
         input_path = Path(self.input_dir) / date_str
         output_path = Path(self.output_dir) / date_str
         output_path.mkdir(parents=True, exist_ok=True)
 
+        if self.batch:
+            self.apply_batch(input_path, output_path)
+            return
+
         for file in input_path.glob("*.csv"):
             try:
-                df = pd.read_csv(file)
+                df = schema.read_csv(file)
                 logger.info(f"Transforming file: {file.name}")
                 df_clean = Transform.transform_dataframe(self, df)
                 output_file = output_path / file.name
@@ -70,4 +154,7 @@ class Transform(Process):
             except Exception as e:
                 logger.error(f"Failed to transform {file.name}: {e}")
 
+    def apply(self):
+        logger.info("Starting transformation step")
+        self.transform_partition(get_now().strftime("%Y-%m-%d"))
         logger.info("Transformation step completed")
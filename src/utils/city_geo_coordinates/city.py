@@ -1,4 +1,15 @@
+import unicodedata
+
+
+def normalize_name(name):
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split()).casefold()
+
+
 class City:
+    __slots__ = ("name", "latitude", "longitude")
+
     def __init__(self, name):
         self.name = name
         self.latitude = None
@@ -6,16 +6,32 @@ from src.utils.city_geo_coordinates.city import City
 
 
 class CityGeocoder:
-    def __init__(self, user_agent="city_locator"):
+    def __init__(self, user_agent="city_locator", cache=None, gazetteer=None):
         self.geolocator = Nominatim(user_agent=user_agent)
+        self.cache = cache
+        self.gazetteer = gazetteer
 
     def geocode_city(self, city):
+        if self.gazetteer is not None:
+            found = self.gazetteer.lookup(city.name)
+            if found is not None:
+                city.set_coordinates(*found)
+                return
+
+        if self.cache is not None:
+            cached = self.cache.get(city.name)
+            if cached is not None:
+                city.set_coordinates(*cached)
+                return
+
         try:
             location = self.geolocator.geocode(city.name)
             if location:
                 city.set_coordinates(
                     round(location.latitude, 4), round(location.longitude, 4)
                 )
+                if self.cache is not None:
+                    self.cache.put(city.name, city.latitude, city.longitude)
         except Exception as e:
             print(f"Error geocoding '{city.name}': {e}")
         finally:
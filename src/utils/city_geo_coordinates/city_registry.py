@@ -0,0 +1,169 @@
+import json
+import math
+from array import array
+from pathlib import Path
+
+from src.utils.city_geo_coordinates.city import City, normalize_name
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def iter_json_array(path, chunk_size=1 << 16):
+    decoder = json.JSONDecoder()
+    with Path(path).open("r", encoding="utf-8") as f:
+        buffer, pos, started = "", 0, False
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if not started:
+                    if pos == len(buffer):
+                        break
+                    if buffer[pos] != "[":
+                        raise ValueError(f"{path} does not hold a JSON array")
+                    started, pos = True, pos + 1
+                    continue
+                if pos < len(buffer) and buffer[pos] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break
+                if end == len(buffer) and chunk:
+                    # A scalar cut by the chunk boundary may still decode.
+                    break
+                yield item
+                pos = end
+            if not chunk:
+                if not started:
+                    raise ValueError(f"{path} does not hold a JSON array")
+                raise ValueError(f"{path} ends before the JSON array is closed")
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class CityRegistry:
+    def __init__(self, grid_resolution=1.0):
+        self.grid_resolution = grid_resolution
+        self.names = []
+        self.lats = array("d")
+        self.lons = array("d")
+        self._index = {}
+        self._grid = None
+
+    @classmethod
+    def from_json(cls, path, grid_resolution=1.0):
+        registry = cls(grid_resolution)
+        for position, entry in enumerate(iter_json_array(path)):
+            try:
+                registry.add(
+                    entry["name"],
+                    entry.get("lat"),
+                    entry.get("lon"),
+                    aliases=entry.get("aliases", ()),
+                )
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                logger.error(
+                    f"Skipping malformed city entry {position} in {path}: {e!r}"
+                )
+        return registry
+
+    def add(self, name, lat, lon, aliases=()):
+        # Validated before anything is stored: a bad entry leaves no trace.
+        lat = math.nan if lat is None else float(lat)
+        lon = math.nan if lon is None else float(lon)
+        keys = [normalize_name(key) for key in (name, *aliases)]
+
+        row = len(self.names)
+        self.names.append(name)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        for key in keys:
+            self._index.setdefault(key, row)
+        self._grid = None
+        return row
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return normalize_name(name) in self._index
+
+    def __iter__(self):
+        return (self._city(row) for row in range(len(self.names)))
+
+    def _city(self, row):
+        city = City(self.names[row])
+        lat, lon = self.lats[row], self.lons[row]
+        if not (math.isnan(lat) or math.isnan(lon)):
+            city.set_coordinates(lat, lon)
+        return city
+
+    def get(self, name):
+        row = self._index.get(normalize_name(name))
+        return None if row is None else self._city(row)
+
+    def _cell(self, lat, lon):
+        return (
+            math.floor(lat / self.grid_resolution),
+            math.floor(lon / self.grid_resolution) % self._columns,
+        )
+
+    @property
+    def _columns(self):
+        return math.ceil(360 / self.grid_resolution)
+
+    def _build_grid(self):
+        grid = {}
+        for row, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            if not (math.isnan(lat) or math.isnan(lon)):
+                grid.setdefault(self._cell(lat, lon), []).append(row)
+        self._grid = grid
+
+    def _ring(self, center, radius):
+        ci, cj = center
+        for di in range(-radius, radius + 1):
+            step = 1 if abs(di) == radius else 2 * radius
+            for dj in range(-radius, radius + 1, max(step, 1)):
+                yield ci + di, (cj + dj) % self._columns
+
+    def nearest(self, lat, lon):
+        if self._grid is None:
+            self._build_grid()
+        if not self._grid:
+            return None, math.inf
+
+        center = self._cell(lat, lon)
+        max_radius = max(math.ceil(180 / self.grid_resolution), self._columns // 2)
+        best_row, best_km = None, math.inf
+        for radius in range(max_radius + 1):
+            if best_row is not None:
+                # Any point beyond this ring is at least `radius - 1` cells away
+                # in latitude or in longitude (narrower near the poles).
+                reach = (radius - 1) * self.grid_resolution
+                max_lat = min(90.0, abs(lat) + best_km / KM_PER_DEGREE)
+                lon_km = reach * KM_PER_DEGREE * math.cos(math.radians(max_lat))
+                if min(reach * KM_PER_DEGREE, lon_km) > best_km:
+                    break
+            for cell in set(self._ring(center, radius)):
+                for row in self._grid.get(cell, ()):
+                    km = haversine_km(lat, lon, self.lats[row], self.lons[row])
+                    if km < best_km:
+                        best_row, best_km = row, km
+        return self._city(best_row), best_km
@@ -0,0 +1,87 @@
+import gzip
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.city_geo_coordinates.city import normalize_name
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# GeoNames "cities*.txt" / "allCountries.txt" column positions.
+NAME, ASCII_NAME, ALTERNATE_NAMES, LATITUDE, LONGITUDE = 1, 2, 3, 4, 5
+POPULATION = 14
+
+
+class Gazetteer:
+    def __init__(self, lats, lons, populations, index):
+        self.lats = lats
+        self.lons = lons
+        self.populations = populations
+        self.index = index
+
+    @classmethod
+    def from_tsv(cls, path, alternate_names=True):
+        path = Path(path)
+        opener = gzip.open if path.suffix == ".gz" else open
+
+        lats, lons, populations, index = [], [], [], {}
+        # Tier of the name each key resolves through: 0 for an official or
+        # ASCII name, 1 for an alternate name.
+        tiers = {}
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                fields = line.rstrip("\n").split("\t")
+                try:
+                    lat = float(fields[LATITUDE])
+                    lon = float(fields[LONGITUDE])
+                    population = int(fields[POPULATION] or 0)
+                except (IndexError, ValueError):
+                    logger.warning(f"Skipping malformed gazetteer line {line_no}")
+                    continue
+
+                row = len(lats)
+                lats.append(lat)
+                lons.append(lon)
+                populations.append(population)
+
+                names = dict.fromkeys(
+                    (normalize_name(fields[NAME]), normalize_name(fields[ASCII_NAME])),
+                    0,
+                )
+                if alternate_names and fields[ALTERNATE_NAMES]:
+                    for name in fields[ALTERNATE_NAMES].split(","):
+                        names.setdefault(normalize_name(name), 1)
+                for key, tier in names.items():
+                    if not key:
+                        continue
+                    # A place's own name beats another place's alternate name;
+                    # homonyms of the same tier resolve to the most populated.
+                    current = index.get(key)
+                    if (
+                        current is None
+                        or tier < tiers[key]
+                        or (tier == tiers[key] and population > populations[current])
+                    ):
+                        index[key] = row
+                        tiers[key] = tier
+
+        gazetteer = cls(
+            np.array(lats, dtype=np.float64),
+            np.array(lons, dtype=np.float64),
+            np.array(populations, dtype=np.int64),
+            index,
+        )
+        logger.info(
+            f"Loaded {len(gazetteer)} places and {len(index)} names from {path}"
+        )
+        return gazetteer
+
+    def __len__(self):
+        return len(self.lats)
+
+    def lookup(self, name):
+        row = self.index.get(normalize_name(name))
+        if row is None:
+            return None
+        return round(float(self.lats[row]), 4), round(float(self.lons[row]), 4)
@@ -0,0 +1,43 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src.utils.city_geo_coordinates.city import normalize_name
+
+
+class GeocodeCache:
+    DEFAULT_TTL = 90 * 24 * 60 * 60
+
+    def __init__(self, db_path, ttl=DEFAULT_TTL, clock=time.time):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "name TEXT PRIMARY KEY, lat REAL, lon REAL, fetched_at REAL)"
+            )
+
+    def get(self, name):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lon, fetched_at FROM geocode WHERE name = ?",
+                (normalize_name(name),),
+            ).fetchone()
+        if row is None or self.clock() - row[2] > self.ttl:
+            return None
+        return row[0], row[1]
+
+    def put(self, name, lat, lon):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)",
+                (normalize_name(name), lat, lon, self.clock()),
+            )
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,32 @@
+import math
+
+
+def _single(city):
+    return {"lat": city.get("lat"), "lon": city.get("lon"), "names": [city.get("name")]}
+
+
+def group_by_cell(cities, resolution=None):
+    if not resolution:
+        return [_single(city) for city in cities]
+
+    cells, singles = {}, []
+    for city in cities:
+        if city.get("lat") is None or city.get("lon") is None:
+            singles.append(_single(city))
+            continue
+        key = (
+            math.floor(city["lat"] / resolution),
+            math.floor(city["lon"] / resolution),
+        )
+        cells.setdefault(key, []).append(city)
+
+    # Each cell is fetched at its first city's coordinates: a city alone in
+    # its cell keeps its exact forecast, and the point is stable across runs.
+    return singles + [
+        {
+            "lat": members[0]["lat"],
+            "lon": members[0]["lon"],
+            "names": [city.get("name") for city in members],
+        }
+        for members in cells.values()
+    ]
@@ -0,0 +1,153 @@
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_PATH = (
+    Path(__file__).resolve().parents[2] / "config" / "comfort_rules.json"
+)
+
+BOUNDS = {"min": "lower", "above": "lower", "max": "upper", "below": "upper"}
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    column: str
+    lower_key: str
+    upper_key: str
+    # One row per profile: index 0 is the default profile.
+    lower: np.ndarray
+    upper: np.ndarray
+    weight: np.ndarray
+
+    def flag(self, values, profile):
+        lower = self.lower[0] if profile is None else self.lower[profile]
+        upper = self.upper[0] if profile is None else self.upper[profile]
+        result = np.ones(len(values), dtype=bool)
+        if self.lower_key == "min":
+            result &= values >= lower
+        elif self.lower_key == "above":
+            result &= values > lower
+        if self.upper_key == "max":
+            result &= values <= upper
+        elif self.upper_key == "below":
+            result &= values < upper
+        return result
+
+
+def _bounds(name, spec):
+    keys = {BOUNDS[key]: key for key in spec if key in BOUNDS}
+    if len(keys) != sum(key in BOUNDS for key in spec):
+        raise ValueError(f"Rule {name} sets the same bound twice")
+    return keys.get("lower"), keys.get("upper")
+
+
+class ComfortRules:
+    def __init__(self, config: dict):
+        flags = config["flags"]
+        self.ideal_day = list(config.get("ideal_day", []))
+        unknown = set(self.ideal_day) - set(flags)
+        if unknown:
+            raise ValueError(f"ideal_day uses unknown flags: {sorted(unknown)}")
+
+        seasons = config.get("seasons", {})
+        cities = config.get("cities", {})
+        profiles = [{}, *seasons.values(), *cities.values()]
+        self.season_months = [
+            (1 + i, season["months"]) for i, season in enumerate(seasons.values())
+        ]
+        self.city_profiles = {
+            city: 1 + len(seasons) + i for i, city in enumerate(cities)
+        }
+        self.multi_profile = len(profiles) > 1
+
+        self.rules = []
+        for name, spec in flags.items():
+            lower_key, upper_key = _bounds(name, spec)
+            lower, upper, weight = [], [], []
+            for profile in profiles:
+                override = {**spec, **profile.get("flags", {}).get(name, {})}
+                if _bounds(name, override) != (lower_key, upper_key):
+                    raise ValueError(
+                        f"Profile overrides for {name} must keep the bounds "
+                        f"{lower_key}/{upper_key}"
+                    )
+                lower.append(override.get(lower_key, -np.inf))
+                upper.append(override.get(upper_key, np.inf))
+                weight.append(override.get("weight", 0.0))
+            self.rules.append(
+                Rule(
+                    name,
+                    spec["column"],
+                    lower_key,
+                    upper_key,
+                    np.array(lower, dtype=np.float32),
+                    np.array(upper, dtype=np.float32),
+                    np.array(weight, dtype=np.float64),
+                )
+            )
+
+    @property
+    def columns(self):
+        return [rule.column for rule in self.rules]
+
+    def profiles(self, df: pd.DataFrame):
+        if not self.multi_profile:
+            return None
+
+        profile = np.zeros(len(df), dtype=np.intp)
+        if self.season_months and "timestamp" in df.columns:
+            by_month = np.zeros(13, dtype=np.intp)
+            for index, season_months in self.season_months:
+                by_month[season_months] = index
+            # Month 0 never belongs to a season: NaT rows keep the default.
+            months = pd.DatetimeIndex(df["timestamp"]).month.fillna(0)
+            months = months.to_numpy(dtype=np.intp)
+            profile = by_month[months]
+        if self.city_profiles and "city" in df.columns:
+            codes, cities = pd.factorize(df["city"])
+            by_city = np.array(
+                [self.city_profiles.get(city, -1) for city in cities] + [-1],
+                dtype=np.intp,
+            )
+            city_profile = by_city[codes]
+            matched = city_profile >= 0
+            profile[matched] = city_profile[matched]
+        return profile
+
+    def evaluate(self, df: pd.DataFrame) -> dict:
+        profile = self.profiles(df)
+        result = {}
+        score = np.zeros(len(df), dtype=np.float64)
+        for rule in self.rules:
+            values = df[rule.column].to_numpy(dtype=np.float32, na_value=np.nan)
+            flag = rule.flag(values, profile)
+            weight = rule.weight[0] if profile is None else rule.weight[profile]
+            score += weight * flag
+            result[rule.name] = flag
+
+        result["comfort_score"] = score
+        result["is_ideal_day"] = np.logical_and.reduce(
+            [np.ones(len(df), dtype=bool), *(result[name] for name in self.ideal_day)]
+        )
+        return result
+
+
+@lru_cache(maxsize=32)
+def _compile(canonical: str) -> ComfortRules:
+    return ComfortRules(json.loads(canonical))
+
+
+def compile_rules(config: dict) -> ComfortRules:
+    # Key order matters: it fixes the output columns and the score summation.
+    return _compile(json.dumps(config))
+
+
+def load_rules(path=None) -> ComfortRules:
+    path = Path(path or DEFAULT_RULES_PATH)
+    with open(path, "r", encoding="utf-8") as f:
+        return compile_rules(json.load(f))
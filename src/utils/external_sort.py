@@ -0,0 +1,367 @@
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils import schema
+from src.utils.key_index import KEY_COLUMNS
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024**2
+# Rough in-memory size of a parsed row, used to size input chunks.
+ROW_BYTES = 512
+UNITS = ["s", "ms", "us", "ns"]
+
+
+def chunk_rows(memory_budget):
+    return max(1000, int(memory_budget) // (8 * ROW_BYTES))
+
+
+def deduplicate(df: pd.DataFrame, dedupe) -> pd.DataFrame:
+    if dedupe == "rows":
+        return df.drop_duplicates(ignore_index=True)
+    if dedupe == "keys":
+        return df.drop_duplicates(subset=KEY_COLUMNS, keep="last", ignore_index=True)
+    return df
+
+
+def _key_arrays(df):
+    # (city missing, city, timestamp missing, timestamp) compares like
+    # sort_values(["city", "timestamp"]) with missing values last.
+    city = df["city"].astype(object)
+    city_na = city.isna().to_numpy()
+    timestamp = pd.to_datetime(df["timestamp"]).dt.as_unit("ns")
+    timestamp_na = timestamp.isna().to_numpy()
+    return (
+        city_na,
+        city.where(~city_na, "").to_numpy(dtype=object),
+        timestamp_na,
+        np.where(timestamp_na, 0, timestamp.to_numpy().view("int64")),
+    )
+
+
+def _key_at(arrays, position):
+    return tuple(array[position : position + 1].tolist()[0] for array in arrays)
+
+
+def _at_most(arrays, bound):
+    city_na, city, timestamp_na, timestamp = arrays
+    bound_city_na, bound_city, bound_timestamp_na, bound_timestamp = bound
+    return (city_na < bound_city_na) | (
+        (city_na == bound_city_na)
+        & (
+            (city < bound_city)
+            | (
+                (city == bound_city)
+                & (
+                    (timestamp_na < bound_timestamp_na)
+                    | (
+                        (timestamp_na == bound_timestamp_na)
+                        & (timestamp <= bound_timestamp)
+                    )
+                )
+            )
+        )
+    )
+
+
+def sort_frame(df: pd.DataFrame) -> pd.DataFrame:
+    city_na, city, timestamp_na, timestamp = _key_arrays(df)
+    keys = pd.DataFrame(
+        {"a": city_na, "b": city, "c": timestamp_na, "d": timestamp}, copy=False
+    )
+    order = keys.sort_values(["a", "b", "c", "d"], kind="stable").index.to_numpy()
+    return df.take(order).reset_index(drop=True)
+
+
+def _key_codes(frames):
+    # Cities are coded over the union of sorted cities and timestamps as
+    # integers, both with missing values last, so keys compare as integers.
+    categories = [
+        (
+            df["city"].cat.categories
+            if isinstance(df["city"].dtype, pd.CategoricalDtype)
+            else pd.Index(df["city"].dropna().unique())
+        )
+        for df in frames
+    ]
+    cities = pd.Index(sorted(set().union(*categories)), dtype=object)
+    timestamps = [pd.to_datetime(df["timestamp"]) for df in frames]
+    # Timestamps are compared in the finest unit of the frames.
+    unit = max((timestamp.dt.unit for timestamp in timestamps), key=UNITS.index)
+    keys = []
+    for df, timestamp in zip(frames, timestamps):
+        city = df["city"]
+        if not isinstance(city.dtype, pd.CategoricalDtype):
+            city = city.astype("category")
+        mapping = np.append(cities.get_indexer(city.cat.categories), len(cities))
+        if timestamp.dt.unit != unit:
+            timestamp = timestamp.dt.as_unit(unit)
+        keys.append(
+            (
+                mapping[city.cat.codes.to_numpy()],
+                np.where(
+                    timestamp.isna().to_numpy(),
+                    np.iinfo(np.int64).max,
+                    timestamp.to_numpy().view("int64"),
+                ),
+            )
+        )
+    return keys
+
+
+def is_sorted(df: pd.DataFrame, unique=False) -> bool:
+    if len(df) < 2:
+        return True
+    ((city, timestamp),) = _key_codes([df])
+    city_step = np.diff(city)
+    compare = np.greater if unique else np.greater_equal
+    return bool(
+        (
+            (city_step > 0)
+            | ((city_step == 0) & compare(timestamp[1:], timestamp[:-1]))
+        ).all()
+    )
+
+
+def _count_before(keys, queries, side):
+    # For sorted keys and queries: how many keys sort before each query
+    # (side="right" also counts equal keys). One searchsorted per city.
+    city, timestamp = keys
+    query_city, query_timestamp = queries
+    counts = np.empty(len(query_city), dtype=np.intp)
+    if not len(query_city):
+        return counts
+    bounds = [0, *(np.flatnonzero(np.diff(query_city)) + 1), len(query_city)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        first = np.searchsorted(city, query_city[start], "left")
+        last = np.searchsorted(city, query_city[start], "right")
+        counts[start:end] = first + np.searchsorted(
+            timestamp[first:last], query_timestamp[start:end], side
+        )
+    return counts
+
+
+def merge_sorted(*frames, dedupe="keys") -> pd.DataFrame:
+    # Linear merge of frames sorted by (city, timestamp). Rows that tie keep
+    # the order of the frames, as a stable sort of their concatenation would.
+    keys = _key_codes(frames)
+    city, timestamp = keys[0]
+    order = np.arange(len(city))
+    for next_city, next_timestamp in keys[1:]:
+        positions = np.empty(len(city) + len(next_city), dtype=np.intp)
+        positions[
+            np.arange(len(city))
+            + _count_before((next_city, next_timestamp), (city, timestamp), "left")
+        ] = np.arange(len(city))
+        positions[
+            np.arange(len(next_city))
+            + _count_before((city, timestamp), (next_city, next_timestamp), "right")
+        ] = len(city) + np.arange(len(next_city))
+        order = np.concatenate([order, len(order) + np.arange(len(next_city))])[
+            positions
+        ]
+        city = np.concatenate([city, next_city])[positions]
+        timestamp = np.concatenate([timestamp, next_timestamp])[positions]
+
+    if dedupe == "keys" and len(order):
+        # Only the last row of each key is taken from the concatenation.
+        order = order[
+            np.append((city[1:] != city[:-1]) | (timestamp[1:] != timestamp[:-1]), True)
+        ]
+    df = schema.apply_schema(pd.concat(frames, ignore_index=True))
+    df = df.take(order).reset_index(drop=True)
+    return df if dedupe == "keys" else deduplicate(df, dedupe)
+
+
+class ExternalSort:
+    # Rows are buffered up to half the memory budget, then sorted,
+    # deduplicated and spilled to a temporary run file. Inputs that are
+    # already sorted become runs as they are. merged() streams a k-way merge
+    # of the runs by (city, timestamp), one key range at a time.
+
+    def __init__(self, memory_budget, dedupe="rows", temp_dir=None):
+        self.memory_budget = int(memory_budget)
+        self.dedupe = dedupe
+        self.temp_dir = Path(tempfile.mkdtemp(prefix="external-sort-", dir=temp_dir))
+        self.runs = []
+        self.pending = []
+        self.pending_bytes = 0
+        self.row_bytes = ROW_BYTES
+        self.date_examples = {}
+        self.sample = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def add(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        self._track(df)
+        size = int(df.memory_usage(deep=True).sum())
+        self.row_bytes = max(1, size // len(df))
+        self.pending.append(df)
+        self.pending_bytes += size
+        if self.pending_bytes >= self.memory_budget // 2:
+            self._spill()
+
+    def add_sorted(self, chunks) -> bool:
+        # Chunks are checked as they are written: the first one out of order
+        # sends everything back through add() to be sorted.
+        if self.pending:
+            self._spill()
+        chunks = iter(chunks)
+        path = self.temp_dir / f"sorted-{len(self.runs):05d}.pkl"
+        last_key = None
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+                edges = _key_arrays(chunk.iloc[[0, -1]])
+                if not is_sorted(chunk) or (
+                    last_key is not None and _key_at(edges, 0) < last_key
+                ):
+                    break
+                last_key = _key_at(edges, 1)
+                self._track(chunk)
+                pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+            else:
+                if last_key is not None:
+                    self.runs.append(path)
+                else:
+                    path.unlink()
+                return True
+
+        for block in self._read_run(path):
+            self.add(block)
+        path.unlink()
+        self.add(chunk)
+        for chunk in chunks:
+            self.add(chunk)
+        return False
+
+    def merged(self):
+        if not self.runs:
+            if self.pending:
+                yield self._cast(self._sorted_pending())
+            return
+
+        if self.pending:
+            self._spill()
+        yield from self._merge_runs()
+
+    def _sorted_pending(self):
+        df = schema.apply_schema(pd.concat(self.pending, ignore_index=True))
+        self.pending = []
+        self.pending_bytes = 0
+        return deduplicate(sort_frame(df), self.dedupe)
+
+    def _spill(self):
+        df = self._sorted_pending()
+        block_rows = max(256, self.memory_budget // (64 * self.row_bytes))
+        path = self.temp_dir / f"run-{len(self.runs):05d}.pkl"
+        with open(path, "wb") as f:
+            for start in range(0, len(df), block_rows):
+                pickle.dump(
+                    df.iloc[start : start + block_rows], f, pickle.HIGHEST_PROTOCOL
+                )
+        self.runs.append(path)
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def _merge_runs(self):
+        readers = [self._read_run(path) for path in self.runs]
+        buffers = [next(reader, None) for reader in readers]
+        keys = [None if df is None else _key_arrays(df) for df in buffers]
+
+        while True:
+            active = [i for i, df in enumerate(buffers) if df is not None]
+            if not active:
+                return
+            bound = min(_key_at(keys[i], len(buffers[i]) - 1) for i in active)
+
+            # Rows sharing the bound key may continue in the next block.
+            for i in active:
+                while _key_at(keys[i], len(buffers[i]) - 1) == bound:
+                    block = next(readers[i], None)
+                    if block is None:
+                        break
+                    buffers[i] = pd.concat([buffers[i], block], ignore_index=True)
+                    keys[i] = _key_arrays(buffers[i])
+
+            parts = []
+            for i in active:
+                taken = int(_at_most(keys[i], bound).sum())
+                parts.append(buffers[i].iloc[:taken])
+                if taken < len(buffers[i]):
+                    buffers[i] = buffers[i].iloc[taken:].reset_index(drop=True)
+                    keys[i] = tuple(array[taken:] for array in keys[i])
+                else:
+                    buffers[i] = next(readers[i], None)
+                    keys[i] = None if buffers[i] is None else _key_arrays(buffers[i])
+
+            # Parts are in run order, which the merge keeps on ties.
+            yield self._cast(merge_sorted(*parts, dedupe=self.dedupe))
+
+    def _track(self, df):
+        self._track_dates(df)
+        # One row per input is enough to know the dtypes a single concat
+        # would give columns that the schema does not cover.
+        self.sample = (
+            df.head(1)
+            if self.sample is None
+            else pd.concat([self.sample, df.head(1)], ignore_index=True).tail(1)
+        )
+
+    def _cast(self, df):
+        dtypes = {
+            column: dtype
+            for column, dtype in self.sample.dtypes.items()
+            if column in df.columns
+            and column not in schema.DTYPES
+            and column not in schema.DATE_COLUMNS
+            and df[column].dtype != dtype
+        }
+        return df.astype(dtypes) if dtypes else df
+
+    def _track_dates(self, df):
+        for column in df.columns:
+            if not pd.api.types.is_datetime64_any_dtype(df[column]):
+                continue
+            values = df[column].dropna()
+            if values.empty:
+                continue
+            ns = values.dt.as_unit("ns").to_numpy().view("int64")
+            examples = self.date_examples.setdefault(column, {})
+            if "time" not in examples:
+                with_time = np.flatnonzero(ns % schema.DAY_NS)
+                if len(with_time):
+                    examples["time"] = values.iloc[with_time[0]]
+            precision = np.select(
+                [ns % 10**3 != 0, ns % 10**6 != 0, ns % 10**9 != 0], [3, 2, 1], 0
+            )
+            finest = int(precision.argmax())
+            if precision[finest] > examples.get("precision", 0):
+                examples["precision"] = int(precision[finest])
+                examples["finest"] = values.iloc[finest]
+
+    def formats(self):
+        return {
+            column: [examples[name] for name in ("time", "finest") if name in examples]
+            for column, examples in self.date_examples.items()
+        }
@@ -0,0 +1,234 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.utils.openweather_schema import Forecast
+from src.utils.schema import DAILY_COLUMNS, HORIZON_COLUMNS, METRIC_COLUMNS
+
+
+class ForecastSkipped(Exception):
+    pass
+
+
+def _entry_values(entry):
+    main = entry["main"]
+    wind = entry["wind"]
+    return (
+        main["temp"],
+        main["temp_min"],
+        main["temp_max"],
+        main["feels_like"],
+        main["pressure"],
+        main["humidity"],
+        wind["speed"],
+        wind["deg"],
+        wind.get("gust"),
+        entry["clouds"]["all"],
+        entry.get("pop", 0.0),
+        entry.get("rain", {}).get("3h", 0.0),
+    )
+
+
+def _entry_weather(entry):
+    weather = entry.get("weather")
+    if not weather:
+        return None, None
+    return weather[0]["main"], weather[0]["description"]
+
+
+def _typed_entry_values(entry):
+    main = entry.main
+    wind = entry.wind
+    return (
+        main.temp,
+        main.temp_min,
+        main.temp_max,
+        main.feels_like,
+        main.pressure,
+        main.humidity,
+        wind.speed,
+        wind.deg,
+        wind.gust,
+        entry.clouds.all,
+        entry.pop,
+        (entry.rain or {}).get("3h", 0.0),
+    )
+
+
+def _typed_entry_weather(entry):
+    if not entry.weather:
+        return None, None
+    return entry.weather[0].main, entry.weather[0].description
+
+
+def _payload_parts(data):
+    if isinstance(data, Forecast):
+        return data.list, _typed_entry_values, _typed_entry_weather
+    return data.get("list", []), _entry_values, _entry_weather
+
+
+def _entry_time(entry):
+    if isinstance(entry, dict):
+        return entry["dt"], entry.get("dt_txt", "")
+    return entry.dt, entry.dt_txt
+
+
+def _read_payload(data, day_str):
+    forecasts, values, weather = _payload_parts(data)
+    if not forecasts:
+        raise ForecastSkipped("No forecast data")
+
+    rows, weathers = [], []
+    for entry in forecasts:
+        if _entry_time(entry)[1].startswith(day_str):
+            rows.append(values(entry))
+            weathers.append(weather(entry))
+    if not rows:
+        raise ForecastSkipped("No 3-hour forecasts for today")
+
+    if isinstance(data, Forecast):
+        sunrise, sunset = data.city.sunrise, data.city.sunset
+    else:
+        sunrise, sunset = data["city"]["sunrise"], data["city"]["sunset"]
+    return (
+        rows,
+        weathers,
+        datetime.fromtimestamp(sunrise),
+        datetime.fromtimestamp(sunset),
+    )
+
+
+def _group_mode(labels, group_ids, n_groups):
+    result = np.full(n_groups, None, dtype=object)
+    codes, uniques = pd.factorize(pd.Series(labels, dtype=object))
+    present = codes >= 0
+    if not present.any():
+        return result
+
+    n_uniques = len(uniques)
+    combined = group_ids[present] * n_uniques + codes[present]
+    keys, first_seen, counts = np.unique(
+        combined, return_index=True, return_counts=True
+    )
+    groups = keys // n_uniques
+
+    # Highest count wins, ties go to the label seen first (Counter semantics).
+    order = np.lexsort((first_seen, -counts, groups))
+    keys, groups = keys[order], groups[order]
+    leaders = np.r_[True, groups[1:] != groups[:-1]]
+    result[groups[leaders]] = np.asarray(uniques, dtype=object)[
+        keys[leaders] % n_uniques
+    ]
+    return result
+
+
+def aggregate_daily_forecasts(payloads: dict, now: datetime = None):
+    now = now or datetime.now()
+    day_str = now.strftime("%Y-%m-%d")
+
+    cities, sunrises, sunsets, counts = [], [], [], []
+    rows, mains, descriptions = [], [], []
+    errors = {}
+
+    for city_name, data in payloads.items():
+        try:
+            city_rows, city_weather, sunrise, sunset = _read_payload(data, day_str)
+        except Exception as e:
+            errors[city_name] = e
+            continue
+
+        cities.append(city_name)
+        sunrises.append(sunrise)
+        sunsets.append(sunset)
+        counts.append(len(city_rows))
+        rows.extend(city_rows)
+        for weather_main, weather_description in city_weather:
+            mains.append(weather_main)
+            descriptions.append(weather_description)
+
+    if not cities:
+        return pd.DataFrame(columns=DAILY_COLUMNS), errors
+
+    values = np.array(rows, dtype=np.float64)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+    n_present = np.add.reduceat(present.astype(np.int64), starts, axis=0)
+    with np.errstate(invalid="ignore"):
+        means = sums / n_present
+
+    group_ids = np.repeat(np.arange(len(cities)), counts)
+    frame = pd.DataFrame(
+        {
+            "city": cities,
+            "timestamp": now,
+            "sunrise": sunrises,
+            "sunset": sunsets,
+            **{col: means[:, i] for i, col in enumerate(METRIC_COLUMNS)},
+            "weather_main": _group_mode(mains, group_ids, len(cities)),
+            "weather_description": _group_mode(descriptions, group_ids, len(cities)),
+            "summary": None,
+            "extracted_at": now,
+        },
+        columns=DAILY_COLUMNS,
+    )
+    return frame, errors
+
+
+def split_city_csv(frame: pd.DataFrame):
+    # Serialize the whole batch once, then split it into one document per city.
+    content = frame.to_csv(index=False, lineterminator="\n")
+    header, *lines = content.rstrip("\n").split("\n")
+    for city_name, line in zip(frame["city"], lines):
+        yield city_name, f"{header}\n{line}\n"
+
+
+def flatten_forecasts(payloads: dict, issued_at: datetime = None):
+    issued_at = issued_at or datetime.now()
+
+    cities, epochs, rows, mains, descriptions = [], [], [], [], []
+    errors = {}
+
+    for city_name, data in payloads.items():
+        try:
+            forecasts, values, weather = _payload_parts(data)
+            if not forecasts:
+                raise ForecastSkipped("No forecast data")
+            city_rows = [(_entry_time(e)[0], values(e), weather(e)) for e in forecasts]
+        except Exception as e:
+            errors[city_name] = e
+            continue
+
+        for epoch, entry_values, (weather_main, weather_description) in city_rows:
+            cities.append(city_name)
+            epochs.append(epoch)
+            rows.append(entry_values)
+            mains.append(weather_main)
+            descriptions.append(weather_description)
+
+    if not cities:
+        return pd.DataFrame(columns=HORIZON_COLUMNS), errors
+
+    values = np.array(rows, dtype=np.float64)
+    epochs = np.array(epochs, dtype=np.int64)
+    # Local time like issued_at and the daily rows. Cities share the same
+    # few 3-hour slots, so only the distinct epochs are converted.
+    slots, slot_index = np.unique(epochs, return_inverse=True)
+    forecast_times = np.array(
+        [datetime.fromtimestamp(slot) for slot in slots.tolist()],
+        dtype="datetime64[us]",
+    )[slot_index]
+    frame = pd.DataFrame(
+        {
+            "city": cities,
+            "issued_at": issued_at,
+            "forecast_time": forecast_times,
+            "lead_hours": np.round((epochs - issued_at.timestamp()) / 3600, 2),
+            **{col: values[:, i] for i, col in enumerate(HORIZON_COLUMNS[4:-2])},
+            "weather_main": mains,
+            "weather_description": descriptions,
+        },
+        columns=HORIZON_COLUMNS,
+    )
+    return frame, errors
@@ -0,0 +1,105 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ["city", "timestamp"]
+INDEX_SUFFIX = ".keys.npz"
+
+
+def hash_rows(df: pd.DataFrame, columns=None) -> np.ndarray:
+    frame = df if columns is None else df[list(columns)]
+    # Hash the same instants identically whatever their resolution, and
+    # integers like the floats they become next to missing values.
+    frame = frame.assign(
+        **{
+            column: frame[column].dt.as_unit("ns")
+            for column in frame.columns
+            if pd.api.types.is_datetime64_any_dtype(frame[column])
+        },
+        **{
+            column: frame[column].astype("float64")
+            for column in frame.columns
+            if isinstance(frame[column].dtype, np.dtype)
+            and np.issubdtype(frame[column].dtype, np.integer)
+        },
+    )
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(np.uint64)
+
+
+def index_path(data_path):
+    data_path = Path(data_path)
+    return data_path.with_name(data_path.name + INDEX_SUFFIX)
+
+
+def signature(data_path):
+    stat = Path(data_path).stat()
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+
+class KeyIndex:
+    def __init__(self, keys=None, values=None, columns=None):
+        self.keys = np.empty(0, np.uint64) if keys is None else keys
+        self.values = np.empty(0, np.uint64) if values is None else values
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, keys, values=None, columns=None):
+        values = keys if values is None else values
+        # Sorting the reversed arrays makes np.unique keep the last occurrence.
+        keys, values = keys[::-1], values[::-1]
+        order = np.argsort(keys, kind="stable")
+        keys, first = np.unique(keys[order], return_index=True)
+        return cls(keys, values[order][first], columns)
+
+    def _positions(self, keys):
+        if not len(self.keys):
+            return np.zeros(len(keys), dtype=np.intp), np.zeros(len(keys), dtype=bool)
+        positions = np.searchsorted(self.keys, keys)
+        clipped = np.minimum(positions, len(self.keys) - 1)
+        found = (positions < len(self.keys)) & (self.keys[clipped] == keys)
+        return clipped, found
+
+    def contains(self, keys) -> np.ndarray:
+        return self._positions(keys)[1]
+
+    def changed(self, keys, values=None) -> np.ndarray:
+        positions, found = self._positions(keys)
+        if values is None or not len(self.keys):
+            return ~found
+        return ~found | (self.values[positions] != values)
+
+    def update(self, keys, values=None):
+        values = keys if values is None else values
+        merged = KeyIndex.build(
+            np.concatenate([self.keys, keys]), np.concatenate([self.values, values])
+        )
+        self.keys, self.values = merged.keys, merged.values
+        return self
+
+    def save(self, data_path):
+        path = index_path(data_path)
+        meta = {"columns": list(self.columns), "source": signature(data_path)}
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(f, keys=self.keys, values=self.values, meta=json.dumps(meta))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, data_path, columns=None):
+        # An index is only trusted for the exact file it was written for.
+        try:
+            with np.load(index_path(data_path), allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if columns is not None and meta["columns"] != list(columns):
+                    return None
+                if meta["source"] != signature(data_path):
+                    return None
+                return cls(data["keys"], data["values"], meta["columns"])
+        except (OSError, KeyError, ValueError):
+            return None
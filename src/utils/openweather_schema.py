@@ -0,0 +1,101 @@
+import json
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@dataclass(slots=True)
+class Main:
+    temp: Optional[float] = None
+    temp_min: Optional[float] = None
+    temp_max: Optional[float] = None
+    feels_like: Optional[float] = None
+    pressure: Optional[float] = None
+    humidity: Optional[float] = None
+
+
+@dataclass(slots=True)
+class Wind:
+    speed: Optional[float] = None
+    deg: Optional[float] = None
+    gust: Optional[float] = None
+
+
+@dataclass(slots=True)
+class Clouds:
+    all: Optional[float] = None
+
+
+@dataclass(slots=True)
+class Weather:
+    main: Optional[str] = None
+    description: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ForecastEntry:
+    main: Main
+    wind: Wind
+    clouds: Clouds
+    dt: int = 0
+    dt_txt: str = ""
+    weather: List[Weather] = field(default_factory=list)
+    pop: float = 0.0
+    rain: Optional[Dict[str, float]] = None
+
+
+@dataclass(slots=True)
+class CityInfo:
+    sunrise: int
+    sunset: int
+
+
+@dataclass(slots=True)
+class Forecast:
+    list: List[ForecastEntry] = field(default_factory=list)
+    city: Optional[CityInfo] = None
+
+
+def _pick(cls, data):
+    return cls(**{f.name: data[f.name] for f in fields(cls) if f.name in data})
+
+
+def _entry_from_dict(data):
+    return ForecastEntry(
+        main=_pick(Main, data["main"]),
+        wind=_pick(Wind, data["wind"]),
+        clouds=_pick(Clouds, data["clouds"]),
+        dt=data.get("dt", 0),
+        dt_txt=data.get("dt_txt", ""),
+        weather=[_pick(Weather, w) for w in data.get("weather") or []],
+        pop=data.get("pop", 0.0),
+        rain=data.get("rain"),
+    )
+
+
+def forecast_from_dict(data: dict) -> Forecast:
+    city = data.get("city")
+    return Forecast(
+        list=[_entry_from_dict(e) for e in data.get("list") or []],
+        city=_pick(CityInfo, city) if city is not None else None,
+    )
+
+
+_decoder = msgspec.json.Decoder(Forecast) if msgspec is not None else None
+
+
+def decode_forecast(content: bytes) -> Forecast:
+    if _decoder is not None:
+        return _decoder.decode(content)
+    if orjson is not None:
+        return forecast_from_dict(orjson.loads(content))
+    return forecast_from_dict(json.loads(content))
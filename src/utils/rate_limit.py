@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=1, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last = now
+
+    def try_acquire(self):
+        with self._lock:
+            now = self.clock()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, sleep=time.sleep):
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            now = self.clock()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._last = max(self._last, self._blocked_until)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            # Half-open admits a single trial call until its outcome is recorded.
+            if self.state == self.HALF_OPEN:
+                raise CircuitOpenError("Circuit half-open: waiting for a trial call")
+            if self.state == self.OPEN:
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(
+                        f"Circuit open after {self._failures} consecutive failures"
+                    )
+                self.state = self.HALF_OPEN
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,70 @@
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads(line):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+class RawResponseLog:
+    def __init__(self, log_dir):
+        self.log_dir = Path(log_dir)
+        self._lock = threading.Lock()
+
+    def partition(self, day_str):
+        return self.log_dir / day_str
+
+    def append(self, content: bytes, city_names, lat, lon, units="metric"):
+        fetched_at = datetime.now()
+        if b"\n" in content:
+            content = json.dumps(json.loads(content), separators=(",", ":")).encode()
+
+        header = json.dumps(
+            {
+                "city_names": list(city_names),
+                "lat": lat,
+                "lon": lon,
+                "units": units,
+                "fetched_at": fetched_at.isoformat(),
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        line = header[:-1] + b',"payload":' + content + b"}\n"
+
+        partition = self.partition(fetched_at.strftime("%Y-%m-%d"))
+        partition.mkdir(parents=True, exist_ok=True)
+        file_path = partition / f"responses-{os.getpid()}.ndjson.gz"
+
+        # One gzip member per record: a crash can only lose the record being written.
+        member = gzip.compress(line)
+        with self._lock, open(file_path, "ab") as f:
+            f.write(member)
+        return file_path
+
+    def dates(self):
+        if not self.log_dir.exists():
+            return []
+        return sorted(p.name for p in self.log_dir.iterdir() if p.is_dir())
+
+    def read_partition(self, day_str):
+        for file_path in sorted(self.partition(day_str).glob("*.ndjson.gz")):
+            yield from read_log_file(file_path)
+
+
+def read_log_file(file_path):
+    with gzip.open(file_path, "rb") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
+        except EOFError:
+            return
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ResponseCache:
+    SLOT_SECONDS = 3 * 60 * 60
+
+    def __init__(
+        self,
+        cache_dir,
+        ttl=SLOT_SECONDS,
+        max_bytes=256 * 1024 * 1024,
+        clock=time.time,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._size = None
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def forecast_slot(self, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        return int(timestamp // self.SLOT_SECONDS)
+
+    def key(self, lat, lon, units="metric", slot=None):
+        if slot is None:
+            slot = self.forecast_slot()
+        raw = json.dumps([round(float(lat), 4), round(float(lon), 4), units, slot])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        now = self.clock()
+        if now - stat.st_mtime > self.ttl:
+            self._remove(path)
+            return None
+
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        os.utime(path, (now, stat.st_mtime))
+        return content
+
+    def put(self, key, content: bytes):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(content)
+        now = self.clock()
+        os.utime(tmp_path, (now, now))
+
+        with self._lock:
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            self._size = self._current_size() + len(content) - previous
+        self._evict()
+
+    def _entries(self):
+        return list(self.cache_dir.glob("*/*.json"))
+
+    def _current_size(self):
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self._entries())
+        return self._size
+
+    def _remove(self, path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _evict(self):
+        if self._current_size() <= self.max_bytes:
+            return
+
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._size = total
+        logger.info(f"Evicted {evicted} cached responses from {self.cache_dir}")
@@ -0,0 +1,47 @@
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+class RunManifest:
+    DONE = "done"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def status(self, city_name):
+        return self.entries.get(city_name, {}).get("status")
+
+    def failed(self):
+        return sorted(
+            name
+            for name, entry in self.entries.items()
+            if entry["status"] == self.FAILED
+        )
+
+    def mark_many(self, statuses: dict):
+        now = datetime.now().isoformat()
+        with self._lock:
+            for city_name, (status, error) in statuses.items():
+                self.entries[city_name] = {
+                    "status": status,
+                    "error": str(error) if error is not None else None,
+                    "updated_at": now,
+                }
+            self._write()
+
+    def _write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
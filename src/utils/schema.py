@@ -0,0 +1,171 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+METRIC_COLUMNS = [
+    "temp_C",
+    "temp_min_C",
+    "temp_max_C",
+    "feels_like_C",
+    "pressure",
+    "humidity",
+    "wind_speed",
+    "wind_deg",
+    "wind_gust",
+    "cloudiness",
+    "precipitation_prob",
+    "rain_1d",
+]
+
+DAILY_COLUMNS = [
+    "city",
+    "timestamp",
+    "sunrise",
+    "sunset",
+    *METRIC_COLUMNS,
+    "weather_main",
+    "weather_description",
+    "summary",
+    "extracted_at",
+]
+
+FLAG_COLUMNS = [
+    "is_ideal_temp",
+    "is_low_rain",
+    "is_low_wind",
+    "is_ideal_humidity",
+]
+
+READY_COLUMNS = [
+    *DAILY_COLUMNS,
+    *FLAG_COLUMNS,
+    "comfort_score",
+    "is_ideal_day",
+    "month",
+    "year",
+    "day_of_week",
+]
+
+HORIZON_COLUMNS = [
+    "city",
+    "issued_at",
+    "forecast_time",
+    "lead_hours",
+    *METRIC_COLUMNS[:-1],
+    "rain_3h",
+    "weather_main",
+    "weather_description",
+]
+
+CATEGORY_COLUMNS = [
+    "city",
+    "weather_main",
+    "weather_description",
+    "month",
+    "day_of_week",
+]
+DATE_COLUMNS = ["timestamp", "sunrise", "sunset", "extracted_at"]
+DAY_NS = 86_400 * 10**9
+
+DTYPES = {
+    **{column: "category" for column in CATEGORY_COLUMNS},
+    **{column: "float32" for column in METRIC_COLUMNS},
+    **{column: "boolean" for column in [*FLAG_COLUMNS, "is_ideal_day"]},
+    "comfort_score": "float64",
+    "year": "Int16",
+    "summary": "string",
+}
+
+NULLABLE_DTYPES = {"boolean", "Int16"}
+# Below this size the Arrow parser's setup costs more than it saves.
+ARROW_MIN_BYTES = 1 << 18
+
+
+def read_options(columns):
+    columns = list(columns)
+    return {
+        # The C parser is slow on nullable dtypes: those are cast after reading.
+        "dtype": {
+            column: DTYPES[column]
+            for column in columns
+            if column in DTYPES and DTYPES[column] not in NULLABLE_DTYPES
+        },
+        "parse_dates": [column for column in DATE_COLUMNS if column in columns],
+        # One format for the whole column: inference from the first value
+        # gives up on mixed precisions such as "12:00:00" and "12:00:00.25".
+        "date_format": "ISO8601",
+    }
+
+
+def read_csv(path, usecols=None, **kwargs) -> pd.DataFrame:
+    if (
+        pyarrow is not None
+        and usecols is None
+        and not kwargs
+        and os.path.getsize(path) >= ARROW_MIN_BYTES
+    ):
+        try:
+            return _read_arrow(path)
+        except ValueError:
+            # The C parser handles what Arrow cannot, or raises the same error.
+            pass
+    # The pipeline's files carry every date column, so the header is only
+    # read up front when they do not.
+    if usecols is not None:
+        wanted = set(usecols)
+        kwargs["usecols"] = lambda column: column in wanted
+    dates = [column for column in DATE_COLUMNS if usecols is None or column in wanted]
+    options = {**read_options(DTYPES), "parse_dates": dates}
+    try:
+        df = pd.read_csv(path, encoding="utf-8", **options, **kwargs)
+    except ValueError:
+        columns = pd.read_csv(path, nrows=0, encoding="utf-8").columns
+        if all(column in columns for column in dates):
+            raise
+        if usecols is not None:
+            columns = [column for column in columns if column in wanted]
+        df = pd.read_csv(path, encoding="utf-8", **read_options(columns), **kwargs)
+    return apply_schema(df)
+
+
+def _read_arrow(path):
+    # The Arrow parser is multithreaded, and converts the dates as it reads.
+    dtype = {
+        **read_options(DTYPES)["dtype"],
+        **{column: "datetime64[us]" for column in DATE_COLUMNS},
+    }
+    return apply_schema(
+        pd.read_csv(path, engine="pyarrow", encoding="utf-8", dtype=dtype)
+    )
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    # Concatenating categoricals with different categories falls back to object.
+    dtypes = {
+        column: dtype
+        for column, dtype in DTYPES.items()
+        if column in df.columns and str(df[column].dtype) != dtype
+    }
+    if dtypes:
+        # DataFrame.astype copies every column, assign only the cast ones.
+        df = df.assign(
+            **{column: df[column].astype(dtype) for column, dtype in dtypes.items()}
+        )
+    # read_csv unions the categories of its internal chunks without sorting
+    # them, and sort_values orders categoricals by their categories.
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+            categories = df[column].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[column] = df[column].cat.reorder_categories(categories.sort_values())
+    for column in DATE_COLUMNS:
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(
+            df[column]
+        ):
+            df[column] = pd.to_datetime(df[column], errors="coerce", format="mixed")
+    return df
@@ -0,0 +1,663 @@
+import io
+import json
+import operator
+import os
+import shutil
+from itertools import chain
+from pathlib import Path
+
+import pandas as pd
+
+from src.utils import external_sort, schema
+from src.utils.key_index import KEY_COLUMNS, signature
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+PARQUET_AVAILABLE = pyarrow is not None
+DEFAULT_BACKEND = "parquet" if PARQUET_AVAILABLE else "csv"
+SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "segments": ".segments"}
+SORTED_SUFFIX = ".sorted.json"
+REBUILT_SUFFIX = ".rebuilt.json"
+CSV_CELLS = 100_000
+
+FILTER_OPS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda series, value: series.isin(value),
+    "not in": lambda series, value: ~series.isin(value),
+}
+
+
+def _filter_groups(filters):
+    if not filters:
+        return []
+    if isinstance(filters[0], tuple):
+        return [filters]
+    return filters
+
+
+def filter_columns(filters):
+    return list(
+        dict.fromkeys(
+            column for group in _filter_groups(filters) for column, _, _ in group
+        )
+    )
+
+
+def apply_filters(df: pd.DataFrame, filters) -> pd.DataFrame:
+    groups = _filter_groups(filters)
+    if not groups:
+        return df
+
+    mask = pd.Series(False, index=df.index)
+    for group in groups:
+        group_mask = pd.Series(True, index=df.index)
+        for column, op, value in group:
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype(series.cat.categories.dtype)
+            group_mask &= FILTER_OPS[op](series, value).fillna(False).astype(bool)
+        mask |= group_mask
+    return df[mask].reset_index(drop=True)
+
+
+def date_resolution(values: pd.Series):
+    # pandas writes dates without a time when all are midnight, else with as
+    # many sub-second digits as the most precise value needs.
+    ns = values.dropna().dt.as_unit("ns").to_numpy().view("int64")
+    for digits, unit in ((9, 10**3), (6, 10**6), (3, 10**9)):
+        if (ns % unit != 0).any():
+            return True, digits
+    return bool((ns % schema.DAY_NS != 0).any()), 0
+
+
+def format_dates(df: pd.DataFrame, date_examples) -> pd.DataFrame:
+    # pandas picks one text format per datetime column (date only, seconds or
+    # sub-seconds). Formatting a chunk alongside examples of the whole column
+    # keeps a chunked CSV identical to a single write.
+    formatted = {}
+    for column, examples in (date_examples or {}).items():
+        if column not in df.columns or not examples:
+            continue
+        examples = pd.Series(examples, dtype=df[column].dtype)
+        if date_resolution(df[column]) >= date_resolution(examples):
+            continue
+        values = pd.concat([df[column], examples], ignore_index=True)
+        formatted[column] = values.astype(str).iloc[: len(df)].to_numpy()
+    return df.assign(**formatted) if formatted else df
+
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def _csv_parts(chunks):
+    # Each chunk is exported on its own, with its header: only one chunk is
+    # held as CSV text at a time.
+    for chunk in chunks:
+        yield io.StringIO(chunk.to_csv(index=False))
+
+
+def _link(source, target):
+    # A hard link shares the data instead of copying it: a plain copy is only
+    # made across file systems. Sharing is safe because writes never change
+    # a file in place, they replace it.
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _swap(temp_path, path):
+    # Directories cannot be replaced in one rename: the previous one is
+    # kept aside until the new one is in place, and restored by _recover.
+    old_path = path.with_name(path.name + ".old")
+    _remove(old_path)
+    if path.exists():
+        path.rename(old_path)
+    temp_path.rename(path)
+    _remove(old_path)
+
+
+def _recover(path):
+    old_path = path.with_name(path.name + ".old")
+    if not path.exists() and old_path.exists():
+        old_path.rename(path)
+
+
+class CsvStorage:
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def exists(self):
+        return self.path.exists()
+
+    def read(self, columns=None, filters=None) -> pd.DataFrame:
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys([*columns, *filter_columns(filters)]))
+        df = apply_filters(schema.read_csv(self.path, usecols=usecols), filters)
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return df
+
+    def columns(self):
+        return list(pd.read_csv(self.path, nrows=0, encoding="utf-8").columns)
+
+    def write(self, df: pd.DataFrame):
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        df.to_csv(temp_path, index=False, encoding="utf-8")
+        os.replace(temp_path, self.path)
+
+    def iter_chunks(self, rows):
+        with pd.read_csv(
+            self.path,
+            encoding="utf-8",
+            chunksize=rows,
+            **schema.read_options(self.columns()),
+        ) as reader:
+            for chunk in reader:
+                yield schema.apply_schema(chunk)
+
+    def write_chunks(self, chunks, date_examples=None):
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        written = False
+        with open(temp_path, "w", encoding="utf-8", newline="") as f:
+            for chunk in chunks:
+                rows = max(1, CSV_CELLS // max(1, len(chunk.columns)))
+                for start in range(0, len(chunk), rows):
+                    # to_csv formats dates slice by slice: each part is one slice.
+                    part = format_dates(chunk.iloc[start : start + rows], date_examples)
+                    part.to_csv(f, index=False, header=not written, chunksize=len(part))
+                    written = True
+        if not written:
+            temp_path.unlink()
+            return False
+        os.replace(temp_path, self.path)
+        return True
+
+    def iter_csv(self, rows):
+        with open(self.path, "r", encoding="utf-8") as f:
+            yield f
+
+
+class ParquetStorage:
+    COLUMNS_FILE = "_columns.json"
+
+    def __init__(self, path, partition_cols=()):
+        self.path = Path(path)
+        self.partition_cols = list(partition_cols)
+        _recover(self.path)
+
+    def exists(self):
+        return self.path.exists()
+
+    def read(self, columns=None, filters=None) -> pd.DataFrame:
+        self._require_pyarrow()
+        dataset = pyarrow.dataset.dataset(
+            self.path, format="parquet", partitioning="hive"
+        )
+        groups = _filter_groups(filters)
+        expression = pyarrow.parquet.filters_to_expression(groups) if groups else None
+        table = dataset.to_table(columns=columns, filter=expression)
+        # The schema restores the dtypes: the pandas metadata does not cover
+        # partition columns.
+        df = table.to_pandas(ignore_metadata=True)
+        return self._restore(df, columns)
+
+    def columns(self):
+        try:
+            return json.loads(
+                (self.path / self.COLUMNS_FILE).read_text(encoding="utf-8")
+            )
+        except OSError:
+            self._require_pyarrow()
+            dataset = pyarrow.dataset.dataset(
+                self.path, format="parquet", partitioning="hive"
+            )
+            return list(dataset.schema.names)
+
+    def write(self, df: pd.DataFrame):
+        self._require_pyarrow()
+        partition_cols = [column for column in self.partition_cols if column in df]
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        _remove(temp_path)
+        temp_path.mkdir(parents=True)
+
+        if partition_cols:
+            df.to_parquet(
+                temp_path,
+                engine="pyarrow",
+                index=False,
+                partition_cols=partition_cols,
+            )
+        else:
+            df.to_parquet(temp_path / "part-0.parquet", engine="pyarrow", index=False)
+        self._replace(temp_path, df.columns)
+
+    def iter_chunks(self, rows):
+        self._require_pyarrow()
+        dataset = pyarrow.dataset.dataset(
+            self.path, format="parquet", partitioning="hive"
+        )
+        for batch in dataset.to_batches(batch_size=rows):
+            if batch.num_rows:
+                df = batch.to_pandas(ignore_metadata=True)
+                yield self._restore(df, None, sort=False)
+
+    def write_chunks(self, chunks, date_examples=None):
+        self._require_pyarrow()
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if first is None:
+            return False
+
+        # Every batch is cast to the first one's schema, with categoricals
+        # stored as plain strings since their dictionaries differ per chunk.
+        table = pyarrow.Table.from_pandas(first, preserve_index=False)
+        arrow_schema = pyarrow.schema(
+            [
+                (
+                    field.with_type(field.type.value_type)
+                    if pyarrow.types.is_dictionary(field.type)
+                    else field
+                )
+                for field in table.schema
+            ]
+        )
+
+        def batches():
+            for chunk in chain([first], chunks):
+                yield from pyarrow.Table.from_pandas(chunk, preserve_index=False).cast(
+                    arrow_schema
+                ).to_batches()
+
+        partition_cols = [column for column in self.partition_cols if column in first]
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        _remove(temp_path)
+        pyarrow.dataset.write_dataset(
+            batches(),
+            temp_path,
+            schema=arrow_schema,
+            format="parquet",
+            partitioning=partition_cols or None,
+            partitioning_flavor="hive" if partition_cols else None,
+            basename_template="part-{i}.parquet",
+            preserve_order=True,
+        )
+        self._replace(temp_path, first.columns)
+        return True
+
+    def _replace(self, temp_path, columns):
+        (temp_path / self.COLUMNS_FILE).write_text(
+            json.dumps(list(columns)), encoding="utf-8"
+        )
+        _swap(temp_path, self.path)
+
+    def iter_csv(self, rows):
+        return _csv_parts(self.iter_chunks(rows))
+
+    def _restore(self, df, columns, sort=True):
+        # Partition columns come back last and as dictionaries in path order.
+        if columns is None:
+            columns = self.columns()
+        df = df[[column for column in columns if column in df.columns]]
+
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                categories = df[column].cat.categories
+                df[column] = df[column].cat.reorder_categories(sorted(categories))
+        df = schema.apply_schema(df)
+
+        if sort and {"city", "timestamp"} <= set(df.columns):
+            df = df.sort_values(["city", "timestamp"], kind="stable")
+        return df.reset_index(drop=True)
+
+    @staticmethod
+    def _require_pyarrow():
+        if pyarrow is None:
+            raise ImportError("The parquet storage backend requires pyarrow.")
+
+
+class SegmentStorage:
+    # A directory of immutable segments, each sorted by (city, timestamp)
+    # with one row per key, listed by numbered manifests. A key in a later
+    # segment overrides the earlier ones. Readers keep the manifest they
+    # opened, and the segments of the last KEEP_VERSIONS manifests are kept.
+    FORMAT = DEFAULT_BACKEND
+    KEEP_VERSIONS = 2
+    MAX_SEGMENTS = 16
+
+    def __init__(self, path, version=None):
+        self.path = Path(path)
+        self.version = version
+        self.meta = {}
+        self._manifest = None
+
+    def exists(self):
+        return bool(self._versions())
+
+    def manifest(self):
+        if self._manifest is None:
+            versions = self._versions()
+            if not versions:
+                return {"version": 0, "columns": [], "segments": [], "meta": {}}
+            self._manifest = json.loads(
+                self._manifest_path(self.version or versions[-1]).read_text(
+                    encoding="utf-8"
+                )
+            )
+        return self._manifest
+
+    def columns(self):
+        return self.manifest()["columns"]
+
+    def read(self, columns=None, filters=None) -> pd.DataFrame:
+        # Overrides are resolved before filtering, so only the latest version
+        # of a row can match.
+        usecols = None
+        if columns is not None:
+            usecols = list(
+                dict.fromkeys([*KEY_COLUMNS, *columns, *filter_columns(filters)])
+            )
+        frames = [
+            self._segment(segment).read(usecols)
+            for segment in self.manifest()["segments"]
+        ]
+        if not frames:
+            df = schema.apply_schema(pd.DataFrame(columns=usecols or self.columns()))
+        elif len(frames) == 1:
+            df = frames[0]
+        else:
+            df = external_sort.merge_sorted(*frames)
+        df = apply_filters(df, filters)
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return df.reset_index(drop=True)
+
+    def iter_chunks(self, rows):
+        segments = self.manifest()["segments"]
+        if len(segments) == 1:
+            yield from self._segment(segments[0]).iter_chunks(rows)
+            return
+        with external_sort.ExternalSort(
+            rows * 8 * external_sort.ROW_BYTES, "keys", self.path.parent
+        ) as sorter:
+            for segment in segments:
+                sorter.add_sorted(self._segment(segment).iter_chunks(rows))
+            yield from sorter.merged()
+
+    def write(self, df: pd.DataFrame):
+        self.write_chunks([df])
+
+    def write_chunks(self, chunks, date_examples=None):
+        version = self._latest()["version"] + 1
+        segment = self._write_segment(chunks, version, date_examples)
+        if segment is None:
+            return False
+        self._commit(version, [segment], self._segment(segment).columns(), {})
+        return True
+
+    def append(self, df: pd.DataFrame):
+        # Only the new segment is written: the others are shared with the
+        # previous version.
+        manifest = self._latest()
+        if manifest["segments"] and list(df.columns) != manifest["columns"]:
+            raise ValueError("Schema mismatch: columns do not align.")
+        version = manifest["version"] + 1
+        segment = self._write_segment([df], version)
+        if segment is None:
+            return False
+        self._commit(
+            version,
+            [*manifest["segments"], segment],
+            manifest["columns"] or list(df.columns),
+            manifest["meta"],
+        )
+        return True
+
+    def compact(self, full=False, memory_budget=external_sort.DEFAULT_MEMORY_BUDGET):
+        # Tail segments are merged once they hold as many rows as the segment
+        # before them, so each row is rewritten a logarithmic number of times.
+        manifest = self._latest()
+        segments = manifest["segments"]
+        start = 0 if full else len(segments) - 1
+        tail_rows = sum(segment["rows"] for segment in segments[start:])
+        while start > 0 and (
+            tail_rows >= segments[start - 1]["rows"] or start >= self.MAX_SEGMENTS
+        ):
+            start -= 1
+            tail_rows += segments[start]["rows"]
+        if len(segments) - start < 2:
+            return False
+
+        version = manifest["version"] + 1
+        with external_sort.ExternalSort(
+            memory_budget, "keys", self.path.parent
+        ) as sorter:
+            for segment in segments[start:]:
+                sorter.add_sorted(
+                    self._segment(segment).iter_chunks(
+                        external_sort.chunk_rows(memory_budget)
+                    )
+                )
+            merged = self._write_segment(sorter.merged(), version, sorter.formats())
+        self._commit(
+            version,
+            [*segments[:start], merged],
+            manifest["columns"],
+            manifest["meta"],
+        )
+        return True
+
+    def link(self, source):
+        # The segments of another store become the next version of this one,
+        # so readers of the previous version are not disturbed.
+        snapshot = source.manifest()
+        version = self._latest()["version"] + 1
+        self.path.mkdir(parents=True, exist_ok=True)
+        segments = []
+        for number, segment in enumerate(snapshot["segments"]):
+            path = source.path / segment["name"]
+            name = f"segment-{version:06d}-{number:03d}{path.suffix}"
+            if path.is_dir():
+                shutil.copytree(path, self.path / name, copy_function=_link)
+            else:
+                _link(path, self.path / name)
+            segments.append({"name": name, "rows": segment["rows"]})
+        self._commit(version, segments, snapshot["columns"], {})
+
+    def iter_csv(self, rows):
+        return _csv_parts(self.iter_chunks(rows))
+
+    def _versions(self):
+        if not self.path.is_dir():
+            return []
+        return sorted(
+            int(path.stem.split("-")[1]) for path in self.path.glob("manifest-*.json")
+        )
+
+    def _manifest_path(self, version):
+        return self.path / f"manifest-{version:06d}.json"
+
+    def _latest(self):
+        self.version = None
+        self._manifest = None
+        return self.manifest()
+
+    def _segment(self, segment):
+        return get_storage(self.path / segment["name"])
+
+    def _write_segment(self, chunks, version, date_examples=None):
+        self.path.mkdir(parents=True, exist_ok=True)
+        name = f"segment-{version:06d}{SUFFIXES[self.FORMAT]}"
+        target = get_storage(self.path / name)
+        rows, ordered = self._write_checked(target, chunks, date_examples)
+        if not rows:
+            return None
+        if not ordered:
+            # Unsorted input is sorted, one row per key, through temporary runs.
+            with external_sort.ExternalSort(
+                external_sort.DEFAULT_MEMORY_BUDGET, "keys", self.path.parent
+            ) as sorter:
+                for chunk in target.iter_chunks(
+                    external_sort.chunk_rows(sorter.memory_budget)
+                ):
+                    sorter.add(chunk)
+                rows, _ = self._write_checked(target, sorter.merged(), date_examples)
+        return {"name": name, "rows": rows}
+
+    @staticmethod
+    def _write_checked(target, chunks, date_examples):
+        rows, ordered, last = 0, True, None
+
+        def checked():
+            nonlocal rows, ordered, last
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+                edge = (
+                    chunk.iloc[[0]]
+                    if last is None
+                    else pd.concat([last, chunk.iloc[[0]]])
+                )
+                ordered = (
+                    ordered
+                    and external_sort.is_sorted(edge, unique=True)
+                    and external_sort.is_sorted(chunk, unique=True)
+                )
+                last = chunk.iloc[[-1]]
+                rows += len(chunk)
+                yield chunk
+
+        if not target.write_chunks(checked(), date_examples):
+            return 0, True
+        return rows, ordered
+
+    def _commit(self, version, segments, columns, meta):
+        manifest = {
+            "version": version,
+            "columns": list(columns),
+            "segments": segments,
+            "meta": {**meta, **self.meta},
+        }
+        path = self._manifest_path(version)
+        temp_path = path.with_name(path.name + ".tmp")
+        temp_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(temp_path, path)
+        self._manifest = manifest
+        self._collect()
+
+    def _collect(self):
+        # Older manifests are dropped with the segments that only they list,
+        # along with anything left over by an interrupted write.
+        versions = self._versions()
+        kept = set()
+        for version in versions[-self.KEEP_VERSIONS :]:
+            manifest = json.loads(self._manifest_path(version).read_text("utf-8"))
+            kept.update(segment["name"] for segment in manifest["segments"])
+        for version in versions[: -self.KEEP_VERSIONS]:
+            self._manifest_path(version).unlink()
+        for path in self.path.glob("segment-*"):
+            if path.name not in kept:
+                _remove(path)
+
+
+def get_storage(path):
+    if Path(path).suffix == SUFFIXES["parquet"]:
+        return ParquetStorage(path)
+    if Path(path).suffix == SUFFIXES["segments"]:
+        return SegmentStorage(path)
+    return CsvStorage(path)
+
+
+def copy(source, target, rows=100_000):
+    # Within a format nothing is rewritten: the target is published with
+    # hard links to the source's files, in one rename or one manifest.
+    source, target = Path(source), Path(target)
+    if source.suffix != target.suffix:
+        get_storage(target).write_chunks(get_storage(source).iter_chunks(rows))
+        return
+    if source.suffix == SUFFIXES["segments"]:
+        SegmentStorage(target).link(SegmentStorage(source))
+        return
+    temp_path = target.with_name(target.name + ".tmp")
+    _remove(temp_path)
+    if source.is_dir():
+        shutil.copytree(source, temp_path, copy_function=_link)
+        _swap(temp_path, target)
+    else:
+        _link(source, temp_path)
+        os.replace(temp_path, target)
+
+
+def _sorted_path(path):
+    path = Path(path)
+    return path.with_name(path.name + SORTED_SUFFIX)
+
+
+def sorted_by(path):
+    # Like the key index, the sort order is only trusted for the exact file
+    # it was recorded for.
+    try:
+        meta = json.loads(_sorted_path(path).read_text(encoding="utf-8"))
+        if meta["source"] != signature(path):
+            return None
+        return meta["sorted_by"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def mark_sorted(path, columns):
+    _write_json(
+        _sorted_path(path), {"sorted_by": list(columns), "source": signature(path)}
+    )
+
+
+def _rebuilt_path(path):
+    path = Path(path)
+    return path.with_name(path.name + REBUILT_SUFFIX)
+
+
+def rebuilt(path):
+    # Appends only add or update rows: a dataset loses rows when it is
+    # rebuilt, and datasets derived from it must then be rebuilt too.
+    try:
+        return json.loads(_rebuilt_path(path).read_text(encoding="utf-8"))["source"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def mark_rebuilt(path):
+    _write_json(_rebuilt_path(path), {"source": signature(path)})
+
+
+def _write_json(path, data):
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+def data_path(path, backend="csv"):
+    return Path(path).with_suffix(SUFFIXES[backend])
+
+
+def resolve(path):
+    path = Path(path)
+    fallback = path.with_suffix(SUFFIXES["csv"])
+    if not path.exists() and fallback.exists():
+        return fallback
+    return path
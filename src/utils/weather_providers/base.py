@@ -0,0 +1,37 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+_hooks = threading.local()
+
+
+class WeatherProvider(ABC):
+    name = "provider"
+    # Providers that queue before sending (e.g. for a rate limit token) call
+    # sent() when the request actually leaves.
+    reports_send = False
+
+    @abstractmethod
+    def fetch(self, lat, lon, units="metric") -> bytes:
+        pass
+
+    def fetch_json(self, lat, lon, units="metric") -> dict:
+        return json.loads(self.fetch(lat, lon, units))
+
+    def sent(self):
+        callback = getattr(_hooks, "on_send", None)
+        if callback is not None:
+            callback()
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def on_send(callback):
+    _hooks.on_send = callback
+    try:
+        yield
+    finally:
+        _hooks.on_send = None
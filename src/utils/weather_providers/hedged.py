@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from src.utils.logger import get_logger
+from src.utils.weather_providers.base import WeatherProvider, on_send
+
+logger = get_logger(__name__)
+
+
+class HedgedProvider(WeatherProvider):
+    name = "hedged"
+
+    def __init__(
+        self,
+        primary: WeatherProvider,
+        secondary: WeatherProvider,
+        percentile=95,
+        min_samples=20,
+        default_delay=2.0,
+        window=200,
+        max_workers=16,
+        clock=time.monotonic,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.clock = clock
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self._executor = None
+
+    def hedge_delay(self):
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.default_delay
+            return float(np.percentile(self._latencies, self.percentile))
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hedge"
+                )
+            return self._executor.submit(fn, *args)
+
+    def _timed(self, lat, lon, units, sent):
+        start = []
+
+        def mark():
+            if not start:
+                start.append(self.clock())
+                sent.set()
+
+        if not self.primary.reports_send:
+            mark()
+        try:
+            with on_send(mark):
+                content = self.primary.fetch(lat, lon, units)
+        finally:
+            sent.set()
+        if start:
+            with self._lock:
+                self._latencies.append(self.clock() - start[0])
+        return content
+
+    def fetch(self, lat, lon, units="metric") -> bytes:
+        # Waiting for a rate limit token is not latency: the hedge clock only
+        # starts once the primary request is sent.
+        sent = threading.Event()
+        primary = self._submit(self._timed, lat, lon, units, sent)
+        sent.wait()
+        delay = self.hedge_delay()
+        done, _ = wait([primary], timeout=delay)
+        if done and primary.exception() is None:
+            return primary.result()
+
+        if done:
+            logger.warning(
+                f"{self.primary.name} failed for ({lat}, {lon}): "
+                f"{primary.exception()}. Falling back to {self.secondary.name}."
+            )
+        else:
+            logger.info(
+                f"{self.primary.name} slower than {delay:.2f}s for ({lat}, {lon}), "
+                f"hedging with {self.secondary.name}."
+            )
+
+        pending = {
+            primary,
+            self._submit(self.secondary.fetch, lat, lon, units),
+        }
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
@@ -0,0 +1,137 @@
+import json
+from datetime import datetime, timezone
+
+from src.utils.weather_providers.base import WeatherProvider
+
+HOURLY_FIELDS = [
+    "temperature_2m",
+    "apparent_temperature",
+    "relative_humidity_2m",
+    "pressure_msl",
+    "wind_speed_10m",
+    "wind_direction_10m",
+    "wind_gusts_10m",
+    "cloud_cover",
+    "precipitation_probability",
+    "rain",
+    "weather_code",
+]
+
+WMO_WEATHER = {
+    0: ("Clear", "clear sky"),
+    1: ("Clouds", "few clouds"),
+    2: ("Clouds", "scattered clouds"),
+    3: ("Clouds", "overcast clouds"),
+    45: ("Fog", "fog"),
+    48: ("Fog", "fog"),
+    51: ("Drizzle", "light intensity drizzle"),
+    53: ("Drizzle", "drizzle"),
+    55: ("Drizzle", "heavy intensity drizzle"),
+    56: ("Drizzle", "freezing drizzle"),
+    57: ("Drizzle", "freezing drizzle"),
+    61: ("Rain", "light rain"),
+    63: ("Rain", "moderate rain"),
+    65: ("Rain", "heavy intensity rain"),
+    66: ("Rain", "freezing rain"),
+    67: ("Rain", "freezing rain"),
+    71: ("Snow", "light snow"),
+    73: ("Snow", "snow"),
+    75: ("Snow", "heavy snow"),
+    77: ("Snow", "snow"),
+    80: ("Rain", "light intensity shower rain"),
+    81: ("Rain", "shower rain"),
+    82: ("Rain", "heavy intensity shower rain"),
+    85: ("Snow", "light shower snow"),
+    86: ("Snow", "heavy shower snow"),
+    95: ("Thunderstorm", "thunderstorm"),
+    96: ("Thunderstorm", "thunderstorm with hail"),
+    99: ("Thunderstorm", "thunderstorm with hail"),
+}
+
+UNIT_PARAMS = {
+    "metric": {"temperature_unit": "celsius", "wind_speed_unit": "ms"},
+    "imperial": {"temperature_unit": "fahrenheit", "wind_speed_unit": "mph"},
+}
+
+
+def _window(values, start, step):
+    return [v for v in values[start : start + step] if v is not None]
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+def to_openweather(data: dict, step_hours=3) -> dict:
+    hourly = data["hourly"]
+    times = hourly["time"]
+
+    entries = []
+    for i in range(0, len(times), step_hours):
+        temps = _window(hourly["temperature_2m"], i, step_hours)
+        pops = _window(hourly["precipitation_probability"], i, step_hours)
+        code = hourly["weather_code"][i]
+        weather_main, weather_description = WMO_WEATHER.get(code, (None, None))
+        entries.append(
+            {
+                "dt": times[i],
+                "dt_txt": datetime.fromtimestamp(times[i], timezone.utc).strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                ),
+                "main": {
+                    "temp": hourly["temperature_2m"][i],
+                    "temp_min": min(temps) if temps else None,
+                    "temp_max": max(temps) if temps else None,
+                    "feels_like": hourly["apparent_temperature"][i],
+                    "pressure": hourly["pressure_msl"][i],
+                    "humidity": hourly["relative_humidity_2m"][i],
+                },
+                "wind": {
+                    "speed": hourly["wind_speed_10m"][i],
+                    "deg": hourly["wind_direction_10m"][i],
+                    "gust": _mean(_window(hourly["wind_gusts_10m"], i, step_hours)),
+                },
+                "clouds": {"all": hourly["cloud_cover"][i]},
+                "weather": (
+                    [{"main": weather_main, "description": weather_description}]
+                    if weather_main is not None
+                    else []
+                ),
+                "pop": max(pops) / 100 if pops else 0.0,
+                "rain": {"3h": sum(_window(hourly["rain"], i, step_hours))},
+            }
+        )
+
+    daily = data["daily"]
+    return {
+        "list": entries,
+        "city": {"sunrise": daily["sunrise"][0], "sunset": daily["sunset"][0]},
+    }
+
+
+class OpenMeteoProvider(WeatherProvider):
+    name = "open-meteo"
+    BASE_URL = "https://api.open-meteo.com/v1/forecast"
+    REQUEST_TIMEOUT = 10
+    FORECAST_DAYS = 5
+
+    def __init__(self, session, base_url=BASE_URL):
+        self.session = session
+        self.base_url = base_url
+
+    def fetch(self, lat, lon, units="metric") -> bytes:
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "hourly": ",".join(HOURLY_FIELDS),
+            "daily": "sunrise,sunset",
+            "forecast_days": self.FORECAST_DAYS,
+            "timezone": "GMT",
+            "timeformat": "unixtime",
+            **UNIT_PARAMS[units],
+        }
+        response = self.session.get(
+            self.base_url, params=params, timeout=self.REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        return json.dumps(to_openweather(response.json())).encode("utf-8")
@@ -0,0 +1,82 @@
+import time
+
+import requests
+
+from src.utils.logger import get_logger
+from src.utils.rate_limit import backoff_delay, parse_retry_after
+from src.utils.weather_providers.base import WeatherProvider
+
+logger = get_logger(__name__)
+
+
+class OpenWeatherProvider(WeatherProvider):
+    name = "openweather"
+    reports_send = True
+    BASE_URL = "https://api.openweathermap.org/data/2.5/forecast"
+    REQUEST_TIMEOUT = 10
+    MAX_RETRIES = 4
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self, api_key, session, rate_limiter, circuit_breaker, base_url=BASE_URL
+    ):
+        self.api_key = api_key
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.base_url = base_url
+
+    def fetch(self, lat, lon, units="metric") -> bytes:
+        return self.request(lat, lon, units).content
+
+    def fetch_json(self, lat, lon, units="metric") -> dict:
+        return self.request(lat, lon, units).json()
+
+    def request(self, lat, lon, units="metric"):
+        params = {"lat": lat, "lon": lon, "appid": self.api_key, "units": units}
+        self.circuit_breaker.before_call()
+        try:
+            response = self._send(lat, lon, params)
+        except Exception:
+            self.circuit_breaker.record_failure()
+            raise
+        # The service answered: a client error does not count against it.
+        self.circuit_breaker.record_success()
+        response.raise_for_status()
+        return response
+
+    def _send(self, lat, lon, params):
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            self.sent()
+            try:
+                response = self.session.get(
+                    self.base_url, params=params, timeout=self.REQUEST_TIMEOUT
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"Request for ({lat}, {lon}) failed: {e}.")
+            else:
+                if response.status_code not in self.RETRYABLE_STATUS:
+                    return response
+
+                if attempt == self.MAX_RETRIES:
+                    response.raise_for_status()
+
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = (
+                    retry_after if retry_after is not None else backoff_delay(attempt)
+                )
+                if response.status_code == 429:
+                    self.rate_limiter.pause(delay)
+                logger.warning(
+                    f"OpenWeather answered {response.status_code} for ({lat}, {lon})."
+                )
+
+            logger.info(
+                f"Retrying ({lat}, {lon}) in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{self.MAX_RETRIES})"
+            )
+            time.sleep(delay)
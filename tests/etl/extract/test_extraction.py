@@ -1,12 +1,25 @@
 import json
 import shutil
 import tempfile
+import time
 import unittest
+from datetime import datetime
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import requests
 
 from src.core.base import Process
 from src.core.extraction import Extract
+from src.utils.openweather_schema import Forecast
+from src.utils.rate_limit import CircuitOpenError
+from src.utils.raw_log import RawResponseLog
+from src.utils.response_cache import ResponseCache
+from src.utils.run_manifest import RunManifest
+from src.utils.weather_providers.hedged import HedgedProvider
+from src.utils.weather_providers.open_meteo import OpenMeteoProvider
+from src.utils.weather_providers.open_weather import OpenWeatherProvider
 
 DUMMY_3H_FORECAST = {
     "list": [
@@ -52,7 +65,7 @@ class TestExtract(unittest.TestCase):
     def test_init_extract_class(self, mock_var):
         extractor = Extract(cities_path=self.test_city_path)
         self.assertIsInstance(extractor, Process)
-        self.assertEqual(extractor.cities[0]["name"], "Testville")
+        self.assertEqual([city.name for city in extractor.cities], ["Testville"])
 
     @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
     @patch("src.core.extraction.requests.Session.get")
@@ -73,6 +86,109 @@ class TestExtract(unittest.TestCase):
             extractor.fetch_weather(12.34, 56.78)
         self.assertIn("API error", str(context.exception))
 
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.utils.weather_providers.open_weather.time.sleep")
+    @patch("src.core.extraction.requests.Session.get")
+    def test_fetch_weather_honors_retry_after_on_429(
+        self, mock_get, mock_sleep, mock_var
+    ):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "7"})
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = DUMMY_3H_FORECAST
+        mock_get.side_effect = [throttled, ok]
+
+        extractor = Extract(cities_path=self.test_city_path)
+        with patch.object(extractor.rate_limiter, "acquire"):
+            result = extractor.fetch_weather(12.34, 56.78)
+
+        self.assertEqual(result, DUMMY_3H_FORECAST)
+        mock_sleep.assert_called_once_with(7.0)
+        self.assertGreater(extractor.rate_limiter.try_acquire(), 0)
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.utils.weather_providers.open_weather.time.sleep")
+    @patch("src.core.extraction.requests.Session.get")
+    def test_fetch_weather_opens_circuit_after_exhausted_retries(
+        self, mock_get, mock_sleep, mock_var
+    ):
+        mock_get.side_effect = requests.ConnectionError("connection reset")
+        extractor = Extract(cities_path=self.test_city_path)
+        extractor.circuit_breaker.failure_threshold = 1
+
+        with patch.object(extractor.rate_limiter, "acquire"):
+            with self.assertRaises(requests.ConnectionError):
+                extractor.fetch_weather(12.34, 56.78)
+            with self.assertRaises(CircuitOpenError):
+                extractor.fetch_weather(12.34, 56.78)
+
+        self.assertEqual(mock_get.call_count, Extract.MAX_RETRIES + 1)
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    def test_fetch_weather_uses_hedged_secondary_when_primary_is_slow(self, mock_var):
+        primary, secondary = MagicMock(name="primary"), MagicMock(name="secondary")
+        primary.reports_send = False
+        primary.fetch.side_effect = lambda *args: time.sleep(0.5) or b"{}"
+        secondary.fetch.return_value = json.dumps(DUMMY_3H_FORECAST).encode()
+        extractor = Extract(
+            cities_path=self.test_city_path,
+            provider=HedgedProvider(primary, secondary, default_delay=0.05),
+        )
+
+        result = extractor.fetch_weather(12.34, 56.78)
+
+        self.assertEqual(result, DUMMY_3H_FORECAST)
+        secondary.fetch.assert_called_once_with(12.34, 56.78, "metric")
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    def test_hedged_option_wraps_openweather_with_open_meteo(self, mock_var):
+        extractor = Extract(cities_path=self.test_city_path, hedged=True)
+        self.assertIsInstance(extractor.provider, HedgedProvider)
+        self.assertIsInstance(extractor.provider.primary, OpenWeatherProvider)
+        self.assertIsInstance(extractor.provider.secondary, OpenMeteoProvider)
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.requests.Session.get")
+    def test_fetch_weather_served_from_cache_within_slot(self, mock_get, mock_var):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(DUMMY_3H_FORECAST).encode()
+        extractor = Extract(cities_path=self.test_city_path)
+        extractor.cache = ResponseCache(self.temp_dir / "cache")
+
+        first = extractor.fetch_weather(12.34, 56.78)
+        second = extractor.fetch_weather(12.34, 56.78)
+
+        self.assertEqual(first, DUMMY_3H_FORECAST)
+        self.assertEqual(second, DUMMY_3H_FORECAST)
+        mock_get.assert_called_once()
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.requests.Session.get")
+    def test_fetch_weather_fast_decode_returns_typed_forecast(self, mock_get, mock_var):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(DUMMY_3H_FORECAST).encode()
+        extractor = Extract(cities_path=self.test_city_path, fast_decode=True)
+
+        result = extractor.fetch_weather(12.34, 56.78)
+
+        self.assertIsInstance(result, Forecast)
+        self.assertEqual(result.list[0].main.temp, 300.0)
+        self.assertEqual(result.city.sunrise, 1750822380)
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.requests.Session.get")
+    def test_fetch_weather_logs_raw_response(self, mock_get, mock_var):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(DUMMY_3H_FORECAST).encode()
+        extractor = Extract(cities_path=self.test_city_path)
+        extractor.raw_log = RawResponseLog(self.temp_dir / "raw_log")
+
+        extractor.fetch_weather(12.34, 56.78, city_names=["Testville"])
+
+        day = extractor.raw_log.dates()[0]
+        records = list(extractor.raw_log.read_partition(day))
+        self.assertEqual(records[0]["city_names"], ["Testville"])
+        self.assertEqual(records[0]["payload"], DUMMY_3H_FORECAST)
+
     @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
     def test_save_skips_missing_forecast_data(self, mock_var):
         extractor = Extract(cities_path=self.test_city_path)
@@ -86,14 +202,193 @@ class TestExtract(unittest.TestCase):
         saved_files = list(extractor.output_dir.rglob("*.csv"))
         self.assertEqual(len(saved_files), 0)
 
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.datetime")
+    def test_save_many_writes_one_file_per_city(self, mock_datetime, mock_var):
+        mock_datetime.now.return_value = datetime(2025, 6, 25, 8, 0, 0)
+        mock_datetime.fromtimestamp = datetime.fromtimestamp
+        extractor = Extract(cities_path=self.test_city_path)
+        extractor.output_dir = self.temp_dir / "raw"
+
+        extractor.save_many(
+            {
+                "Testville": DUMMY_3H_FORECAST,
+                "Otherville": DUMMY_3H_FORECAST,
+                "Nowhere": DUMMY_WEATHER_INVALID,
+            }
+        )
+
+        day_dir = extractor.output_dir / "2025-06-25"
+        self.assertEqual(
+            sorted(p.name for p in day_dir.glob("*.csv")),
+            ["Otherville.csv", "Testville.csv"],
+        )
+        df = pd.read_csv(day_dir / "Testville.csv")
+        self.assertEqual(len(df), 1)
+        self.assertEqual(df.loc[0, "city"], "Testville")
+        self.assertAlmostEqual(df.loc[0, "temp_C"], 300.0)
+        self.assertEqual(df.loc[0, "weather_main"], "Clouds")
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.datetime")
+    def test_save_many_writes_forecast_horizon(self, mock_datetime, mock_var):
+        mock_datetime.now.return_value = datetime(2025, 6, 25, 8, 0, 0)
+        mock_datetime.fromtimestamp = datetime.fromtimestamp
+        extractor = Extract(cities_path=self.test_city_path, forecast_horizon=True)
+        extractor.output_dir = self.temp_dir / "raw"
+        extractor.forecast_dir = self.temp_dir / "forecast"
+
+        extractor.save_many(
+            {"Testville": DUMMY_3H_FORECAST, "Otherville": DUMMY_3H_FORECAST}
+        )
+
+        files = list((extractor.forecast_dir / "2025-06-25").glob("*.csv.gz"))
+        self.assertEqual(len(files), 1)
+        df = pd.read_csv(files[0])
+        self.assertEqual(sorted(df["city"]), ["Otherville", "Testville"])
+        self.assertIn("lead_hours", df.columns)
+
     @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
     @patch("src.core.extraction.Extract.fetch_weather", return_value=DUMMY_3H_FORECAST)
-    @patch("src.core.extraction.Extract.save")
+    @patch("src.core.extraction.Extract.save_many")
     def test_apply_full_pipeline(self, mock_save, mock_fetch, mock_var):
         extractor = Extract(cities_path=self.test_city_path)
         extractor.apply()
         mock_fetch.assert_called_once()
+        mock_save.assert_called_once_with({"Testville": DUMMY_3H_FORECAST})
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.Extract.save_many")
+    def test_apply_concurrent_isolates_city_failures(self, mock_save, mock_var):
+        cities = [{"name": f"City{i}", "lat": i, "lon": i} for i in range(6)]
+        with open(self.test_city_path, "w") as f:
+            json.dump(cities, f)
+
+        def fake_fetch(lat, lon, **kwargs):
+            if lat == 3:
+                raise Exception("API error")
+            return DUMMY_3H_FORECAST
+
+        extractor = Extract(cities_path=self.test_city_path, max_workers=4)
+        with patch.object(extractor, "fetch_weather", side_effect=fake_fetch):
+            with self.assertLogs("src.core.extraction", level="ERROR") as cm:
+                extractor.apply()
+
         mock_save.assert_called_once()
+        saved = sorted(mock_save.call_args.args[0])
+        self.assertEqual(saved, ["City0", "City1", "City2", "City4", "City5"])
+        self.assertTrue(any("City3" in msg for msg in cm.output))
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.Extract.fetch_weather", return_value=DUMMY_3H_FORECAST)
+    @patch("src.core.extraction.Extract.save_many")
+    def test_apply_skips_malformed_city_entries(self, mock_save, mock_fetch, mock_var):
+        cities = [
+            {"lat": 1, "lon": 1},
+            {"name": "Testville", "lat": 12.34, "lon": 56.78},
+        ]
+        with open(self.test_city_path, "w") as f:
+            json.dump(cities, f)
+
+        with self.assertLogs(
+            "src.utils.city_geo_coordinates.city_registry", level="ERROR"
+        ):
+            extractor = Extract(cities_path=self.test_city_path)
+        extractor.apply()
+
+        mock_fetch.assert_called_once()
+        mock_save.assert_called_once_with({"Testville": DUMMY_3H_FORECAST})
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.Extract.save_many")
+    def test_apply_coalesces_nearby_cities_into_one_request(self, mock_save, mock_var):
+        cities = [
+            {"name": "Antananarivo", "lat": -18.9101, "lon": 47.5255},
+            {"name": "Ivandry", "lat": -18.9312, "lon": 47.5312},
+            {"name": "Toliara", "lat": -23.3542, "lon": 43.6697},
+        ]
+        with open(self.test_city_path, "w") as f:
+            json.dump(cities, f)
+
+        extractor = Extract(cities_path=self.test_city_path, grid_resolution=0.1)
+        with patch.object(
+            extractor, "fetch_weather", return_value=DUMMY_3H_FORECAST
+        ) as mock_fetch:
+            extractor.apply()
+
+        self.assertEqual(mock_fetch.call_count, 2)
+        members = sorted(call.kwargs["city_names"] for call in mock_fetch.mock_calls)
+        self.assertEqual(members, [["Antananarivo", "Ivandry"], ["Toliara"]])
+        saved = mock_save.call_args.args[0]
+        self.assertEqual(sorted(saved), ["Antananarivo", "Ivandry", "Toliara"])
+        self.assertIs(saved["Antananarivo"], saved["Ivandry"])
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.datetime")
+    def test_resume_only_fetches_missing_or_failed_cities(
+        self, mock_datetime, mock_var
+    ):
+        mock_datetime.now.return_value = datetime(2025, 6, 25, 8, 0, 0)
+        mock_datetime.fromtimestamp = datetime.fromtimestamp
+        cities = [{"name": f"City{i}", "lat": i, "lon": i} for i in range(4)]
+        with open(self.test_city_path, "w") as f:
+            json.dump(cities, f)
+
+        def flaky_fetch(lat, lon, **kwargs):
+            if lat == 2:
+                raise Exception("API error")
+            return DUMMY_3H_FORECAST
+
+        extractor = Extract(cities_path=self.test_city_path, resume=True)
+        extractor.output_dir = self.temp_dir / "raw"
+        with patch.object(extractor, "fetch_weather", side_effect=flaky_fetch):
+            extractor.apply()
+
+        manifest = RunManifest(
+            extractor.output_dir / "2025-06-25" / Extract.MANIFEST_NAME
+        )
+        self.assertEqual(manifest.failed(), ["City2"])
+        self.assertEqual(manifest.status("City0"), RunManifest.DONE)
+
+        (extractor.output_dir / "2025-06-25" / "City3.csv").unlink()
+        with patch.object(
+            extractor, "fetch_weather", return_value=DUMMY_3H_FORECAST
+        ) as mock_fetch:
+            extractor.apply()
+
+        fetched = sorted(c.args[0] for c in mock_fetch.call_args_list)
+        self.assertEqual(fetched, [2, 3])
+        manifest = RunManifest(
+            extractor.output_dir / "2025-06-25" / Extract.MANIFEST_NAME
+        )
+        self.assertEqual(manifest.failed(), [])
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    @patch("src.core.extraction.datetime")
+    def test_retry_failed_only_skips_never_attempted_cities(
+        self, mock_datetime, mock_var
+    ):
+        mock_datetime.now.return_value = datetime(2025, 6, 25, 8, 0, 0)
+        cities = [{"name": f"City{i}", "lat": i, "lon": i} for i in range(3)]
+        with open(self.test_city_path, "w") as f:
+            json.dump(cities, f)
+        output_dir = self.temp_dir / "raw"
+        RunManifest(output_dir / "2025-06-25" / Extract.MANIFEST_NAME).mark_many(
+            {"City1": (RunManifest.FAILED, "API error")}
+        )
+
+        extractor = Extract(cities_path=self.test_city_path, retry_failed_only=True)
+        extractor.output_dir = output_dir
+        with patch.object(extractor, "fetch_weather", return_value={}) as mock_fetch:
+            extractor.apply()
+
+        self.assertEqual([c.args[0] for c in mock_fetch.call_args_list], [1])
+
+    @patch("src.core.extraction.Variable.get", return_value="dummy_api_key")
+    def test_session_pool_sized_to_workers(self, mock_var):
+        extractor = Extract(cities_path=self.test_city_path, max_workers=16)
+        adapter = extractor.session.get_adapter(Extract.BASE_URL)
+        self.assertEqual(adapter._pool_maxsize, 16)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,16 @@
+import json
+import os
 import shutil
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 import pandas as pd
 
 from src.core.merge import Merge
+from src.utils import schema, storage
+from src.utils.external_sort import ExternalSort
 
 
 class TestMerge(unittest.TestCase):
@@ -89,5 +94,363 @@ class TestMerge(unittest.TestCase):
         self.assertFalse(self.output_file.exists())
 
 
+class TestIncrementalMerge(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.input_dir = self.temp_dir / "data" / "processed"
+        self.output_file = self.temp_dir / "data" / "merged" / "all_weather_data.csv"
+        self.input_dir.mkdir(parents=True)
+        self.output_file.parent.mkdir(parents=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_merge(self, **kwargs):
+        merge = Merge(incremental=True, **kwargs)
+        merge.input_dir = self.input_dir
+        merge.output_file = self.output_file
+        return merge
+
+    def write_day(self, day, city="Paris", temp=25):
+        day_dir = self.input_dir / day
+        day_dir.mkdir(exist_ok=True)
+        path = day_dir / f"{city}.csv"
+        pd.DataFrame(
+            {
+                "city": [city],
+                "timestamp": [f"{day} 12:00:00"],
+                "temp_C": [temp],
+                "humidity": [55],
+            }
+        ).to_csv(path, index=False)
+        return path
+
+    def run_merge(self, **kwargs):
+        with patch.object(
+            Merge, "_read_text", autospec=True, side_effect=Merge._read_text
+        ) as files, patch(
+            "src.utils.storage.schema.read_csv", wraps=schema.read_csv
+        ) as reads:
+            self.make_merge(**kwargs).apply()
+        return [Path(call.args[1]) for call in files.call_args_list] + [
+            Path(call.args[0]) for call in reads.call_args_list
+        ]
+
+    def test_first_run_writes_manifest(self):
+        self.write_day("2024-01-01")
+        self.run_merge()
+
+        manifest = json.loads(
+            (self.output_file.parent / "merge_manifest.json").read_text()
+        )
+        self.assertEqual(list(manifest["files"]), ["2024-01-01/Paris.csv"])
+        self.assertEqual(len(pd.read_csv(self.output_file)), 1)
+
+    def test_only_new_files_are_read(self):
+        self.write_day("2024-01-01")
+        self.run_merge()
+        new_file = self.write_day("2024-01-02")
+
+        reads = self.run_merge()
+
+        self.assertEqual(reads, [new_file, self.output_file])
+        merged_df = pd.read_csv(self.output_file)
+        self.assertEqual(len(merged_df), 2)
+        self.assertEqual(
+            list(merged_df["timestamp"]),
+            ["2024-01-01 12:00:00", "2024-01-02 12:00:00"],
+        )
+
+    def test_up_to_date_run_reads_nothing(self):
+        self.write_day("2024-01-01")
+        self.run_merge()
+        before = self.output_file.read_bytes()
+
+        self.assertEqual(self.run_merge(), [])
+        self.assertEqual(self.output_file.read_bytes(), before)
+
+    def test_incremental_output_matches_full_merge(self):
+        self.write_day("2024-01-01", "Paris")
+        self.write_day("2024-01-01", "Tokyo", 30)
+        self.run_merge()
+        self.write_day("2024-01-02", "Paris")
+        self.write_day("2024-01-02", "Tokyo", 30)
+        self.run_merge()
+        incremental = self.output_file.read_bytes()
+
+        self.run_merge(full_rebuild=True)
+        self.assertEqual(self.output_file.read_bytes(), incremental)
+
+    def test_changed_file_triggers_full_rebuild(self):
+        path = self.write_day("2024-01-01", temp=25)
+        self.write_day("2024-01-02")
+        self.run_merge()
+        self.write_day("2024-01-01", temp=28)
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+
+        reads = self.run_merge()
+
+        self.assertNotIn(self.output_file, reads)
+        merged_df = pd.read_csv(self.output_file)
+        self.assertEqual(sorted(merged_df["temp_C"]), [25.0, 28.0])
+        self.assertEqual(len(merged_df), 2)
+
+    def test_removed_file_triggers_full_rebuild(self):
+        path = self.write_day("2024-01-01")
+        self.write_day("2024-01-02")
+        self.run_merge()
+        path.unlink()
+
+        self.run_merge()
+
+        merged_df = pd.read_csv(self.output_file)
+        self.assertEqual(list(merged_df["timestamp"]), ["2024-01-02 12:00:00"])
+
+    def test_only_full_rebuilds_are_marked(self):
+        path = self.write_day("2024-01-01")
+        self.run_merge()
+        first = storage.rebuilt(self.output_file)
+        self.assertIsNotNone(first)
+
+        self.write_day("2024-01-02")
+        self.run_merge()
+        self.assertEqual(storage.rebuilt(self.output_file), first)
+
+        path.unlink()
+        self.run_merge()
+        self.assertEqual(
+            storage.rebuilt(self.output_file), storage.signature(self.output_file)
+        )
+        self.assertNotEqual(storage.rebuilt(self.output_file), first)
+
+    def test_full_rebuild_reads_every_file(self):
+        first = self.write_day("2024-01-01")
+        self.run_merge()
+        second = self.write_day("2024-01-02")
+
+        reads = self.run_merge(full_rebuild=True)
+
+        self.assertEqual(reads, [first, second])
+
+    @unittest.skipUnless(storage.PARQUET_AVAILABLE, "pyarrow is not installed")
+    def test_appends_to_parquet_output(self):
+        self.output_file = self.output_file.with_suffix(".parquet")
+        self.write_day("2024-01-01")
+        self.run_merge()
+        new_file = self.write_day("2024-01-02")
+
+        self.assertEqual(self.run_merge(), [new_file])
+        merged_df = storage.get_storage(self.output_file).read()
+        self.assertEqual(len(merged_df), 2)
+
+    def test_key_index_skips_rewrite_for_known_rows(self):
+        path = self.write_day("2024-01-01", "Paris")
+        self.run_merge(key_index=True)
+        index_file = self.output_file.with_name("all_weather_data.csv.keys.npz")
+        self.assertTrue(index_file.exists())
+        before = self.output_file.stat().st_mtime_ns
+        shutil.copy(path, path.with_name("Paris-copy.csv"))
+
+        reads = self.run_merge(key_index=True)
+
+        self.assertNotIn(self.output_file, reads)
+        self.assertEqual(self.output_file.stat().st_mtime_ns, before)
+
+    def test_key_index_output_matches_plain_merge(self):
+        self.write_day("2024-01-01", "Paris")
+        self.run_merge(key_index=True)
+        self.write_day("2024-01-02", "Paris")
+        self.write_day("2024-01-02", "Tokyo", 30)
+        self.write_day("2024-01-03", "Paris", 26)
+        self.run_merge(key_index=True)
+        indexed = self.output_file.read_bytes()
+
+        self.run_merge(full_rebuild=True)
+        self.assertEqual(self.output_file.read_bytes(), indexed)
+
+    def test_stale_key_index_is_rebuilt(self):
+        self.write_day("2024-01-01", "Paris")
+        self.run_merge(key_index=True)
+        merged_df = pd.read_csv(self.output_file)
+        pd.concat([merged_df, merged_df.assign(city="Lima")]).to_csv(
+            self.output_file, index=False
+        )
+        self.write_day("2024-01-01", "Lima")
+
+        self.run_merge(key_index=True)
+
+        self.assertEqual(
+            sorted(pd.read_csv(self.output_file)["city"]), ["Lima", "Paris"]
+        )
+
+    def test_unreadable_file_is_retried_next_run(self):
+        self.write_day("2024-01-01")
+        bad_dir = self.input_dir / "2024-01-02"
+        bad_dir.mkdir()
+        bad_file = bad_dir / "Empty.csv"
+        bad_file.write_text("")
+        self.run_merge()
+
+        reads = self.run_merge()
+
+        self.assertIn(bad_file, reads)
+
+
+class TestParallelMerge(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.input_dir = self.temp_dir / "data" / "processed"
+        self.output_file = self.temp_dir / "data" / "merged" / "all_weather_data.csv"
+        self.input_dir.mkdir(parents=True)
+        self.output_file.parent.mkdir(parents=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_merge(self, max_workers):
+        merge = Merge(max_workers=max_workers)
+        merge.input_dir = self.input_dir
+        merge.output_file = self.output_file
+        merge.apply()
+        return self.output_file.read_bytes()
+
+    def write(self, day, name, content):
+        day_dir = self.input_dir / day
+        day_dir.mkdir(exist_ok=True)
+        (day_dir / name).write_text(content, encoding="utf-8")
+        return day_dir / name
+
+    def test_parallel_read_matches_sequential(self):
+        for day in ["2024-01-01", "2024-01-02", "2024-01-03"]:
+            for index, city in enumerate(["Paris", "Tokyo", "Toliara"]):
+                self.write(
+                    day,
+                    f"{city}.csv",
+                    f"city,timestamp,temp_C\n{city},{day} 12:00:00,{20 + index}\n",
+                )
+        self.write(
+            "2024-01-03",
+            "Lima.csv",
+            "city,timestamp,humidity\nLima,2024-01-03 12:00:00,80\n",
+        )
+
+        sequential = self.run_merge(1)
+        parallel = self.run_merge(4)
+
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(len(pd.read_csv(self.output_file)), 10)
+
+    def test_bad_file_is_logged_and_skipped(self):
+        self.write(
+            "2024-01-01", "Paris.csv", "city,timestamp\nParis,2024-01-01 12:00:00\n"
+        )
+        bad = self.write(
+            "2024-01-01",
+            "Tokyo.csv",
+            "city,timestamp\nTokyo,2024-01-01 12:00:00\nTokyo,2024-01-02,1,2\n",
+        )
+
+        with self.assertLogs("src.core.merge", level="ERROR") as logs:
+            self.run_merge(4)
+
+        self.assertIn(str(bad), "\n".join(logs.output))
+        self.assertEqual(list(pd.read_csv(self.output_file)["city"]), ["Paris"])
+
+
+class TestStreamingMerge(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.input_dir = self.temp_dir / "data" / "processed"
+        self.input_dir.mkdir(parents=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_days(self, days, first=0):
+        for offset in range(first, first + days):
+            day = pd.Timestamp("2024-01-01") + pd.Timedelta(days=offset)
+            day_dir = self.input_dir / day.strftime("%Y-%m-%d")
+            day_dir.mkdir()
+            for index, city in enumerate(["Tokyo", "Paris", "Lima"]):
+                # Overlapping hours give rows that tie on (city, timestamp).
+                df = pd.DataFrame(
+                    {
+                        "city": city,
+                        "timestamp": pd.date_range(
+                            day - pd.Timedelta(hours=6), periods=12, freq="h"
+                        ),
+                        "temp_C": [20 + index + hour % 3 for hour in range(12)],
+                    }
+                )
+                if city == "Lima" and offset % 2:
+                    df["uv_index"] = 3
+                df.to_csv(day_dir / f"{city}.csv", index=False)
+
+    def run_merge(self, name, suffix=".csv", **kwargs):
+        output_dir = self.temp_dir / "data" / name
+        output_dir.mkdir(exist_ok=True)
+        merge = Merge(incremental=True, **kwargs)
+        merge.input_dir = self.input_dir
+        merge.output_file = output_dir / f"all_weather_data{suffix}"
+        merge.apply()
+        return merge.output_file
+
+    def test_streaming_output_matches_in_memory_merge(self):
+        self.write_days(6)
+
+        with patch.object(
+            ExternalSort, "_spill", autospec=True, side_effect=ExternalSort._spill
+        ) as spills:
+            streamed = self.run_merge("streamed", memory_budget=4096)
+        in_memory = self.run_merge("in_memory")
+
+        self.assertGreater(spills.call_count, 1)
+        self.assertEqual(streamed.read_bytes(), in_memory.read_bytes())
+        self.assertEqual(
+            sorted(path.name for path in streamed.parent.iterdir()),
+            [
+                "all_weather_data.csv",
+                "all_weather_data.csv.rebuilt.json",
+                "all_weather_data.csv.sorted.json",
+                "merge_manifest.json",
+            ],
+        )
+
+    def test_streaming_append_matches_in_memory_append(self):
+        self.write_days(3)
+        for key_index in (False, True):
+            self.run_merge(f"streamed-{key_index}", key_index=key_index)
+            self.run_merge(f"in_memory-{key_index}", key_index=key_index)
+        self.write_days(3, first=3)
+
+        for key_index in (False, True):
+            with self.subTest(key_index=key_index):
+                with patch.object(
+                    Merge, "_merge_streaming", autospec=True
+                ) as full_merge:
+                    streamed = self.run_merge(
+                        f"streamed-{key_index}",
+                        key_index=key_index,
+                        memory_budget=4096,
+                    )
+                in_memory = self.run_merge(
+                    f"in_memory-{key_index}", key_index=key_index
+                )
+
+                full_merge.assert_not_called()
+                self.assertEqual(streamed.read_bytes(), in_memory.read_bytes())
+
+    @unittest.skipUnless(storage.PARQUET_AVAILABLE, "pyarrow is not installed")
+    def test_streaming_to_parquet_output(self):
+        self.write_days(4)
+
+        streamed = self.run_merge("streamed", ".parquet", memory_budget=4096)
+        in_memory = self.run_merge("in_memory", ".parquet")
+
+        pd.testing.assert_frame_equal(
+            storage.get_storage(streamed).read(), storage.get_storage(in_memory).read()
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
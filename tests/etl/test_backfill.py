@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from src.core.backfill import Backfill
+from src.core.transform import Transform
+
+HEADER = "city,timestamp,temp_C,rain_1d,wind_speed,humidity\n"
+DATES = ["2025-06-27", "2025-06-28", "2025-06-29"]
+
+
+class TestBackfill(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.raw_dir = self.temp_dir / "raw"
+        self.processed_dir = self.temp_dir / "processed"
+        for day in DATES:
+            (self.raw_dir / day).mkdir(parents=True)
+            for city in ["Tokyo", "Paris"]:
+                (self.raw_dir / day / f"{city}.csv").write_text(
+                    HEADER + f"{city},{day},24.0,0.0,3.0,55\n", encoding="utf-8"
+                )
+        (self.raw_dir / "not-a-date").mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_backfill(self, **kwargs):
+        backfill = Backfill(**kwargs)
+        backfill.input_dir = self.raw_dir
+        backfill.output_dir = self.processed_dir
+        return backfill
+
+    def test_dates_are_filtered_by_range(self):
+        backfill = self.make_backfill(start="2025-06-28", end="2025-06-29")
+        self.assertEqual(backfill.dates(), ["2025-06-28", "2025-06-29"])
+        self.assertEqual(self.make_backfill().dates(), DATES)
+
+    def test_transforms_every_date_in_a_process_pool(self):
+        done = self.make_backfill(max_workers=2).apply()
+
+        self.assertEqual(done, DATES)
+        for day in DATES:
+            df = pd.read_csv(self.processed_dir / day / "Tokyo.csv")
+            self.assertEqual(df["comfort_score"].iloc[0], 1.0)
+
+    def test_up_to_date_dates_are_skipped(self):
+        self.make_backfill(max_workers=1).apply()
+        stale = self.raw_dir / "2025-06-28" / "Paris.csv"
+        future = stale.stat().st_mtime + 60
+        os.utime(stale, (future, future))
+
+        done = self.make_backfill(max_workers=1).apply()
+
+        self.assertEqual(done, ["2025-06-28"])
+
+    def test_missing_output_file_is_not_up_to_date(self):
+        self.make_backfill(max_workers=1).apply()
+        (self.processed_dir / "2025-06-29" / "Tokyo.csv").unlink()
+
+        backfill = self.make_backfill()
+        self.assertFalse(backfill.is_up_to_date("2025-06-29"))
+        self.assertTrue(backfill.is_up_to_date("2025-06-28"))
+
+    def test_force_rebuilds_everything(self):
+        self.make_backfill(max_workers=1).apply()
+        done = self.make_backfill(max_workers=1, force=True).apply()
+        self.assertEqual(done, DATES)
+
+    def test_single_file_mode_checks_the_day_file(self):
+        backfill = self.make_backfill(max_workers=1, single_file=True)
+        backfill.apply()
+
+        day_file = self.processed_dir / "2025-06-27" / Transform.DAY_FILE_NAME
+        self.assertEqual(len(pd.read_csv(day_file)), 2)
+        self.assertTrue(backfill.is_up_to_date("2025-06-27"))
+
+
+if __name__ == "__main__":
+    unittest.main()
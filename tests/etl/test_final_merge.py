@@ -1,10 +1,13 @@
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 import pandas as pd
 
 from src.core.final_merge import FinalMerge
+from src.utils import schema, storage
+from src.utils.key_index import KeyIndex
 
 
 class TestFinalMerge(unittest.TestCase):
@@ -174,9 +177,11 @@ class TestFinalMerge(unittest.TestCase):
             str(self.new_data_path),
             str(self.historical_path),
         )
+        original = self.historical_path.read_bytes()
         merger.apply()
         backup_path = self.historical_path.with_suffix(".bak.csv")
         self.assertTrue(backup_path.exists())
+        self.assertEqual(backup_path.read_bytes(), original)
 
     def test_commit_overwrites_historical(self):
         merger = FinalMerge(
@@ -187,6 +192,23 @@ class TestFinalMerge(unittest.TestCase):
         hist_df = pd.read_csv(self.historical_path)
         self.assertEqual(len(hist_df), 2)
 
+    def test_commit_links_the_merged_file(self):
+        merger = FinalMerge(
+            self.historical_path, self.new_data_path, self.output_path, key_index=True
+        )
+        merged_df = merger.apply()
+        merger.commit()
+
+        self.assertEqual(
+            self.historical_path.stat().st_ino, self.output_path.stat().st_ino
+        )
+        pd.testing.assert_frame_equal(
+            storage.get_storage(self.historical_path).read(),
+            merged_df.reset_index(drop=True),
+        )
+        self.assertEqual(storage.sorted_by(self.historical_path), ["city", "timestamp"])
+        self.assertEqual(len(KeyIndex.load(self.historical_path)), 2)
+
     def test_commit_skipped_if_output_is_historical(self):
         merger = FinalMerge(
             str(self.historical_path),
@@ -208,6 +230,274 @@ class TestFinalMerge(unittest.TestCase):
             merged_df.reset_index(drop=True), sorted_df.reset_index(drop=True)
         )
 
+    def test_merged_data_uses_compact_dtypes(self):
+        merger = FinalMerge(
+            str(self.historical_path), str(self.new_data_path), str(self.output_path)
+        )
+        merged_df = merger.apply()
+        self.assertIsInstance(merged_df["city"].dtype, pd.CategoricalDtype)
+        self.assertEqual(merged_df["temp_C"].dtype, "float32")
+        self.assertEqual(merged_df["is_ideal_day"].dtype, "boolean")
+
+    @unittest.skipUnless(storage.PARQUET_AVAILABLE, "pyarrow is not installed")
+    def test_parquet_backend_seeds_history_from_csv(self):
+        new_data_path = self.temp_path / "new.parquet"
+        historical_path = self.temp_path / "historical.parquet"
+        output_path = self.temp_path / "output.parquet"
+        storage.ParquetStorage(new_data_path).write(schema.read_csv(self.new_data_path))
+
+        merger = FinalMerge(str(historical_path), str(new_data_path), str(output_path))
+        merged_df = merger.apply()
+        merger.commit()
+
+        self.assertEqual(len(merged_df), 2)
+        pd.testing.assert_frame_equal(
+            storage.get_storage(historical_path).read(), merged_df
+        )
+
+    def test_key_index_matches_plain_merge(self):
+        superseding = self.historical_df.assign(temp_C=27)
+        pd.concat([self.new_df, superseding, self.historical_df]).to_csv(
+            self.new_data_path, index=False
+        )
+        plain = FinalMerge(
+            self.historical_path, self.new_data_path, self.temp_path / "plain.csv"
+        ).apply()
+
+        indexed = FinalMerge(
+            self.historical_path, self.new_data_path, self.output_path, key_index=True
+        ).apply()
+
+        pd.testing.assert_frame_equal(
+            indexed.reset_index(drop=True), plain.reset_index(drop=True)
+        )
+        self.assertEqual(list(indexed["temp_C"]), [25, 26])
+
+    def test_key_index_is_persisted_and_committed(self):
+        merger = FinalMerge(
+            self.historical_path, self.new_data_path, self.output_path, key_index=True
+        )
+        merger.apply()
+
+        historical_index = KeyIndex.load(self.historical_path)
+        self.assertEqual(len(historical_index), 1)
+        self.assertEqual(len(KeyIndex.load(self.output_path)), 2)
+
+        merger.commit()
+        self.assertEqual(len(KeyIndex.load(self.historical_path)), 2)
+
+    def test_unchanged_rows_are_not_re_added(self):
+        self.historical_df.to_csv(self.new_data_path, index=False)
+        merger = FinalMerge(
+            self.historical_path, self.new_data_path, self.output_path, key_index=True
+        )
+        merger.apply()
+        merged_df = merger.apply()
+
+        self.assertEqual(len(merged_df), 1)
+
+    def test_streaming_matches_in_memory_merge(self):
+        history = pd.concat(
+            [
+                self.historical_df.loc[[0] * 40]
+                .reset_index(drop=True)
+                .assign(
+                    city=city,
+                    timestamp=pd.date_range("2020-01-01", periods=40).astype(str),
+                    temp_C=range(40),
+                )
+                for city in ["Paris", "Tokyo", "Lima"]
+            ]
+        )
+        history.to_csv(self.historical_path, index=False)
+        pd.concat([history.iloc[::7].assign(temp_C=99), self.new_df]).to_csv(
+            self.new_data_path, index=False
+        )
+
+        for key_index in (False, True):
+            with self.subTest(key_index=key_index):
+                in_memory = self.temp_path / f"in_memory-{key_index}.csv"
+                streamed = self.temp_path / f"streamed-{key_index}.csv"
+                FinalMerge(
+                    self.historical_path,
+                    self.new_data_path,
+                    in_memory,
+                    key_index=key_index,
+                ).apply()
+                merger = FinalMerge(
+                    self.historical_path,
+                    self.new_data_path,
+                    streamed,
+                    key_index=key_index,
+                    memory_budget=4096,
+                )
+
+                self.assertIsNone(merger.apply())
+                self.assertEqual(streamed.read_bytes(), in_memory.read_bytes())
+                if key_index:
+                    self.assertEqual(
+                        KeyIndex.load(streamed).keys.tolist(),
+                        KeyIndex.load(in_memory).keys.tolist(),
+                    )
+
+    def test_sorted_inputs_are_merged_in_one_pass(self):
+        history = pd.concat(
+            [
+                self.historical_df.loc[[0] * 30]
+                .reset_index(drop=True)
+                .assign(
+                    city=city,
+                    timestamp=pd.date_range("2020-01-01", periods=30).astype(str),
+                    temp_C=range(30),
+                )
+                for city in ["Lima", "Paris", "Tokyo"]
+            ]
+        )
+        history.to_csv(self.historical_path, index=False)
+        new = pd.concat([history.iloc[::4].assign(temp_C=99), self.new_df])
+        new.iloc[::-1].to_csv(self.new_data_path, index=False)
+        for memory_budget in (None, 4096):
+            FinalMerge(
+                self.historical_path,
+                self.new_data_path,
+                self.temp_path / f"unsorted-{memory_budget}.csv",
+                memory_budget=memory_budget,
+            ).apply()
+        self.assertIsNone(storage.sorted_by(self.new_data_path))
+
+        new.sort_values(["city", "timestamp"]).to_csv(self.new_data_path, index=False)
+        for memory_budget in (None, 4096):
+            with self.subTest(memory_budget=memory_budget):
+                output_path = self.temp_path / f"sorted-{memory_budget}.csv"
+                FinalMerge(
+                    self.historical_path,
+                    self.new_data_path,
+                    output_path,
+                    memory_budget=memory_budget,
+                ).apply()
+
+                self.assertEqual(
+                    output_path.read_bytes(),
+                    (self.temp_path / f"unsorted-{memory_budget}.csv").read_bytes(),
+                )
+                self.assertEqual(
+                    storage.sorted_by(self.new_data_path), ["city", "timestamp"]
+                )
+                self.assertEqual(storage.sorted_by(output_path), ["city", "timestamp"])
+        self.assertEqual(storage.sorted_by(self.historical_path), ["city", "timestamp"])
+
+    @patch.object(storage.SegmentStorage, "FORMAT", "csv")
+    def test_segment_store_appends_only_new_and_changed_rows(self):
+        for memory_budget in (None, 4096):
+            with self.subTest(memory_budget=memory_budget):
+                output_path = self.temp_path / f"ready-{memory_budget}.segments"
+                self.new_df.to_csv(self.new_data_path, index=False)
+                FinalMerge(
+                    self.historical_path,
+                    self.new_data_path,
+                    output_path,
+                    key_index=True,
+                    memory_budget=memory_budget,
+                ).apply()
+
+                changed = self.new_df.assign(temp_C=29)
+                added = self.new_df.assign(timestamp="2020-01-03")
+                pd.concat([self.historical_df, changed, added]).to_csv(
+                    self.new_data_path, index=False
+                )
+                merger = FinalMerge(
+                    self.historical_path,
+                    self.new_data_path,
+                    output_path,
+                    key_index=True,
+                    memory_budget=memory_budget,
+                )
+                self.assertIsNone(merger.apply())
+                expected = FinalMerge(
+                    self.historical_path, self.new_data_path, self.output_path
+                ).apply()
+
+                output = storage.SegmentStorage(output_path)
+                self.assertEqual(
+                    [s["rows"] for s in output.manifest()["segments"]], [2, 2]
+                )
+                pd.testing.assert_frame_equal(output.read(), expected)
+
+                # Nothing new: no new version is written.
+                merger.apply()
+                output = storage.SegmentStorage(output_path)
+                self.assertEqual(output.manifest()["version"], 2)
+
+                self.assertTrue(merger.compact())
+                output = storage.SegmentStorage(output_path)
+                self.assertEqual(len(output.manifest()["segments"]), 1)
+                pd.testing.assert_frame_equal(output.read(), expected)
+                self.assertIsNotNone(KeyIndex.load(output_path))
+
+    @patch.object(storage.SegmentStorage, "FORMAT", "csv")
+    def test_segment_store_is_rebuilt_when_history_changes(self):
+        output_path = self.temp_path / "ready.segments"
+        FinalMerge(self.historical_path, self.new_data_path, output_path).apply()
+        self.historical_df.assign(temp_C=10).to_csv(self.historical_path, index=False)
+
+        merged_df = FinalMerge(
+            self.historical_path, self.new_data_path, output_path
+        ).apply()
+
+        self.assertEqual(list(merged_df["temp_C"]), [10, 26])
+        output = storage.SegmentStorage(output_path)
+        self.assertEqual(output.manifest()["version"], 2)
+        self.assertEqual(len(output.manifest()["segments"]), 1)
+
+    @patch.object(storage.SegmentStorage, "FORMAT", "csv")
+    def test_segment_store_is_rebuilt_when_new_data_is_rebuilt(self):
+        output_path = self.temp_path / "ready.segments"
+        storage.mark_rebuilt(self.new_data_path)
+        FinalMerge(self.historical_path, self.new_data_path, output_path).apply()
+        # The new row moved: its old key must leave the merged dataset.
+        self.new_df.assign(timestamp="2020-01-03").to_csv(
+            self.new_data_path, index=False
+        )
+        storage.mark_rebuilt(self.new_data_path)
+
+        merged_df = FinalMerge(
+            self.historical_path, self.new_data_path, output_path
+        ).apply()
+
+        expected = FinalMerge(
+            self.historical_path, self.new_data_path, self.output_path
+        ).apply()
+        pd.testing.assert_frame_equal(merged_df, expected)
+        output = storage.SegmentStorage(output_path)
+        self.assertEqual(len(output.manifest()["segments"]), 1)
+        pd.testing.assert_frame_equal(output.read(), expected)
+
+    def test_streaming_backs_up_history_when_overwriting(self):
+        original = self.historical_path.read_bytes()
+        merger = FinalMerge(
+            self.historical_path,
+            self.new_data_path,
+            self.historical_path,
+            memory_budget=4096,
+        )
+        merger.apply()
+
+        self.assertEqual(
+            self.historical_path.with_suffix(".bak.csv").read_bytes(), original
+        )
+        self.assertEqual(len(pd.read_csv(self.historical_path)), 2)
+
+    def test_streaming_schema_mismatch_raises_error(self):
+        self.new_df.drop(columns=["humidity"]).to_csv(self.new_data_path, index=False)
+        merger = FinalMerge(
+            self.historical_path,
+            self.new_data_path,
+            self.output_path,
+            memory_budget=4096,
+        )
+        with self.assertRaises(ValueError):
+            merger.apply()
+
     def test_empty_new_data(self):
         pd.DataFrame(columns=self.columns).to_csv(self.new_data_path, index=False)
         merger = FinalMerge(
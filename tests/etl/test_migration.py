@@ -1,7 +1,12 @@
+import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import pandas as pd
+
 from src.core.migration import Migration
+from src.utils import schema, storage
 
 
 class TestMigration(unittest.TestCase):
@@ -61,6 +66,33 @@ class TestMigration(unittest.TestCase):
 
         mock_conn.rollback.assert_called_once()
 
+    @patch.object(storage.SegmentStorage, "FORMAT", "csv")
+    def test_staging_is_copied_chunk_by_chunk(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = Path(temp_dir.name) / "ready_data.segments"
+        df = schema.apply_schema(
+            pd.DataFrame(
+                {
+                    "city": ["Lima", "Paris", "Tokyo"],
+                    "timestamp": pd.to_datetime(["2025-06-28"] * 3),
+                    "temp_C": [18.0, 24.5, 31.0],
+                }
+            )
+        )
+        storage.SegmentStorage(path).write(df)
+        migration = Migration(self.db_config, csv_path=path)
+        migration.COPY_ROWS = 2
+        migration.conn = MagicMock()
+        cursor = migration.conn.cursor.return_value.__enter__.return_value
+        parts = []
+        cursor.copy_expert.side_effect = lambda sql, f: parts.append(pd.read_csv(f))
+
+        migration._load_staging_data()
+
+        self.assertEqual([len(part) for part in parts], [2, 1])
+        self.assertEqual(list(pd.concat(parts)["city"]), ["Lima", "Paris", "Tokyo"])
+
     @patch("src.core.migration.psycopg2.connect")
     def test_cursor_and_connection_closed(self, mock_connect):
         mock_conn = MagicMock()
@@ -0,0 +1,121 @@
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from src.core.replay import Replay, replay_partition
+
+
+def make_payload(temp, day="2025-06-25"):
+    return {
+        "list": [
+            {
+                "dt": 1750842000,
+                "dt_txt": f"{day} 09:00:00",
+                "main": {
+                    "temp": temp,
+                    "temp_min": temp - 1,
+                    "temp_max": temp + 1,
+                    "feels_like": temp,
+                    "pressure": 1012,
+                    "humidity": 60,
+                },
+                "wind": {"speed": 3.2, "deg": 180},
+                "clouds": {"all": 50},
+                "weather": [{"main": "Clouds", "description": "broken clouds"}],
+            }
+        ],
+        "city": {"sunrise": 1750822380, "sunset": 1750878253},
+    }
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.log_dir = self.temp_dir / "raw_log"
+        self.output_dir = self.temp_dir / "raw"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_log(self, day, records, name="responses-1.ndjson.gz"):
+        partition = self.log_dir / day
+        partition.mkdir(parents=True, exist_ok=True)
+        with open(partition / name, "ab") as f:
+            for city_names, fetched_at, payload in records:
+                line = {
+                    "city_names": city_names,
+                    "lat": 0,
+                    "lon": 0,
+                    "units": "metric",
+                    "fetched_at": fetched_at,
+                    "payload": payload,
+                }
+                f.write(gzip.compress((json.dumps(line) + "\n").encode()))
+
+    def test_replay_partition_rebuilds_raw_files(self):
+        self.write_log(
+            "2025-06-25",
+            [
+                (["Paris"], "2025-06-25T08:00:00", make_payload(20.0)),
+                (["Rome", "Vatican"], "2025-06-25T08:00:01", make_payload(25.0)),
+            ],
+        )
+
+        rows = replay_partition(self.log_dir, self.output_dir, "2025-06-25")
+
+        self.assertEqual(rows, 3)
+        day_dir = self.output_dir / "2025-06-25"
+        self.assertEqual(
+            sorted(p.name for p in day_dir.glob("*.csv")),
+            ["Paris.csv", "Rome.csv", "Vatican.csv"],
+        )
+        df = pd.read_csv(day_dir / "Vatican.csv")
+        self.assertAlmostEqual(df.loc[0, "temp_C"], 25.0)
+        self.assertEqual(df.loc[0, "timestamp"], "2025-06-25 08:00:01")
+
+    def test_latest_response_per_city_wins(self):
+        self.write_log(
+            "2025-06-25",
+            [(["Paris"], "2025-06-25T10:00:00", make_payload(30.0))],
+            name="responses-2.ndjson.gz",
+        )
+        self.write_log(
+            "2025-06-25",
+            [(["Paris"], "2025-06-25T08:00:00", make_payload(20.0))],
+        )
+
+        replay_partition(self.log_dir, self.output_dir, "2025-06-25")
+
+        df = pd.read_csv(self.output_dir / "2025-06-25" / "Paris.csv")
+        self.assertAlmostEqual(df.loc[0, "temp_C"], 30.0)
+
+    def test_apply_replays_every_logged_date_in_parallel(self):
+        for day in ["2025-06-25", "2025-06-26"]:
+            self.write_log(
+                day, [(["Paris"], f"{day}T08:00:00", make_payload(20.0, day))]
+            )
+
+        replay = Replay(max_workers=2)
+        replay.log_dir = self.log_dir
+        replay.output_dir = self.output_dir
+        replay.apply()
+
+        for day in ["2025-06-25", "2025-06-26"]:
+            self.assertTrue((self.output_dir / day / "Paris.csv").exists())
+
+    def test_apply_without_log_is_a_no_op(self):
+        replay = Replay()
+        replay.log_dir = self.log_dir
+        replay.output_dir = self.output_dir
+        with self.assertLogs("src.core.replay", level="WARNING"):
+            replay.apply()
+        self.assertFalse(self.output_dir.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
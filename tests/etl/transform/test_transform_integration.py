@@ -124,5 +124,89 @@ class TestTransformIntegration(unittest.TestCase):
         self.assertTrue(expected.issubset(set(df.columns)))
 
 
+class TestBatchTransformIntegration(TestTransformIntegration):
+    def setUp(self):
+        super().setUp()
+        self.transform.batch = True
+
+    def test_batch_output_matches_per_file_output(self):
+        for i, (temp, rain) in enumerate([(24.0, 0.0), (31.5, 2.5), (22.0, 0.0)]):
+            self.write_csv(
+                f"city_{i}.csv",
+                "city,timestamp,temp_C,rain_1d,wind_speed,humidity\n"
+                f"City{i},2025-06-28,{temp},{rain},3.0,55\n",
+            )
+        self.transform.apply()
+        batch = {i: self.read_output_df(f"city_{i}.csv") for i in range(3)}
+
+        self.transform.batch = False
+        self.transform.apply()
+        for i in range(3):
+            pd.testing.assert_frame_equal(
+                batch[i], self.read_output_df(f"city_{i}.csv")
+            )
+
+    def test_files_with_different_headers_are_transformed_separately(self):
+        self.write_csv(
+            "a.csv",
+            "city,timestamp,temp_C,rain_1d,wind_speed,humidity\n"
+            "Tokyo,2025-06-28,24.0,0.0,2.0,55\n",
+        )
+        self.write_csv(
+            "b.csv",
+            "city,timestamp,humidity,temp_C,rain_1d,wind_speed,pressure\n"
+            "Paris,2025-06-28,50,26.0,0.0,2.0,1012\n",
+        )
+        self.transform.apply()
+        self.assertEqual(self.read_output_df("a.csv")["city"].iloc[0], "Tokyo")
+        self.assertEqual(self.read_output_df("b.csv")["pressure"].iloc[0], 1012)
+
+    def test_failing_group_does_not_block_other_files(self):
+        self.write_csv("broken.csv", "city,timestamp\nTokyo,2025-06-28\n")
+        self.write_csv(
+            "ok.csv",
+            "city,timestamp,temp_C,rain_1d,wind_speed,humidity\n"
+            "Paris,2025-06-28,26.0,0.0,2.0,50\n",
+        )
+        with self.assertLogs("src.core.transform", level="ERROR") as cm:
+            self.transform.apply()
+        self.assertTrue(any("broken.csv" in msg for msg in cm.output))
+        self.assertTrue(self.read_output_df("ok.csv")["is_ideal_day"].iloc[0])
+
+    def test_unparsable_file_does_not_block_files_sharing_its_header(self):
+        header = "city,timestamp,temp_C,rain_1d,wind_speed,humidity\n"
+        self.write_csv("Paris.csv", header + "Paris,2025-06-28,abc,0.0,2.0,50\n")
+        for city in ["Lima", "Tokyo"]:
+            self.write_csv(
+                f"{city}.csv", header + f"{city},2025-06-28,24.0,0.0,2.0,55\n"
+            )
+
+        with self.assertLogs("src.core.transform", level="ERROR") as cm:
+            self.transform.apply()
+
+        errors = [msg for msg in cm.output if msg.startswith("ERROR")]
+        self.assertEqual(len(errors), 1)
+        self.assertIn("Failed to transform Paris.csv", errors[0])
+        output_files = sorted((self.processed_dir / self.today).glob("*.csv"))
+        self.assertEqual([f.name for f in output_files], ["Lima.csv", "Tokyo.csv"])
+        self.assertEqual(self.read_output_df("Lima.csv")["city"].iloc[0], "Lima")
+
+    def test_single_file_mode_writes_one_day_file(self):
+        for i in range(3):
+            self.write_csv(
+                f"city_{i}.csv",
+                "city,timestamp,temp_C,rain_1d,wind_speed,humidity\n"
+                f"City{i},2025-06-28,24.0,0.0,3.0,55\n",
+            )
+        self.transform.single_file = True
+        self.transform.apply()
+
+        output_files = list((self.processed_dir / self.today).glob("*.csv"))
+        self.assertEqual([f.name for f in output_files], [Transform.DAY_FILE_NAME])
+        df = self.read_output_df(Transform.DAY_FILE_NAME)
+        self.assertEqual(list(df["city"]), ["City0", "City1", "City2"])
+        self.assertNotIn(Transform.SOURCE_COLUMN, df.columns)
+
+
 if __name__ == "__main__":
     unittest.main()
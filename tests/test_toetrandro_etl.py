@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from airflow.models import DagBag
 
@@ -56,6 +56,33 @@ class TestToetrandroETLDAG(unittest.TestCase):
         task.python_callable()
         mock_run.assert_called_once()
 
+    @patch("workflows.scripts.extract_step.ExtractStep.from_options")
+    @patch("airflow.models.Variable.get")
+    def test_extract_task_options(self, mock_variable_get, mock_from_options):
+        mock_variable_get.return_value = {"use_cache": True, "hedged": False}
+        task = self.dag.get_task("extract_weather_data")
+        task.python_callable(dag_run=MagicMock(conf={"hedged": True}))
+        mock_from_options.assert_called_once_with({"use_cache": True, "hedged": True})
+        mock_from_options.return_value.run.assert_called_once()
+
+    @patch("workflows.scripts.extract_step.Extract")
+    def test_extract_step_defaults_to_openweather_only(self, mock_extract):
+        from workflows.scripts.extract_step import ExtractStep
+
+        ExtractStep.from_options({}).run()
+        options = mock_extract.call_args.kwargs
+        for option in (
+            "use_cache",
+            "fast_decode",
+            "forecast_horizon",
+            "log_responses",
+            "resume",
+            "retry_failed_only",
+            "hedged",
+        ):
+            self.assertFalse(options[option], option)
+        self.assertIsNone(options["grid_resolution"])
+
     @patch("workflows.scripts.transform_step.TransformStep.run")
     def test_transform_task(self, mock_run):
         task = self.dag.get_task("transform_enriched_data")
@@ -1,6 +1,6 @@
 import unittest
 
-from src.utils.city_geo_coordinates.city import City
+from src.utils.city_geo_coordinates.city import City, normalize_name
 
 
 class TestCityLocation(unittest.TestCase):
@@ -57,3 +57,7 @@ class TestCityLocation(unittest.TestCase):
         city.set_coordinates(38.716893, -9.139294)
         self.assertAlmostEqual(city.latitude, 38.716893)
         self.assertAlmostEqual(city.longitude, -9.139294)
+
+    def test_normalize_name_strips_accents_case_and_spacing(self):
+        self.assertEqual(normalize_name("  São   Paulo "), "sao paulo")
+        self.assertEqual(normalize_name("ANTANANARIVO"), "antananarivo")
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from geopy.exc import GeocoderTimedOut
 
@@ -81,3 +81,60 @@ class TestCityGeocoder(unittest.TestCase):
 
     def test_geolocator_is_set(self):
         self.assertTrue(hasattr(self.geocoder, "geolocator"))
+
+
+class TestCityGeocoderWithCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = MagicMock()
+        self.geocoder = CityGeocoder(cache=self.cache)
+        self.geocoder.geolocator.geocode = MagicMock()
+
+    @patch("src.utils.city_geo_coordinates.city_geocoder.sleep")
+    def test_cached_city_skips_network_and_sleep(self, mock_sleep):
+        self.cache.get.return_value = (48.8566, 2.3522)
+        city = City("Paris")
+        self.geocoder.geocode_city(city)
+        self.assertEqual((city.latitude, city.longitude), (48.8566, 2.3522))
+        self.geocoder.geolocator.geocode.assert_not_called()
+        mock_sleep.assert_not_called()
+
+    @patch("src.utils.city_geo_coordinates.city_geocoder.sleep")
+    def test_cache_miss_geocodes_and_stores(self, mock_sleep):
+        self.cache.get.return_value = None
+        location = MagicMock(latitude=40.71281, longitude=-74.00601)
+        self.geocoder.geolocator.geocode.return_value = location
+        city = City("New York")
+        self.geocoder.geocode_city(city)
+        self.cache.put.assert_called_once_with("New York", 40.7128, -74.006)
+        mock_sleep.assert_called_once_with(1)
+
+    @patch("src.utils.city_geo_coordinates.city_geocoder.sleep")
+    def test_unresolved_city_is_not_cached(self, mock_sleep):
+        self.cache.get.return_value = None
+        self.geocoder.geolocator.geocode.return_value = None
+        self.geocoder.geocode_city(City("Atlantis"))
+        self.cache.put.assert_not_called()
+
+    @patch("src.utils.city_geo_coordinates.city_geocoder.sleep")
+    def test_gazetteer_hit_skips_cache_and_network(self, mock_sleep):
+        self.geocoder.gazetteer = MagicMock()
+        self.geocoder.gazetteer.lookup.return_value = (-18.9137, 47.5361)
+        city = City("Antananarivo")
+        self.geocoder.geocode_city(city)
+        self.assertEqual((city.latitude, city.longitude), (-18.9137, 47.5361))
+        self.cache.get.assert_not_called()
+        self.geocoder.geolocator.geocode.assert_not_called()
+        mock_sleep.assert_not_called()
+
+    @patch("src.utils.city_geo_coordinates.city_geocoder.sleep")
+    def test_gazetteer_miss_falls_back_to_nominatim(self, mock_sleep):
+        self.geocoder.gazetteer = MagicMock()
+        self.geocoder.gazetteer.lookup.return_value = None
+        self.cache.get.return_value = None
+        self.geocoder.geolocator.geocode.return_value = MagicMock(
+            latitude=40.7128, longitude=-74.006
+        )
+        city = City("New York")
+        self.geocoder.geocode_city(city)
+        self.assertEqual((city.latitude, city.longitude), (40.7128, -74.006))
+        self.geocoder.geolocator.geocode.assert_called_once_with("New York")
@@ -0,0 +1,134 @@
+import json
+import math
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.city_geo_coordinates.city import City
+from src.utils.city_geo_coordinates.city_registry import (
+    CityRegistry,
+    haversine_km,
+    iter_json_array,
+)
+
+CITIES = [
+    {"name": "Antananarivo", "lat": -18.9137, "lon": 47.5361, "aliases": ["Tana"]},
+    {"name": "Toliara", "lat": -23.3542, "lon": 43.6697},
+    {"name": "São Paulo", "lat": -23.5475, "lon": -46.6361},
+    {"name": "Suva", "lat": -18.1416, "lon": 178.4419},
+    {"name": "Atlantis", "lat": None, "lon": None},
+]
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, content):
+        path = self.temp_dir / "cities.json"
+        path.write_text(content, encoding="utf-8")
+        return path
+
+    def test_streams_items_across_small_chunks(self):
+        path = self._write(json.dumps(CITIES, indent=2, ensure_ascii=False))
+        self.assertEqual(list(iter_json_array(path, chunk_size=7)), CITIES)
+
+    def test_numbers_split_by_chunks_are_not_truncated(self):
+        path = self._write("[12345, 678]")
+        self.assertEqual(list(iter_json_array(path, chunk_size=3)), [12345, 678])
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array(self._write(" [ ] "))), [])
+
+    def test_rejects_non_array_and_unclosed_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(self._write('{"name": "Paris"}')))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(self._write('[{"name": "Paris"}')))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(self._write("")))
+
+
+class TestCityRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.path = self.temp_dir / "cities.json"
+        self.path.write_text(json.dumps(CITIES), encoding="utf-8")
+        self.registry = CityRegistry.from_json(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_lookup_by_normalized_name_and_alias(self):
+        self.assertEqual(self.registry.get("sao paulo").name, "São Paulo")
+        self.assertEqual(self.registry.get("TANA").latitude, -18.9137)
+        self.assertIn("toliara", self.registry)
+        self.assertIsNone(self.registry.get("Paris"))
+
+    def test_city_without_coordinates_is_kept(self):
+        city = self.registry.get("Atlantis")
+        self.assertIsNone(city.latitude)
+        self.assertEqual(len(self.registry), 5)
+
+    def test_malformed_entries_are_skipped(self):
+        self.path.write_text(
+            json.dumps(
+                [
+                    {"lat": 1.0, "lon": 2.0},
+                    {"name": "Nowhere", "lat": "north"},
+                    "Paris",
+                    *CITIES,
+                ]
+            ),
+            encoding="utf-8",
+        )
+
+        with self.assertLogs(
+            "src.utils.city_geo_coordinates.city_registry", level="ERROR"
+        ) as cm:
+            registry = CityRegistry.from_json(self.path)
+
+        self.assertEqual(len(cm.output), 3)
+        self.assertEqual([city.name for city in registry], [c["name"] for c in CITIES])
+        self.assertNotIn("Nowhere", registry)
+
+    def test_iterates_cities_in_config_order(self):
+        names = [city.name for city in self.registry]
+        self.assertEqual(names, [c["name"] for c in CITIES])
+        self.assertIsInstance(next(iter(self.registry)), City)
+
+    def test_nearest_city(self):
+        city, km = self.registry.nearest(-18.88, 47.53)
+        self.assertEqual(city.name, "Antananarivo")
+        self.assertLess(km, 5)
+
+    def test_nearest_wraps_around_the_antimeridian(self):
+        city, _ = self.registry.nearest(-18.0, -179.9)
+        self.assertEqual(city.name, "Suva")
+
+    def test_nearest_on_empty_registry(self):
+        self.assertEqual(CityRegistry().nearest(0, 0), (None, math.inf))
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(7)
+        registry = CityRegistry(grid_resolution=2.0)
+        points = [(rng.uniform(-85, 85), rng.uniform(-180, 180)) for _ in range(500)]
+        for i, (lat, lon) in enumerate(points):
+            registry.add(f"City{i}", lat, lon)
+
+        for _ in range(50):
+            lat, lon = rng.uniform(-89, 89), rng.uniform(-180, 180)
+            expected = min(
+                range(len(points)), key=lambda i: haversine_km(lat, lon, *points[i])
+            )
+            city, _ = registry.nearest(lat, lon)
+            self.assertEqual(city.name, f"City{expected}")
+
+
+if __name__ == "__main__":
+    unittest.main()
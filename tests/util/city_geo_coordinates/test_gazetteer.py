@@ -0,0 +1,89 @@
+import gzip
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.city_geo_coordinates.gazetteer import Gazetteer
+
+
+def geonames_row(geonameid, name, ascii_name, alternates, lat, lon, population):
+    fields = [""] * 19
+    fields[0] = str(geonameid)
+    fields[1] = name
+    fields[2] = ascii_name
+    fields[3] = alternates
+    fields[4] = str(lat)
+    fields[5] = str(lon)
+    fields[14] = str(population)
+    return "\t".join(fields)
+
+
+ROWS = [
+    geonames_row(1, "Paris", "Paris", "Lutece,Paname", 48.85341, 2.3488, 2138551),
+    geonames_row(2, "Paris", "Paris", "", 33.66094, -95.55551, 24782),
+    geonames_row(
+        3, "Antananarivo", "Antananarivo", "Tana", -18.91368, 47.53613, 1391433
+    ),
+    geonames_row(4, "São Paulo", "Sao Paulo", "", -23.5475, -46.63611, 10021295),
+]
+
+
+class TestGazetteer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.path = self.temp_dir / "cities.txt"
+        self.path.write_text("\n".join(ROWS) + "\n", encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_homonyms_resolve_to_most_populated_place(self):
+        gazetteer = Gazetteer.from_tsv(self.path)
+        self.assertEqual(gazetteer.lookup("Paris"), (48.8534, 2.3488))
+
+    def test_lookup_is_accent_case_and_space_insensitive(self):
+        gazetteer = Gazetteer.from_tsv(self.path)
+        self.assertEqual(gazetteer.lookup("sao  PAULO"), (-23.5475, -46.6361))
+        self.assertEqual(gazetteer.lookup("São Paulo"), (-23.5475, -46.6361))
+
+    def test_alternate_names_are_indexed(self):
+        gazetteer = Gazetteer.from_tsv(self.path)
+        self.assertEqual(gazetteer.lookup("Tana"), (-18.9137, 47.5361))
+
+    def test_official_names_beat_alternate_names(self):
+        rows = [
+            *ROWS,
+            geonames_row(5, "Tana", "Tana", "", 69.91667, 28.21667, 2876),
+            geonames_row(6, "Sao Paulo de Olivenca", "", "Paris", -3.4, -68.9, 9000),
+        ]
+        self.path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+        gazetteer = Gazetteer.from_tsv(self.path)
+
+        self.assertEqual(gazetteer.lookup("Tana"), (69.9167, 28.2167))
+        self.assertEqual(gazetteer.lookup("Paris"), (48.8534, 2.3488))
+        self.assertEqual(gazetteer.lookup("Lutece"), (48.8534, 2.3488))
+
+    def test_alternate_names_can_be_disabled(self):
+        gazetteer = Gazetteer.from_tsv(self.path, alternate_names=False)
+        self.assertIsNone(gazetteer.lookup("Tana"))
+
+    def test_unknown_name_returns_none(self):
+        self.assertIsNone(Gazetteer.from_tsv(self.path).lookup("Atlantis"))
+
+    def test_reads_gzip_dump_and_skips_malformed_lines(self):
+        gz_path = self.temp_dir / "cities.txt.gz"
+        with gzip.open(gz_path, "wt", encoding="utf-8") as f:
+            f.write("\n".join([*ROWS, "broken\tline"]) + "\n")
+
+        with self.assertLogs(
+            "src.utils.city_geo_coordinates.gazetteer", level="WARNING"
+        ):
+            gazetteer = Gazetteer.from_tsv(gz_path)
+
+        self.assertEqual(len(gazetteer), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.city_geo_coordinates.geocode_cache import GeocodeCache
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestGeocodeCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.clock = FakeClock()
+        self.cache = GeocodeCache(
+            self.temp_dir / "geocode.sqlite", ttl=100, clock=self.clock
+        )
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_miss_returns_none(self):
+        self.assertIsNone(self.cache.get("Paris"))
+
+    def test_put_then_get(self):
+        self.cache.put("Paris", 48.8566, 2.3522)
+        self.assertEqual(self.cache.get("Paris"), (48.8566, 2.3522))
+
+    def test_lookup_ignores_case_and_spacing(self):
+        self.cache.put("São  Paulo", -23.5505, -46.6333)
+        self.assertEqual(self.cache.get(" são paulo"), (-23.5505, -46.6333))
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.put("Paris", 48.8566, 2.3522)
+        self.clock.now += 101
+        self.assertIsNone(self.cache.get("Paris"))
+
+    def test_entries_persist_across_instances(self):
+        self.cache.put("Tokyo", 35.6895, 139.6917)
+        other = GeocodeCache(self.temp_dir / "geocode.sqlite", clock=self.clock)
+        self.addCleanup(other.close)
+        self.assertEqual(other.get("Tokyo"), (35.6895, 139.6917))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,6 @@
 import json
+import shutil
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import mock_open, patch
@@ -157,3 +159,111 @@ class TestCityConfigurer(unittest.TestCase):
                 configurer.apply()
             except Exception:
                 self.fail("Exception was not handled gracefully")
+
+
+class TestIncrementalCityConfig(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.output_path = self.temp_dir / "cities.json"
+        self.existing = [
+            {"name": "Paris", "lat": 48.8566, "lon": 2.3522},
+            {"name": "Atlantis", "lat": None, "lon": None},
+        ]
+        self.output_path.write_text(json.dumps(self.existing), encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @patch("src.core.city_config.CityGeocoder")
+    def test_unchanged_city_list_skips_geocoding_and_write(self, mock_geocoder):
+        self.output_path.write_text(json.dumps(self.existing[:1]), encoding="utf-8")
+        mtime = self.output_path.stat().st_mtime_ns
+
+        CityConfigurer(["Paris"]).establish_cities_config(
+            ["Paris"], output_path=self.output_path
+        )
+
+        mock_geocoder.assert_not_called()
+        self.assertEqual(self.output_path.stat().st_mtime_ns, mtime)
+
+    @patch("src.core.city_config.CityGeocoder")
+    def test_only_new_or_unresolved_cities_are_geocoded(self, mock_geocoder):
+        mock_geocoder.return_value.geocode_cities.return_value = [
+            {"name": "Tokyo", "lat": 35.6895, "lon": 139.6917},
+            {"name": "Atlantis", "lat": None, "lon": None},
+        ]
+
+        CityConfigurer([]).establish_cities_config(
+            ["Tokyo", "Paris", "Atlantis"], output_path=self.output_path
+        )
+
+        mock_geocoder.return_value.geocode_cities.assert_called_once_with(
+            ["Tokyo", "Atlantis"]
+        )
+        written = json.loads(self.output_path.read_text(encoding="utf-8"))
+        self.assertEqual(
+            [city["name"] for city in written], ["Tokyo", "Paris", "Atlantis"]
+        )
+        self.assertEqual(written[1], self.existing[0])
+
+    @patch("src.core.city_config.CityGeocoder")
+    def test_spelling_variants_reuse_configured_coordinates(self, mock_geocoder):
+        CityConfigurer([]).establish_cities_config(
+            [" PARIS "], output_path=self.output_path
+        )
+
+        mock_geocoder.assert_not_called()
+        written = json.loads(self.output_path.read_text(encoding="utf-8"))
+        self.assertEqual(written, [{"name": " PARIS ", "lat": 48.8566, "lon": 2.3522}])
+
+    @patch("src.core.city_config.CityGeocoder")
+    def test_removed_cities_are_dropped(self, mock_geocoder):
+        CityConfigurer([]).establish_cities_config([], output_path=self.output_path)
+
+        mock_geocoder.assert_not_called()
+        self.assertEqual(json.loads(self.output_path.read_text(encoding="utf-8")), [])
+
+    @patch("src.core.city_config.CityGeocoder")
+    def test_unreadable_config_is_rebuilt(self, mock_geocoder):
+        self.output_path.write_text("{not json", encoding="utf-8")
+        mock_geocoder.return_value.geocode_cities.return_value = [
+            {"name": "Paris", "lat": 48.8566, "lon": 2.3522}
+        ]
+
+        CityConfigurer([]).establish_cities_config(
+            ["Paris"], output_path=self.output_path
+        )
+
+        written = json.loads(self.output_path.read_text(encoding="utf-8"))
+        self.assertEqual(written, self.existing[:1])
+
+    @patch("src.core.city_config.Gazetteer")
+    @patch("src.core.city_config.CityGeocoder")
+    def test_gazetteer_is_passed_to_geocoder(self, mock_geocoder, mock_gazetteer):
+        mock_geocoder.return_value.geocode_cities.return_value = [
+            {"name": "Tokyo", "lat": 35.6895, "lon": 139.6917}
+        ]
+        gazetteer_path = self.temp_dir / "cities500.txt"
+        gazetteer_path.touch()
+
+        CityConfigurer([], gazetteer_path=gazetteer_path).establish_cities_config(
+            ["Tokyo"], output_path=self.output_path
+        )
+
+        mock_gazetteer.from_tsv.assert_called_once_with(gazetteer_path)
+        self.assertIs(
+            mock_geocoder.call_args.kwargs["gazetteer"],
+            mock_gazetteer.from_tsv.return_value,
+        )
+
+    @patch("src.core.city_config.CityGeocoder")
+    def test_missing_gazetteer_falls_back_to_nominatim(self, mock_geocoder):
+        mock_geocoder.return_value.geocode_cities.return_value = [
+            {"name": "Tokyo", "lat": 35.6895, "lon": 139.6917}
+        ]
+        configurer = CityConfigurer([], gazetteer_path=self.temp_dir / "none.txt")
+
+        with self.assertLogs("src.core.city_config", level="WARNING"):
+            configurer.establish_cities_config(["Tokyo"], output_path=self.output_path)
+
+        self.assertIsNone(mock_geocoder.call_args.kwargs["gazetteer"])
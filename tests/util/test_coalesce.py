@@ -0,0 +1,38 @@
+import unittest
+
+from src.utils.coalesce import group_by_cell
+
+CITIES = [
+    {"name": "Antananarivo", "lat": -18.9101, "lon": 47.5255},
+    {"name": "Ivandry", "lat": -18.9312, "lon": 47.5312},
+    {"name": "Toliara", "lat": -23.3542, "lon": 43.6697},
+]
+
+
+class TestGroupByCell(unittest.TestCase):
+    def test_without_resolution_keeps_one_request_per_city(self):
+        cells = group_by_cell(CITIES)
+        self.assertEqual([c["names"] for c in cells], [[c["name"]] for c in CITIES])
+        self.assertEqual(cells[0]["lat"], -18.9101)
+
+    def test_groups_cities_sharing_a_cell(self):
+        cells = group_by_cell(CITIES, resolution=0.1)
+        self.assertEqual(
+            [c["names"] for c in cells], [["Antananarivo", "Ivandry"], ["Toliara"]]
+        )
+
+    def test_cells_are_fetched_at_a_member_city(self):
+        cells = group_by_cell(CITIES, resolution=0.1)
+        self.assertEqual((cells[0]["lat"], cells[0]["lon"]), (-18.9101, 47.5255))
+        self.assertEqual((cells[1]["lat"], cells[1]["lon"]), (-23.3542, 43.6697))
+
+    def test_coarser_resolution_merges_more_cities(self):
+        self.assertEqual(len(group_by_cell(CITIES, resolution=30)), 1)
+
+    def test_city_without_coordinates_stays_alone(self):
+        cells = group_by_cell([*CITIES, {"name": "Nowhere"}], resolution=0.1)
+        self.assertEqual(cells[0], {"lat": None, "lon": None, "names": ["Nowhere"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
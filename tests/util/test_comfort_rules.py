@@ -0,0 +1,151 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.core.transform import Transform
+from src.utils.comfort_rules import DEFAULT_RULES_PATH, compile_rules, load_rules
+
+
+def reference_scores(df):
+    is_ideal_temp = df["temp_C"].between(22, 28)
+    is_low_rain = df["rain_1d"] == 0
+    is_low_wind = df["wind_speed"] < 5.0
+    is_ideal_humidity = df["humidity"].between(30, 70)
+    return {
+        "is_ideal_temp": is_ideal_temp,
+        "is_low_rain": is_low_rain,
+        "is_low_wind": is_low_wind,
+        "is_ideal_humidity": is_ideal_humidity,
+        "comfort_score": is_ideal_temp.astype(int) * 0.4
+        + is_low_rain.astype(int) * 0.3
+        + is_low_wind.astype(int) * 0.2
+        + is_ideal_humidity.astype(int) * 0.1,
+        "is_ideal_day": is_ideal_temp & is_low_rain & is_low_wind,
+    }
+
+
+def seasonal_config():
+    config = json.loads(DEFAULT_RULES_PATH.read_text(encoding="utf-8"))
+    config["seasons"] = {
+        "austral_winter": {
+            "months": [6, 7, 8],
+            "flags": {"is_ideal_temp": {"min": 18, "max": 24}},
+        }
+    }
+    config["cities"] = {
+        "Toliara": {"flags": {"is_low_wind": {"below": 8.0, "weight": 0.25}}}
+    }
+    return config
+
+
+class TestComfortRules(unittest.TestCase):
+    def test_default_rules_match_the_original_thresholds(self):
+        rng = np.random.default_rng(0)
+        n = 5000
+        df = pd.DataFrame(
+            {
+                "temp_C": rng.choice([21.5, 22, 25, 28, 28.5, np.nan], n),
+                "rain_1d": rng.choice([0, 0.2, np.nan], n),
+                "wind_speed": rng.choice([4.9, 5, 7], n),
+                "humidity": rng.choice([29, 30, 70, 71], n),
+            }
+        )
+
+        result = load_rules().evaluate(df)
+        expected = reference_scores(df)
+
+        self.assertEqual(list(result), list(expected))
+        for column, values in expected.items():
+            np.testing.assert_array_equal(result[column], values.to_numpy())
+
+    def test_season_and_city_profiles(self):
+        rules = compile_rules(seasonal_config())
+        df = pd.DataFrame(
+            {
+                "city": ["Paris", "Paris", "Toliara"],
+                "timestamp": ["2025-01-10", "2025-07-10", "2025-07-10"],
+                "temp_C": [20.0, 20.0, 25.0],
+                "rain_1d": [0.0, 0.0, 0.0],
+                "wind_speed": [6.0, 6.0, 6.0],
+                "humidity": [50, 50, 50],
+            }
+        )
+
+        result = rules.evaluate(df)
+
+        # City profiles take precedence over seasons and inherit the defaults.
+        np.testing.assert_array_equal(result["is_ideal_temp"], [False, True, True])
+        np.testing.assert_array_equal(result["is_low_wind"], [False, False, True])
+        np.testing.assert_allclose(result["comfort_score"], [0.4, 0.8, 1.05])
+
+    def test_missing_timestamp_uses_the_default_profile(self):
+        rules = compile_rules(seasonal_config())
+        df = pd.DataFrame(
+            {
+                "city": ["Paris", "Paris", "Toliara"],
+                "timestamp": pd.to_datetime(["2025-07-10", None, None]),
+                "temp_C": [20.0, 25.0, 25.0],
+                "rain_1d": [0.0, 0.0, 0.0],
+                "wind_speed": [6.0, 6.0, 6.0],
+                "humidity": [50, 50, 50],
+            }
+        )
+
+        result = rules.evaluate(df)
+
+        np.testing.assert_array_equal(rules.profiles(df), [1, 0, 2])
+        np.testing.assert_array_equal(result["is_ideal_temp"], [True, True, True])
+        np.testing.assert_array_equal(result["is_low_wind"], [False, False, True])
+
+    def test_compiled_rule_sets_are_cached(self):
+        self.assertIs(
+            compile_rules(seasonal_config()), compile_rules(seasonal_config())
+        )
+
+    def test_override_cannot_change_the_kind_of_bound(self):
+        config = seasonal_config()
+        config["cities"]["Paris"] = {"flags": {"is_low_wind": {"max": 5.0}}}
+        with self.assertRaises(ValueError):
+            compile_rules(config)
+
+    def test_ideal_day_must_use_known_flags(self):
+        config = seasonal_config()
+        config["ideal_day"] = ["is_sunny"]
+        with self.assertRaises(ValueError):
+            compile_rules(config)
+
+
+class TestTransformWithRules(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_transform_uses_configured_rules(self):
+        rules_path = self.temp_dir / "rules.json"
+        rules_path.write_text(json.dumps(seasonal_config()), encoding="utf-8")
+        df = pd.DataFrame(
+            {
+                "city": ["Antananarivo"],
+                "timestamp": ["2025-07-10"],
+                "temp_C": [20.0],
+                "rain_1d": [0.0],
+                "wind_speed": [3.0],
+                "humidity": [50],
+            }
+        )
+
+        result = Transform(rules_path=rules_path).transform_dataframe(df)
+
+        self.assertTrue(result.iloc[0]["is_ideal_day"])
+        self.assertAlmostEqual(result.iloc[0]["comfort_score"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
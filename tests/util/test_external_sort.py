@@ -0,0 +1,174 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils import schema
+from src.utils.external_sort import ExternalSort, is_sorted, merge_sorted, sort_frame
+
+
+def make_frame(cities, days, temp=20.0):
+    return schema.apply_schema(
+        pd.DataFrame(
+            {
+                "city": cities,
+                "timestamp": pd.to_datetime("2025-06-01")
+                + pd.to_timedelta(days, unit="D"),
+                "temp_C": temp,
+            }
+        )
+    )
+
+
+class TestExternalSort(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        rng = np.random.default_rng(0)
+        self.df = make_frame(
+            rng.choice(["Paris", "Tokyo", "Ambanja", "Lima"], 2000),
+            rng.integers(0, 300, 2000),
+            rng.integers(0, 3, 2000).astype("float32"),
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_sort(self, chunks, memory_budget=20_000, dedupe="rows"):
+        with ExternalSort(memory_budget, dedupe, self.temp_dir) as sorter:
+            for chunk in chunks:
+                sorter.add(chunk)
+            runs = len(sorter.runs)
+            merged = list(sorter.merged())
+        return pd.concat(merged, ignore_index=True), runs
+
+    def chunks(self, df, size=150):
+        return [df.iloc[start : start + size] for start in range(0, len(df), size)]
+
+    def test_merge_of_spilled_runs_matches_in_memory_sort(self):
+        merged, runs = self.run_sort(self.chunks(self.df))
+
+        expected = (
+            self.df.drop_duplicates()
+            .sort_values(["city", "timestamp"])
+            .reset_index(drop=True)
+        )
+        self.assertGreater(runs, 1)
+        pd.testing.assert_frame_equal(merged, expected)
+
+    def test_keys_dedupe_keeps_last_row_across_runs(self):
+        update = self.df.drop_duplicates(["city", "timestamp"]).head(300)
+        update = update.assign(temp_C=np.float32(99))
+        combined = schema.apply_schema(pd.concat([self.df, update], ignore_index=True))
+
+        merged, runs = self.run_sort(self.chunks(combined), dedupe="keys")
+
+        expected = (
+            combined.drop_duplicates(["city", "timestamp"], keep="last")
+            .sort_values(["city", "timestamp"])
+            .reset_index(drop=True)
+        )
+        self.assertGreater(runs, 1)
+        pd.testing.assert_frame_equal(merged, expected)
+        self.assertEqual((merged["temp_C"] == 99).sum(), 300)
+
+    def test_small_input_is_sorted_without_spilling(self):
+        merged, runs = self.run_sort([self.df], memory_budget=2**30)
+
+        self.assertEqual(runs, 0)
+        pd.testing.assert_frame_equal(merged, sort_frame(self.df.drop_duplicates()))
+
+    def test_missing_keys_sort_last(self):
+        df = make_frame(["Paris", None, "Lima", "Lima"], [2, 1, 3, 1])
+        df.loc[2, "timestamp"] = pd.NaT
+
+        merged, runs = self.run_sort(self.chunks(df, 1), 1)
+
+        self.assertEqual(runs, 4)
+        pd.testing.assert_frame_equal(
+            merged, df.sort_values(["city", "timestamp"]).reset_index(drop=True)
+        )
+        self.assertTrue(pd.isna(merged["timestamp"].iloc[1]))
+        self.assertTrue(pd.isna(merged["city"].iloc[3]))
+
+    def test_temporary_runs_are_removed(self):
+        self.run_sort(self.chunks(self.df))
+        self.assertEqual(list(self.temp_dir.iterdir()), [])
+
+    def test_sorted_inputs_become_runs_as_they_are(self):
+        history = sort_frame(self.df.drop_duplicates(["city", "timestamp"]))
+        update = sort_frame(history.sample(300, random_state=0)).assign(
+            temp_C=np.float32(99)
+        )
+
+        with ExternalSort(20_000, "keys", self.temp_dir) as sorter:
+            self.assertTrue(sorter.add_sorted(self.chunks(history)))
+            self.assertTrue(sorter.add_sorted(self.chunks(update)))
+            runs = len(sorter.runs)
+            merged = pd.concat(sorter.merged(), ignore_index=True)
+
+        self.assertEqual(runs, 2)
+        pd.testing.assert_frame_equal(
+            merged, merge_sorted(history, update).reset_index(drop=True)
+        )
+        self.assertEqual((merged["temp_C"] == 99).sum(), 300)
+
+    def test_unsorted_input_falls_back_to_sorting(self):
+        history = sort_frame(self.df)
+        chunks = self.chunks(history)
+        chunks[3], chunks[4] = chunks[4], chunks[3]
+
+        with ExternalSort(20_000, "rows", self.temp_dir) as sorter:
+            self.assertFalse(sorter.add_sorted(iter(chunks)))
+            merged = pd.concat(sorter.merged(), ignore_index=True)
+
+        expected = sort_frame(pd.concat(chunks, ignore_index=True).drop_duplicates())
+        pd.testing.assert_frame_equal(merged, expected)
+
+
+class TestMergeSorted(unittest.TestCase):
+    def test_is_sorted_orders_missing_keys_last(self):
+        df = make_frame(["Lima", "Lima", "Paris", None], [1, 3, 2, 1])
+        self.assertTrue(is_sorted(df))
+        df.loc[1, "timestamp"] = pd.NaT
+        self.assertTrue(is_sorted(df))
+        self.assertFalse(is_sorted(df.iloc[::-1]))
+
+    def test_keeps_last_row_per_key(self):
+        history = make_frame(["Lima", "Lima", "Paris"], [1, 2, 1], 10.0)
+        new = make_frame(["Ambanja", "Lima", "Tokyo"], [5, 2, 1], 20.0)
+
+        merged = merge_sorted(history, new)
+
+        self.assertEqual(
+            list(merged["city"]), ["Ambanja", "Lima", "Lima", "Paris", "Tokyo"]
+        )
+        self.assertEqual(list(merged["temp_C"]), [20.0, 10.0, 20.0, 10.0, 20.0])
+
+    def test_matches_concat_and_sort(self):
+        rng = np.random.default_rng(1)
+        frames = [
+            sort_frame(
+                make_frame(
+                    rng.choice(["Paris", "Tokyo", "Lima"], 500),
+                    rng.integers(0, 100, 500),
+                    rng.integers(0, 3, 500).astype("float32"),
+                )
+            )
+            for _ in range(3)
+        ]
+
+        expected = sort_frame(
+            schema.apply_schema(pd.concat(frames, ignore_index=True))
+        ).drop_duplicates(["city", "timestamp"], keep="last", ignore_index=True)
+        pd.testing.assert_frame_equal(merge_sorted(*frames), expected)
+        pd.testing.assert_frame_equal(
+            merge_sorted(*frames, dedupe=None),
+            sort_frame(schema.apply_schema(pd.concat(frames, ignore_index=True))),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
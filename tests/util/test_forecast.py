@@ -0,0 +1,190 @@
+import os
+import time
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from src.utils.forecast import (
+    DAILY_COLUMNS,
+    HORIZON_COLUMNS,
+    ForecastSkipped,
+    aggregate_daily_forecasts,
+    flatten_forecasts,
+)
+
+NOW = datetime(2025, 6, 25, 8, 0, 0)
+
+
+def make_entry(dt_txt, temp, weather_main="Clear", description="clear sky", **extra):
+    entry = {
+        "dt": int(datetime.fromisoformat(dt_txt).timestamp()),
+        "dt_txt": dt_txt,
+        "main": {
+            "temp": temp,
+            "temp_min": temp - 1,
+            "temp_max": temp + 1,
+            "feels_like": temp,
+            "pressure": 1010,
+            "humidity": 50,
+        },
+        "wind": {"speed": 3.0, "deg": 180},
+        "clouds": {"all": 20},
+        "weather": [{"main": weather_main, "description": description}],
+    }
+    entry.update(extra)
+    return entry
+
+
+def make_payload(entries):
+    return {"list": entries, "city": {"sunrise": 1750822380, "sunset": 1750878253}}
+
+
+class TestAggregateDailyForecasts(unittest.TestCase):
+    def test_means_only_cover_today_entries(self):
+        payload = make_payload(
+            [
+                make_entry("2025-06-25 09:00:00", 20.0, pop=0.2),
+                make_entry("2025-06-25 12:00:00", 26.0, rain={"3h": 1.5}),
+                make_entry("2025-06-26 09:00:00", 40.0),
+            ]
+        )
+        frame, errors = aggregate_daily_forecasts({"Paris": payload}, NOW)
+
+        self.assertEqual(errors, {})
+        self.assertEqual(list(frame.columns), DAILY_COLUMNS)
+        row = frame.iloc[0]
+        self.assertAlmostEqual(row["temp_C"], 23.0)
+        self.assertAlmostEqual(row["temp_max_C"], 24.0)
+        self.assertAlmostEqual(row["precipitation_prob"], 0.1)
+        self.assertAlmostEqual(row["rain_1d"], 0.75)
+        self.assertEqual(row["timestamp"], NOW)
+        self.assertEqual(row["sunrise"], datetime.fromtimestamp(1750822380))
+
+    def test_missing_values_are_ignored_in_means(self):
+        payload = make_payload(
+            [
+                make_entry("2025-06-25 09:00:00", 20.0),
+                make_entry("2025-06-25 12:00:00", 22.0),
+            ]
+        )
+        payload["list"][0]["wind"]["gust"] = 6.0
+        frame, _ = aggregate_daily_forecasts({"Paris": payload}, NOW)
+        self.assertAlmostEqual(frame.iloc[0]["wind_gust"], 6.0)
+
+    def test_all_missing_values_give_nan(self):
+        payload = make_payload([make_entry("2025-06-25 09:00:00", 20.0)])
+        frame, _ = aggregate_daily_forecasts({"Paris": payload}, NOW)
+        self.assertTrue(np.isnan(frame.iloc[0]["wind_gust"]))
+
+    def test_mode_prefers_most_common_then_first_seen(self):
+        payload = make_payload(
+            [
+                make_entry("2025-06-25 06:00:00", 20.0, "Rain", "light rain"),
+                make_entry("2025-06-25 09:00:00", 20.0, "Clouds", "few clouds"),
+                make_entry("2025-06-25 12:00:00", 20.0, "Clouds", "broken clouds"),
+            ]
+        )
+        frame, _ = aggregate_daily_forecasts({"Paris": payload}, NOW)
+        self.assertEqual(frame.iloc[0]["weather_main"], "Clouds")
+        self.assertEqual(frame.iloc[0]["weather_description"], "light rain")
+
+    def test_many_cities_in_one_frame(self):
+        payloads = {
+            f"City{i}": make_payload(
+                [
+                    make_entry("2025-06-25 09:00:00", float(i)),
+                    make_entry("2025-06-25 12:00:00", float(i) + 2, "Rain"),
+                    make_entry("2025-06-25 15:00:00", float(i) + 4, "Rain"),
+                ]
+            )
+            for i in range(50)
+        }
+        frame, errors = aggregate_daily_forecasts(payloads, NOW)
+
+        self.assertEqual(errors, {})
+        self.assertEqual(list(frame["city"]), list(payloads))
+        np.testing.assert_allclose(frame["temp_C"], np.arange(50) + 2.0)
+        self.assertTrue((frame["weather_main"] == "Rain").all())
+
+    def test_errors_are_isolated_per_city(self):
+        broken = make_payload([make_entry("2025-06-25 09:00:00", 20.0)])
+        del broken["list"][0]["main"]["temp"]
+        payloads = {
+            "Empty": {"list": []},
+            "Stale": make_payload([make_entry("2025-06-20 09:00:00", 20.0)]),
+            "Broken": broken,
+            "Paris": make_payload([make_entry("2025-06-25 09:00:00", 20.0)]),
+        }
+        frame, errors = aggregate_daily_forecasts(payloads, NOW)
+
+        self.assertEqual(list(frame["city"]), ["Paris"])
+        self.assertIsInstance(errors["Empty"], ForecastSkipped)
+        self.assertIsInstance(errors["Stale"], ForecastSkipped)
+        self.assertIsInstance(errors["Broken"], KeyError)
+
+    def test_no_valid_city_returns_empty_frame(self):
+        frame, errors = aggregate_daily_forecasts({"Empty": {}}, NOW)
+        self.assertTrue(frame.empty)
+        self.assertEqual(list(frame.columns), DAILY_COLUMNS)
+        self.assertIn("Empty", errors)
+
+
+class TestFlattenForecasts(unittest.TestCase):
+    def setUp(self):
+        self.tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Indian/Antananarivo"
+        time.tzset()
+
+    def tearDown(self):
+        if self.tz is None:
+            os.environ.pop("TZ")
+        else:
+            os.environ["TZ"] = self.tz
+        time.tzset()
+
+    def test_keeps_every_slot_with_lead_time(self):
+        payload = make_payload(
+            [
+                make_entry("2025-06-25 09:00:00", 20.0, rain={"3h": 0.5}),
+                make_entry("2025-06-26 09:00:00", 21.0),
+                make_entry("2025-06-29 21:00:00", 22.0, "Rain"),
+            ]
+        )
+        frame, errors = flatten_forecasts({"Paris": payload, "Rome": payload}, NOW)
+
+        self.assertEqual(errors, {})
+        self.assertEqual(list(frame.columns), HORIZON_COLUMNS)
+        self.assertEqual(len(frame), 6)
+        paris = frame[frame["city"] == "Paris"].reset_index(drop=True)
+        self.assertEqual(list(paris["lead_hours"]), [1.0, 25.0, 109.0])
+        self.assertEqual(list(paris["temp_C"]), [20.0, 21.0, 22.0])
+        self.assertEqual(list(paris["rain_3h"]), [0.5, 0.0, 0.0])
+        self.assertEqual(paris.loc[2, "weather_main"], "Rain")
+        self.assertTrue((frame["issued_at"] == NOW).all())
+
+    def test_forecast_time_is_local_like_issued_at(self):
+        payload = make_payload([make_entry("2025-06-25 09:00:00", 20.0)])
+        frame, _ = flatten_forecasts({"Paris": payload}, NOW)
+
+        row = frame.iloc[0]
+        self.assertEqual(row["forecast_time"], datetime(2025, 6, 25, 9, 0, 0))
+        self.assertEqual(
+            (row["forecast_time"] - row["issued_at"]).total_seconds() / 3600,
+            row["lead_hours"],
+        )
+
+    def test_errors_are_isolated_per_city(self):
+        frame, errors = flatten_forecasts(
+            {
+                "Empty": {"list": []},
+                "Paris": make_payload([make_entry("2025-06-25 09:00:00", 20.0)]),
+            },
+            NOW,
+        )
+        self.assertEqual(list(frame["city"]), ["Paris"])
+        self.assertIsInstance(errors["Empty"], ForecastSkipped)
+
+
+if __name__ == "__main__":
+    unittest.main()
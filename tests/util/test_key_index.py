@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.key_index import KEY_COLUMNS, KeyIndex, hash_rows, index_path
+
+
+def keys(*values):
+    return np.array(values, dtype=np.uint64)
+
+
+class TestHashRows(unittest.TestCase):
+    def test_hash_ignores_datetime_resolution_and_string_dtype(self):
+        timestamps = pd.to_datetime(["2025-06-28 12:00", "2025-06-28 15:00"])
+        first = pd.DataFrame(
+            {
+                "city": pd.Series(["Paris", "Tokyo"], dtype="category"),
+                "timestamp": timestamps.as_unit("us"),
+            }
+        )
+        second = pd.DataFrame(
+            {"city": ["Paris", "Tokyo"], "timestamp": timestamps.as_unit("ns")}
+        )
+        np.testing.assert_array_equal(hash_rows(first), hash_rows(second))
+
+    def test_key_columns_only(self):
+        df = pd.DataFrame(
+            {"city": ["Paris", "Paris"], "timestamp": [1, 1], "temp_C": [20.0, 21.0]}
+        )
+        hashes = hash_rows(df, KEY_COLUMNS)
+        self.assertEqual(hashes[0], hashes[1])
+        self.assertNotEqual(*hash_rows(df))
+
+
+class TestKeyIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_build_keeps_last_value_per_key(self):
+        index = KeyIndex.build(keys(3, 1, 3), keys(30, 10, 31))
+        np.testing.assert_array_equal(index.keys, keys(1, 3))
+        np.testing.assert_array_equal(index.values, keys(10, 31))
+
+    def test_changed_flags_new_and_superseding_rows(self):
+        index = KeyIndex.build(keys(1, 3), keys(10, 30))
+        changed = index.changed(keys(1, 2, 3), keys(10, 20, 31))
+        self.assertEqual(list(changed), [False, True, True])
+        self.assertEqual(list(index.contains(keys(1, 2, 3))), [True, False, True])
+
+    def test_empty_index_reports_everything_as_changed(self):
+        self.assertEqual(list(KeyIndex().changed(keys(1, 2), keys(1, 2))), [True] * 2)
+
+    def test_update_overrides_values(self):
+        index = KeyIndex.build(keys(1, 3), keys(10, 30))
+        index.update(keys(3, 5), keys(31, 50))
+        np.testing.assert_array_equal(index.keys, keys(1, 3, 5))
+        np.testing.assert_array_equal(index.values, keys(10, 31, 50))
+
+    def test_save_and_load_are_tied_to_the_data_file(self):
+        data_path = self.temp_dir / "data.csv"
+        data_path.write_text("city,timestamp\n")
+        index = KeyIndex.build(keys(2, 1), columns=["city", "timestamp"])
+        index.save(data_path)
+
+        self.assertTrue(index_path(data_path).exists())
+        loaded = KeyIndex.load(data_path, ["city", "timestamp"])
+        np.testing.assert_array_equal(loaded.keys, keys(1, 2))
+        self.assertEqual(loaded.columns, ["city", "timestamp"])
+        self.assertIsNone(KeyIndex.load(data_path, ["city"]))
+
+        data_path.write_text("city,timestamp\nParis,2025-06-28\n")
+        self.assertIsNone(KeyIndex.load(data_path))
+
+    def test_load_missing_index(self):
+        self.assertIsNone(KeyIndex.load(self.temp_dir / "missing.csv"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.utils import openweather_schema
+from src.utils.forecast import aggregate_daily_forecasts
+from src.utils.openweather_schema import Forecast, decode_forecast, forecast_from_dict
+
+RAW_FORECAST = {
+    "cod": "200",
+    "cnt": 2,
+    "list": [
+        {
+            "dt": 1750842000,
+            "dt_txt": "2025-06-25 09:00:00",
+            "main": {
+                "temp": 24.5,
+                "temp_min": 23.0,
+                "temp_max": 25.0,
+                "feels_like": 24.9,
+                "pressure": 1012,
+                "sea_level": 1012,
+                "humidity": 60,
+            },
+            "wind": {"speed": 3.2, "deg": 180, "gust": 4.1},
+            "clouds": {"all": 50},
+            "visibility": 10000,
+            "pop": 0.2,
+            "rain": {"3h": 0.4},
+            "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds"}],
+        },
+        {
+            "dt": 1750852800,
+            "dt_txt": "2025-06-25 12:00:00",
+            "main": {
+                "temp": 26.5,
+                "temp_min": 25.0,
+                "temp_max": 27.0,
+                "feels_like": 26.9,
+                "pressure": 1010,
+                "humidity": 55,
+            },
+            "wind": {"speed": 4.0, "deg": 200},
+            "clouds": {"all": 10},
+            "weather": [{"id": 800, "main": "Clear", "description": "clear sky"}],
+        },
+    ],
+    "city": {
+        "name": "Paris",
+        "coord": {"lat": 48.85, "lon": 2.35},
+        "sunrise": 1750822380,
+        "sunset": 1750878253,
+    },
+}
+
+
+class TestOpenWeatherSchema(unittest.TestCase):
+    def setUp(self):
+        self.content = json.dumps(RAW_FORECAST).encode("utf-8")
+
+    def assert_decoded(self, forecast):
+        self.assertIsInstance(forecast, Forecast)
+        self.assertEqual(len(forecast.list), 2)
+        first, second = forecast.list
+        self.assertEqual(first.main.temp, 24.5)
+        self.assertEqual(first.wind.gust, 4.1)
+        self.assertEqual(first.rain, {"3h": 0.4})
+        self.assertEqual(first.weather[0].description, "broken clouds")
+        self.assertIsNone(second.wind.gust)
+        self.assertEqual(second.pop, 0.0)
+        self.assertEqual(forecast.city.sunset, 1750878253)
+        self.assertFalse(hasattr(first.main, "sea_level"))
+
+    def test_decode_forecast(self):
+        self.assert_decoded(decode_forecast(self.content))
+
+    def test_decode_forecast_without_msgspec(self):
+        with patch.object(openweather_schema, "_decoder", None):
+            self.assert_decoded(decode_forecast(self.content))
+
+    def test_decode_forecast_stdlib_only(self):
+        with patch.object(openweather_schema, "_decoder", None), patch.object(
+            openweather_schema, "orjson", None
+        ):
+            self.assert_decoded(decode_forecast(self.content))
+
+    def test_missing_list_decodes_to_empty_forecast(self):
+        forecast = forecast_from_dict({"current": {"temp": 25}})
+        self.assertEqual(forecast.list, [])
+        self.assertIsNone(forecast.city)
+
+    def test_typed_and_dict_payloads_aggregate_identically(self):
+        now = datetime(2025, 6, 25, 8, 0, 0)
+        from_dict, _ = aggregate_daily_forecasts({"Paris": RAW_FORECAST}, now)
+        typed, _ = aggregate_daily_forecasts(
+            {"Paris": decode_forecast(self.content)}, now
+        )
+        pd.testing.assert_frame_equal(from_dict, typed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import patch
+
+from src.utils.rate_limit import (
+    CircuitBreaker,
+    CircuitOpenError,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_paces_calls_at_quota(self):
+        bucket = TokenBucket(60, clock=self.clock)
+        for _ in range(10):
+            bucket.acquire(sleep=self.clock.sleep)
+        self.assertAlmostEqual(self.clock.now, 9.0)
+
+    def test_capacity_allows_initial_burst(self):
+        bucket = TokenBucket(60, capacity=5, clock=self.clock)
+        for _ in range(5):
+            bucket.acquire(sleep=self.clock.sleep)
+        self.assertEqual(self.clock.now, 0.0)
+        bucket.acquire(sleep=self.clock.sleep)
+        self.assertAlmostEqual(self.clock.now, 1.0)
+
+    def test_pause_blocks_until_retry_after(self):
+        bucket = TokenBucket(60, capacity=5, clock=self.clock)
+        bucket.pause(30)
+        self.assertAlmostEqual(bucket.try_acquire(), 30.0)
+        bucket.acquire(sleep=self.clock.sleep)
+        self.assertGreaterEqual(self.clock.now, 30.0)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            failure_threshold=3, reset_timeout=60, clock=self.clock
+        )
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(3):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_success_resets_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_after_reset_timeout(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now += 61
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_half_open_admits_a_single_trial_call(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now += 61
+        self.breaker.before_call()
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record_success()
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestRetryHelpers(unittest.TestCase):
+    def test_backoff_delay_is_capped(self):
+        with patch("src.utils.rate_limit.random.uniform", side_effect=lambda a, b: b):
+            self.assertEqual(backoff_delay(0), 1.0)
+            self.assertEqual(backoff_delay(3), 8.0)
+            self.assertEqual(backoff_delay(10, cap=30), 30)
+
+    def test_parse_retry_after_seconds(self):
+        self.assertEqual(parse_retry_after("12"), 12.0)
+
+    def test_parse_retry_after_http_date_in_past(self):
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+    def test_parse_retry_after_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from src.utils.raw_log import RawResponseLog, read_log_file
+
+
+class TestRawResponseLog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.log = RawResponseLog(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_append_writes_date_partitioned_ndjson(self):
+        payload = {"list": [{"dt": 1}], "city": {"sunrise": 1, "sunset": 2}}
+        file_path = self.log.append(
+            json.dumps(payload).encode(), ["Paris"], 48.85, 2.35
+        )
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.assertEqual(file_path.parent, self.temp_dir / today)
+        self.assertEqual(self.log.dates(), [today])
+
+        records = list(self.log.read_partition(today))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["city_names"], ["Paris"])
+        self.assertEqual(records[0]["lat"], 48.85)
+        self.assertEqual(records[0]["payload"], payload)
+
+    def test_multiline_payload_is_compacted(self):
+        payload = {"list": [], "city": {"name": "São Paulo"}}
+        content = json.dumps(payload, indent=2).encode()
+        file_path = self.log.append(content, ["São Paulo"], -23.55, -46.63)
+
+        with gzip.open(file_path, "rb") as f:
+            self.assertEqual(len(f.read().splitlines()), 1)
+        self.assertEqual(list(read_log_file(file_path))[0]["payload"], payload)
+
+    def test_appends_are_readable_as_one_stream(self):
+        for i in range(3):
+            self.log.append(b'{"list":[]}', [f"City{i}"], i, i)
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        names = [r["city_names"][0] for r in self.log.read_partition(today)]
+        self.assertEqual(names, ["City0", "City1", "City2"])
+
+    def test_truncated_tail_is_ignored(self):
+        file_path = self.log.append(b'{"list":[]}', ["Paris"], 1, 2)
+        with open(file_path, "ab") as f:
+            f.write(gzip.compress(b'{"city_names":["Rome"]}\n')[:20])
+
+        records = list(read_log_file(file_path))
+        self.assertEqual([r["city_names"] for r in records], [["Paris"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self, now=1_750_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.clock = FakeClock()
+        self.cache = ResponseCache(self.temp_dir, clock=self.clock)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        key = self.cache.key(12.34, 56.78)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, b'{"list": []}')
+        self.assertEqual(self.cache.get(key), b'{"list": []}')
+
+    def test_key_depends_on_coordinates_units_and_slot(self):
+        base = self.cache.key(12.34, 56.78, "metric", slot=1)
+        self.assertEqual(base, self.cache.key(12.34, 56.78, "metric", slot=1))
+        self.assertNotEqual(base, self.cache.key(12.35, 56.78, "metric", slot=1))
+        self.assertNotEqual(base, self.cache.key(12.34, 56.78, "imperial", slot=1))
+        self.assertNotEqual(base, self.cache.key(12.34, 56.78, "metric", slot=2))
+
+    def test_key_changes_with_forecast_slot(self):
+        first = self.cache.key(1, 2)
+        self.clock.now += ResponseCache.SLOT_SECONDS
+        self.assertNotEqual(first, self.cache.key(1, 2))
+
+    def test_expired_entries_are_dropped(self):
+        key = self.cache.key(1, 2, slot=0)
+        self.cache.put(key, b"{}")
+        self.clock.now += self.cache.ttl + 1
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(list(self.temp_dir.glob("*/*.json")), [])
+
+    def test_size_eviction_removes_least_recently_used(self):
+        cache = ResponseCache(self.temp_dir, max_bytes=25, clock=self.clock)
+        keys = [cache.key(i, i, slot=0) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.clock.now += 1
+            cache.put(key, b"x" * 10)
+            if i == 1:
+                self.clock.now += 1
+                cache.get(keys[0])
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
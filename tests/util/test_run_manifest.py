@@ -0,0 +1,57 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.run_manifest import RunManifest
+
+
+class TestRunManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.path = self.temp_dir / "2025-06-25" / "_manifest.json"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_unknown_city_has_no_status(self):
+        self.assertIsNone(RunManifest(self.path).status("Paris"))
+
+    def test_mark_many_persists_statuses(self):
+        manifest = RunManifest(self.path)
+        manifest.mark_many(
+            {
+                "Paris": (RunManifest.DONE, None),
+                "Rome": (RunManifest.FAILED, ValueError("timeout")),
+            }
+        )
+
+        reloaded = RunManifest(self.path)
+        self.assertEqual(reloaded.status("Paris"), RunManifest.DONE)
+        self.assertEqual(reloaded.status("Rome"), RunManifest.FAILED)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["Rome"]["error"], "timeout")
+
+    def test_later_marks_override_earlier_ones(self):
+        manifest = RunManifest(self.path)
+        manifest.mark_many({"Rome": (RunManifest.FAILED, "boom")})
+        manifest.mark_many({"Rome": (RunManifest.DONE, None)})
+        self.assertEqual(manifest.failed(), [])
+        self.assertIsNone(RunManifest(self.path).entries["Rome"]["error"])
+
+    def test_failed_lists_only_failed_cities(self):
+        manifest = RunManifest(self.path)
+        manifest.mark_many(
+            {
+                "Paris": (RunManifest.DONE, None),
+                "Rome": (RunManifest.FAILED, "boom"),
+                "Oslo": (RunManifest.SKIPPED, "no data"),
+                "Lima": (RunManifest.FAILED, "boom"),
+            }
+        )
+        self.assertEqual(manifest.failed(), ["Lima", "Rome"])
+
+
+if __name__ == "__main__":
+    unittest.main()
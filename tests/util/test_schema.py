@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.utils import schema
+
+CSV = (
+    "city,timestamp,temp_C,humidity,weather_main,is_ideal_temp,comfort_score,"
+    "month,year,summary\n"
+    "Paris,2025-06-28,24.5,55,Clear,True,0.7,June,2025,\n"
+    "Tokyo,2025-06-28,31.25,80,Rain,False,0.3,June,2025,Hot\n"
+    "Paris,2025-06-29,22.0,60,Clear,,0.9,June,2025,\n"
+)
+
+DATED_CSV = (
+    "city,timestamp,sunrise,sunset,temp_C,summary,extracted_at,is_ideal_day\n"
+    "Paris,2025-06-28,2025-06-28 05:47:00,2025-06-28 21:58:00,24.5,,"
+    "2025-06-28 12:00:00.250000,True\n"
+    "Tokyo,2025-06-28 03:00:00,2025-06-28 04:26:00,2025-06-28 19:01:00,31.25,Hot,"
+    "2025-06-28 12:00:00,\n"
+)
+
+
+class TestSchema(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.path = self.temp_dir / "weather.csv"
+        self.path.write_text(CSV, encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_read_csv_applies_compact_dtypes(self):
+        df = schema.read_csv(self.path)
+
+        self.assertIsInstance(df["city"].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(df["month"].dtype, pd.CategoricalDtype)
+        self.assertEqual(df["temp_C"].dtype, "float32")
+        self.assertEqual(df["humidity"].dtype, "float32")
+        self.assertEqual(df["is_ideal_temp"].dtype, "boolean")
+        self.assertTrue(pd.isna(df["is_ideal_temp"].iloc[2]))
+        self.assertEqual(df["comfort_score"].dtype, "float64")
+        self.assertEqual(df["year"].dtype, "Int16")
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["timestamp"]))
+
+    def test_read_csv_usecols_ignores_unknown_columns(self):
+        df = schema.read_csv(self.path, usecols=["city", "temp_C", "pressure"])
+        self.assertEqual(list(df.columns), ["city", "temp_C"])
+
+    def test_apply_schema_restores_categories_after_concat(self):
+        first = schema.read_csv(self.path)
+        second = first.copy()
+        second["city"] = second["city"].astype(str).str.upper().astype("category")
+
+        combined = schema.apply_schema(pd.concat([first, second], ignore_index=True))
+
+        self.assertIsInstance(combined["city"].dtype, pd.CategoricalDtype)
+        self.assertEqual(
+            list(combined["city"].cat.categories), ["PARIS", "Paris", "TOKYO", "Tokyo"]
+        )
+
+    def test_apply_schema_sorts_categories(self):
+        df = pd.DataFrame(
+            {"city": pd.Categorical(["Tokyo", "Paris"], categories=["Tokyo", "Paris"])}
+        )
+
+        df = schema.apply_schema(df)
+
+        self.assertEqual(list(df["city"].cat.categories), ["Paris", "Tokyo"])
+        self.assertEqual(list(df.sort_values("city")["city"]), ["Paris", "Tokyo"])
+
+    def test_written_csv_keeps_text_representation(self):
+        output = self.temp_dir / "out.csv"
+        schema.read_csv(self.path).to_csv(output, index=False)
+        df = pd.read_csv(output, dtype=str, keep_default_na=False)
+        self.assertEqual(list(df["temp_C"]), ["24.5", "31.25", "22.0"])
+        self.assertEqual(list(df["is_ideal_temp"]), ["True", "False", ""])
+
+    def test_known_layout_is_parsed_in_one_read(self):
+        path = self.temp_dir / "dated.csv"
+        path.write_text(DATED_CSV, encoding="utf-8")
+
+        with patch.object(schema.pd, "read_csv", wraps=pd.read_csv) as read_csv:
+            df = schema.read_csv(path)
+
+        self.assertEqual(read_csv.call_count, 1)
+        self.assertEqual(df["timestamp"].dtype, "datetime64[us]")
+        self.assertEqual(
+            df["extracted_at"].iloc[0], pd.Timestamp("2025-06-28 12:00:00.25")
+        )
+
+    @unittest.skipUnless(schema.pyarrow, "pyarrow is not installed")
+    def test_arrow_parser_matches_c_parser(self):
+        path = self.temp_dir / "dated.csv"
+        for content in (CSV, DATED_CSV, DATED_CSV.replace("2025-06-28,", "never,", 1)):
+            with self.subTest(content=content):
+                path.write_text(content, encoding="utf-8")
+                with patch.object(schema, "pyarrow", None):
+                    expected = schema.read_csv(path)
+                with patch.object(schema, "ARROW_MIN_BYTES", 0):
+                    pd.testing.assert_frame_equal(schema.read_csv(path), expected)
+
+    def test_unparsable_date_becomes_missing(self):
+        path = self.temp_dir / "dated.csv"
+        path.write_text(DATED_CSV.replace("2025-06-28,", "never,", 1), encoding="utf-8")
+        self.assertTrue(pd.isna(schema.read_csv(path)["timestamp"].iloc[0]))
+
+    def test_read_options_only_cover_known_columns(self):
+        options = schema.read_options(["city", "timestamp", "unknown"])
+        self.assertEqual(options["dtype"], {"city": "category"})
+        self.assertEqual(options["parse_dates"], ["timestamp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
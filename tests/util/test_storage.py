@@ -0,0 +1,363 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.utils import schema, storage
+
+CSV = (
+    "city,timestamp,temp_C,humidity,weather_main,is_ideal_temp,month,year,summary\n"
+    "Paris,2024-12-31 12:00:00,8.5,70,Clouds,False,December,2024,\n"
+    "Paris,2025-06-28 12:00:00,24.5,55,Clear,True,June,2025,\n"
+    "Tokyo,2025-06-28 12:00:00,31.25,80,Rain,False,June,2025,Hot\n"
+    "Ambanja,2025-06-29 12:00:00,29.0,60,Clear,,June,2025,\n"
+)
+
+
+class TestCsvStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.path = self.temp_dir / "weather.csv"
+        self.path.write_text(CSV, encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_read_projects_and_filters(self):
+        df = storage.CsvStorage(self.path).read(
+            columns=["timestamp", "temp_C"],
+            filters=[("city", "==", "Paris"), ("year", ">=", 2025)],
+        )
+
+        self.assertEqual(list(df.columns), ["timestamp", "temp_C"])
+        self.assertEqual(list(df["temp_C"]), [24.5])
+
+    def test_filters_in_disjunctive_normal_form(self):
+        df = storage.CsvStorage(self.path).read(
+            filters=[[("city", "==", "Tokyo")], [("temp_C", "<", 10)]]
+        )
+        self.assertEqual(list(df["city"]), ["Paris", "Tokyo"])
+
+    def test_iter_csv_yields_the_file_itself(self):
+        parts = [part.read() for part in storage.CsvStorage(self.path).iter_csv(2)]
+        self.assertEqual(parts, [CSV])
+
+    def test_get_storage_picks_backend_from_suffix(self):
+        self.assertIsInstance(storage.get_storage("a/b.csv"), storage.CsvStorage)
+        self.assertIsInstance(
+            storage.get_storage("a/b.parquet"), storage.ParquetStorage
+        )
+
+    def test_resolve_falls_back_to_csv(self):
+        self.assertEqual(storage.resolve(self.temp_dir / "weather.parquet"), self.path)
+        self.assertEqual(
+            storage.resolve(self.temp_dir / "other.parquet"),
+            self.temp_dir / "other.parquet",
+        )
+
+    def test_chunked_write_matches_single_write(self):
+        df = schema.read_csv(self.path)
+        df.loc[1, "timestamp"] = pd.Timestamp("2025-06-28 12:00:00.250")
+        expected = self.temp_dir / "expected.csv"
+        df.to_csv(expected, index=False)
+        target = storage.CsvStorage(self.temp_dir / "chunked.csv")
+
+        # Without the examples the first chunk would be written in whole seconds.
+        written = target.write_chunks(
+            [df.iloc[:1], df.iloc[1:]],
+            {"timestamp": [pd.Timestamp("2025-06-28 12:00:00.250")]},
+        )
+
+        self.assertTrue(written)
+        self.assertEqual(target.path.read_text(), expected.read_text())
+
+    def test_iter_chunks_applies_schema(self):
+        chunks = list(storage.CsvStorage(self.path).iter_chunks(3))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 1])
+        self.assertEqual(chunks[1]["temp_C"].dtype, "float32")
+        self.assertIsInstance(chunks[1]["city"].dtype, pd.CategoricalDtype)
+
+    def test_write_chunks_without_rows_writes_nothing(self):
+        target = storage.CsvStorage(self.temp_dir / "empty.csv")
+        self.assertFalse(target.write_chunks([]))
+        self.assertFalse(target.exists())
+
+    def test_copy_duplicates_the_file(self):
+        target = self.temp_dir / "weather.bak.csv"
+        storage.copy(self.path, target)
+        self.assertEqual(target.read_text(encoding="utf-8"), CSV)
+
+    def test_copy_links_and_survives_a_later_write(self):
+        target = self.temp_dir / "weather.bak.csv"
+        target.write_text("stale\n", encoding="utf-8")
+        storage.copy(self.path, target)
+        self.assertEqual(target.stat().st_ino, self.path.stat().st_ino)
+
+        df = schema.read_csv(self.path)
+        storage.CsvStorage(self.path).write(df.iloc[:1])
+
+        self.assertEqual(target.read_text(encoding="utf-8"), CSV)
+        self.assertNotEqual(target.stat().st_ino, self.path.stat().st_ino)
+        self.assertEqual(
+            sorted(path.name for path in self.temp_dir.iterdir()),
+            ["weather.bak.csv", "weather.csv"],
+        )
+
+    def test_sort_order_is_only_trusted_for_the_marked_file(self):
+        self.assertIsNone(storage.sorted_by(self.path))
+
+        storage.mark_sorted(self.path, ["city", "timestamp"])
+        self.assertEqual(storage.sorted_by(self.path), ["city", "timestamp"])
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("Lima,2025-06-30 12:00:00,18.0,75,Clouds,False,June,2025,\n")
+        self.assertIsNone(storage.sorted_by(self.path))
+
+    def test_rebuild_mark_records_the_rebuilt_file(self):
+        self.assertIsNone(storage.rebuilt(self.path))
+
+        storage.mark_rebuilt(self.path)
+        mark = storage.rebuilt(self.path)
+        self.assertEqual(mark, storage.signature(self.path))
+
+        # Appending keeps the mark: readers compare it, not the file.
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("Lima,2025-06-30 12:00:00,18.0,75,Clouds,False,June,2025,\n")
+        self.assertEqual(storage.rebuilt(self.path), mark)
+
+    def test_parquet_requires_pyarrow(self):
+        with patch.object(storage, "pyarrow", None):
+            with self.assertRaises(ImportError):
+                storage.ParquetStorage(self.temp_dir / "x.parquet").read()
+
+
+class TestSegmentStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        csv_path = self.temp_dir / "weather.csv"
+        csv_path.write_text(CSV, encoding="utf-8")
+        self.df = schema.read_csv(csv_path)
+        self.path = self.temp_dir / "weather.segments"
+        # CSV segments keep the tests independent of pyarrow.
+        patcher = patch.object(storage.SegmentStorage, "FORMAT", "csv")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def update(self, city, temp_c):
+        df = self.df[self.df["city"] == city].assign(temp_C=temp_c)
+        return schema.apply_schema(df.reset_index(drop=True))
+
+    def test_write_sorts_with_one_row_per_key(self):
+        target = storage.get_storage(self.path)
+        self.assertIsInstance(target, storage.SegmentStorage)
+
+        target.write(pd.concat([self.df, self.update("Tokyo", 30)]))
+
+        df = target.read()
+        self.assertEqual(list(df["city"]), ["Ambanja", "Paris", "Paris", "Tokyo"])
+        self.assertEqual(df["temp_C"].iloc[-1], 30)
+        self.assertEqual(target.columns(), list(self.df.columns))
+
+    def test_later_segments_override_earlier_ones(self):
+        target = storage.SegmentStorage(self.path)
+        target.write(self.df)
+        first = (self.path / "segment-000001.csv").stat().st_mtime_ns
+
+        self.assertTrue(target.append(self.update("Tokyo", 33)))
+        self.assertFalse(target.append(self.df.iloc[:0]))
+
+        manifest = target.manifest()
+        self.assertEqual(manifest["version"], 2)
+        self.assertEqual([s["rows"] for s in manifest["segments"]], [4, 1])
+        self.assertEqual((self.path / "segment-000001.csv").stat().st_mtime_ns, first)
+        df = target.read()
+        self.assertEqual(len(df), 4)
+        self.assertEqual(df.loc[df["city"] == "Tokyo", "temp_C"].item(), 33)
+        chunks = pd.concat(target.iter_chunks(2), ignore_index=True)
+        pd.testing.assert_frame_equal(schema.apply_schema(chunks), df)
+        filtered = target.read(columns=["temp_C"], filters=[("temp_C", ">", 30)])
+        self.assertEqual(list(filtered["temp_C"]), [33])
+
+    def test_readers_keep_the_version_they_opened(self):
+        target = storage.SegmentStorage(self.path)
+        target.write(self.df)
+        reader = storage.SegmentStorage(self.path)
+        before = reader.read()
+
+        target.append(self.update("Paris", 0))
+
+        pd.testing.assert_frame_equal(reader.read(), before)
+        self.assertEqual(
+            (storage.SegmentStorage(self.path).read()["temp_C"] == 0).sum(), 2
+        )
+        self.assertEqual(
+            list(storage.SegmentStorage(self.path, version=1).read()["temp_C"]),
+            list(before["temp_C"]),
+        )
+
+    def test_compaction_merges_the_tail_and_removes_old_segments(self):
+        target = storage.SegmentStorage(self.path)
+        target.write(self.df)
+        target.append(self.update("Tokyo", 1))
+        self.assertFalse(target.compact())
+
+        target.append(self.update("Tokyo", 2))
+        expected = target.read()
+        self.assertTrue(target.compact())
+        self.assertEqual([s["rows"] for s in target.manifest()["segments"]], [4, 1])
+
+        self.assertTrue(target.compact(full=True))
+        self.assertEqual([s["rows"] for s in target.manifest()["segments"]], [4])
+        pd.testing.assert_frame_equal(target.read(), expected)
+        self.assertEqual(
+            sorted(path.name for path in self.path.iterdir()),
+            [
+                "manifest-000004.json",
+                "manifest-000005.json",
+                "segment-000001.csv",
+                "segment-000004.csv",
+                "segment-000005.csv",
+            ],
+        )
+
+    def test_iter_csv_exports_the_merged_segments(self):
+        target = storage.SegmentStorage(self.path)
+        target.write(self.df)
+        target.append(self.update("Tokyo", 33))
+
+        parts = [pd.read_csv(part) for part in target.iter_csv(2)]
+
+        self.assertEqual([len(part) for part in parts], [2, 2])
+        exported = pd.concat(parts, ignore_index=True)
+        self.assertEqual(list(exported["city"]), ["Ambanja", "Paris", "Paris", "Tokyo"])
+        self.assertEqual(exported["temp_C"].iloc[-1], 33)
+
+    def test_append_rejects_other_columns(self):
+        target = storage.SegmentStorage(self.path)
+        target.write(self.df)
+        with self.assertRaises(ValueError):
+            target.append(self.df.drop(columns=["summary"]))
+
+    def test_copy_links_segments_into_a_new_version(self):
+        source = storage.SegmentStorage(self.path)
+        source.write(self.df)
+        source.append(self.update("Tokyo", 33))
+        target_path = self.temp_dir / "weather.bak.segments"
+        storage.SegmentStorage(target_path).write(self.df.iloc[:1])
+        reader = storage.SegmentStorage(target_path)
+        before = reader.read()
+
+        storage.copy(self.path, target_path)
+
+        target = storage.SegmentStorage(target_path)
+        self.assertEqual(target.manifest()["version"], 2)
+        pd.testing.assert_frame_equal(target.read(), source.read())
+        pd.testing.assert_frame_equal(reader.read(), before)
+        first = target.manifest()["segments"][0]["name"]
+        self.assertEqual(
+            (target_path / first).stat().st_ino,
+            (self.path / "segment-000001.csv").stat().st_ino,
+        )
+
+
+@unittest.skipUnless(storage.PARQUET_AVAILABLE, "pyarrow is not installed")
+class TestParquetStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        csv_path = self.temp_dir / "weather.csv"
+        csv_path.write_text(CSV, encoding="utf-8")
+        self.df = (
+            schema.read_csv(csv_path)
+            .sort_values(["city", "timestamp"])
+            .reset_index(drop=True)
+        )
+        self.path = self.temp_dir / "weather.parquet"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip_keeps_columns_and_dtypes(self):
+        for partition_cols in ([], ["city", "year"]):
+            with self.subTest(partition_cols=partition_cols):
+                target = storage.ParquetStorage(self.path, partition_cols)
+                target.write(self.df)
+                pd.testing.assert_frame_equal(target.read(), self.df)
+
+    def test_partitioned_read_prunes_by_predicate(self):
+        target = storage.ParquetStorage(self.path, ["city", "year"])
+        target.write(self.df)
+
+        self.assertTrue((self.path / "city=Paris" / "year=2025").is_dir())
+        df = target.read(
+            columns=["timestamp", "temp_C"],
+            filters=[("city", "==", "Paris"), ("year", ">=", 2025)],
+        )
+        self.assertEqual(list(df.columns), ["timestamp", "temp_C"])
+        self.assertEqual(list(df["temp_C"]), [24.5])
+
+    def test_write_replaces_previous_dataset(self):
+        target = storage.ParquetStorage(self.path, ["city"])
+        target.write(self.df)
+        target.write(self.df[self.df["city"] == "Tokyo"])
+
+        self.assertEqual(list(target.read()["city"]), ["Tokyo"])
+        self.assertFalse(self.path.with_name("weather.parquet.old").exists())
+
+    def test_copy_links_the_dataset(self):
+        target = storage.ParquetStorage(self.path, ["city"])
+        target.write(self.df)
+        backup_path = self.temp_dir / "weather.bak.parquet"
+        storage.copy(self.path, backup_path)
+
+        source_file = next(self.path.rglob("*.parquet"))
+        backup_file = backup_path / source_file.relative_to(self.path)
+        self.assertEqual(backup_file.stat().st_ino, source_file.stat().st_ino)
+
+        target.write(self.df[self.df["city"] == "Tokyo"])
+        pd.testing.assert_frame_equal(
+            storage.ParquetStorage(backup_path).read(), self.df
+        )
+
+    def test_interrupted_replace_is_recovered(self):
+        storage.ParquetStorage(self.path).write(self.df)
+        # A crash between the two renames leaves only the previous dataset.
+        self.path.rename(self.path.with_name("weather.parquet.old"))
+
+        pd.testing.assert_frame_equal(storage.ParquetStorage(self.path).read(), self.df)
+
+    def test_chunked_write_matches_single_write(self):
+        for partition_cols in ([], ["city"]):
+            with self.subTest(partition_cols=partition_cols):
+                target = storage.ParquetStorage(self.path, partition_cols)
+                target.write_chunks([self.df.iloc[:2], self.df.iloc[2:]])
+
+                pd.testing.assert_frame_equal(target.read(), self.df)
+                self.assertEqual(target.columns(), list(self.df.columns))
+
+    def test_iter_chunks_round_trip(self):
+        target = storage.ParquetStorage(self.path)
+        target.write(self.df)
+
+        chunks = list(target.iter_chunks(3))
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), self.df)
+
+    def test_iter_csv_exports_chunks_for_copy(self):
+        target = storage.ParquetStorage(self.path)
+        target.write(self.df)
+
+        parts = [pd.read_csv(part) for part in target.iter_csv(3)]
+        self.assertEqual([len(part) for part in parts], [3, 1])
+        exported = pd.concat(parts, ignore_index=True)
+        self.assertEqual(list(exported.columns), list(self.df.columns))
+        self.assertEqual(list(exported["city"]), ["Ambanja", "Paris", "Paris", "Tokyo"])
+
+
+if __name__ == "__main__":
+    unittest.main()
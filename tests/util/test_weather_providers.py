@@ -0,0 +1,287 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from src.utils.openweather_schema import decode_forecast
+from src.utils.rate_limit import CircuitBreaker, TokenBucket
+from src.utils.weather_providers.base import WeatherProvider
+from src.utils.weather_providers.hedged import HedgedProvider
+from src.utils.weather_providers.open_meteo import OpenMeteoProvider, to_openweather
+from src.utils.weather_providers.open_weather import OpenWeatherProvider
+
+START = 1750809600  # 2025-06-25 00:00:00 UTC
+
+OPEN_METEO_SAMPLE = {
+    "hourly": {
+        "time": [START + h * 3600 for h in range(6)],
+        "temperature_2m": [20.0, 21.0, 23.0, 25.0, 26.0, 24.0],
+        "apparent_temperature": [19.5, 20.5, 22.5, 25.5, 26.5, 24.5],
+        "relative_humidity_2m": [70, 68, 65, 60, 58, 62],
+        "pressure_msl": [1012.0, 1012.5, 1013.0, 1013.0, 1012.0, 1011.5],
+        "wind_speed_10m": [2.0, 2.5, 3.0, 3.5, 4.0, 3.0],
+        "wind_direction_10m": [90, 100, 110, 180, 190, 200],
+        "wind_gusts_10m": [3.0, 4.0, 5.0, 6.0, 6.0, 6.0],
+        "cloud_cover": [10, 20, 30, 80, 90, 100],
+        "precipitation_probability": [0, 10, 20, 40, 60, 50],
+        "rain": [0.0, 0.0, 0.0, 0.5, 1.0, 0.5],
+        "weather_code": [0, 1, 2, 61, 63, 61],
+    },
+    "daily": {"sunrise": [START + 3 * 3600], "sunset": [START + 15 * 3600]},
+}
+
+OPEN_WEATHER_SAMPLE = {
+    "list": [
+        {
+            "dt": START,
+            "dt_txt": "2025-06-25 00:00:00",
+            "main": {
+                "temp": 20.0,
+                "temp_min": 19.0,
+                "temp_max": 21.0,
+                "feels_like": 19.5,
+                "pressure": 1012,
+                "humidity": 70,
+            },
+            "wind": {"speed": 2.0, "deg": 90},
+            "clouds": {"all": 10},
+            "weather": [{"main": "Clear", "description": "clear sky"}],
+        }
+    ],
+    "city": {"sunrise": START + 3 * 3600, "sunset": START + 15 * 3600},
+}
+
+
+class StubServer:
+    def __init__(self, payload, status=200, delay=0.0):
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(parse_qs(urlparse(self.path).query))
+                time.sleep(delay)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/forecast"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeProvider(WeatherProvider):
+    def __init__(self, name, content=b"{}", delay=0.0, error=None):
+        self.name = name
+        self.content = content
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def fetch(self, lat, lon, units="metric"):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.content
+
+
+class QueuedProvider(FakeProvider):
+    reports_send = True
+
+    def __init__(self, name, queue_delay, delay):
+        super().__init__(name, b"primary", delay)
+        self.queue_delay = queue_delay
+
+    def fetch(self, lat, lon, units="metric"):
+        time.sleep(self.queue_delay)
+        self.sent()
+        return super().fetch(lat, lon, units)
+
+
+class TestOpenMeteoMapping(unittest.TestCase):
+    def test_maps_hourly_series_to_three_hour_openweather_entries(self):
+        data = to_openweather(OPEN_METEO_SAMPLE)
+
+        self.assertEqual(len(data["list"]), 2)
+        first, second = data["list"]
+        self.assertEqual(first["dt"], START)
+        self.assertEqual(first["dt_txt"], "2025-06-25 00:00:00")
+        self.assertEqual(first["main"]["temp_min"], 20.0)
+        self.assertEqual(first["main"]["temp_max"], 23.0)
+        self.assertAlmostEqual(first["wind"]["gust"], 4.0)
+        self.assertEqual(first["weather"][0]["main"], "Clear")
+        self.assertAlmostEqual(second["pop"], 0.6)
+        self.assertAlmostEqual(second["rain"]["3h"], 2.0)
+        self.assertEqual(second["weather"][0]["description"], "light rain")
+        self.assertEqual(data["city"]["sunrise"], START + 3 * 3600)
+
+    def test_mapped_payload_decodes_with_the_openweather_schema(self):
+        content = json.dumps(to_openweather(OPEN_METEO_SAMPLE)).encode()
+        forecast = decode_forecast(content)
+        self.assertEqual(forecast.list[1].main.humidity, 60)
+        self.assertEqual(forecast.city.sunset, START + 15 * 3600)
+
+
+class TestProvidersAgainstLocalStub(unittest.TestCase):
+    def setUp(self):
+        self.session = requests.Session()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_open_meteo_requests_metric_units_and_maps_response(self):
+        server = StubServer(OPEN_METEO_SAMPLE)
+        self.addCleanup(server.close)
+        provider = OpenMeteoProvider(self.session, base_url=server.url)
+
+        data = json.loads(provider.fetch(-18.91, 47.52))
+
+        self.assertEqual(len(data["list"]), 2)
+        params = server.requests[0]
+        self.assertEqual(params["latitude"], ["-18.91"])
+        self.assertEqual(params["wind_speed_unit"], ["ms"])
+        self.assertEqual(params["timeformat"], ["unixtime"])
+
+    def test_open_weather_returns_raw_content(self):
+        server = StubServer(OPEN_WEATHER_SAMPLE)
+        self.addCleanup(server.close)
+        provider = OpenWeatherProvider(
+            "key",
+            self.session,
+            TokenBucket(6000),
+            CircuitBreaker(),
+            base_url=server.url,
+        )
+
+        self.assertEqual(json.loads(provider.fetch(1, 2)), OPEN_WEATHER_SAMPLE)
+        self.assertEqual(provider.fetch_json(1, 2), OPEN_WEATHER_SAMPLE)
+        self.assertEqual(server.requests[0]["appid"], ["key"])
+
+    def test_open_weather_half_open_sends_a_single_trial_call(self):
+        server = StubServer({"message": "city not found"}, status=404, delay=0.2)
+        self.addCleanup(server.close)
+        now = [0.0]
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=60, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        now[0] = 61
+        provider = OpenWeatherProvider(
+            "key",
+            self.session,
+            TokenBucket(6000, capacity=8),
+            breaker,
+            base_url=server.url,
+        )
+        errors = []
+
+        def fetch():
+            try:
+                provider.fetch(1, 2)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(
+            sorted(type(e).__name__ for e in errors),
+            ["CircuitOpenError"] * 7 + ["HTTPError"],
+        )
+        # A client error is an answer: the trial call closes the breaker.
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_meteo_raises_on_http_error(self):
+        server = StubServer({"error": True}, status=400)
+        self.addCleanup(server.close)
+        provider = OpenMeteoProvider(self.session, base_url=server.url)
+
+        with self.assertRaises(requests.HTTPError):
+            provider.fetch(1, 2)
+
+
+class TestHedgedProvider(unittest.TestCase):
+    def test_fast_primary_does_not_hedge(self):
+        primary = FakeProvider("primary", b"primary")
+        secondary = FakeProvider("secondary", b"secondary")
+        hedged = HedgedProvider(primary, secondary, default_delay=1.0)
+
+        self.assertEqual(hedged.fetch(1, 2), b"primary")
+        self.assertEqual(secondary.calls, 0)
+
+    def test_slow_primary_is_hedged_and_secondary_wins(self):
+        primary = FakeProvider("primary", b"primary", delay=0.5)
+        secondary = FakeProvider("secondary", b"secondary")
+        hedged = HedgedProvider(primary, secondary, default_delay=0.05)
+
+        start = time.monotonic()
+        self.assertEqual(hedged.fetch(1, 2), b"secondary")
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_failed_primary_falls_back_to_secondary(self):
+        primary = FakeProvider("primary", error=RuntimeError("boom"))
+        secondary = FakeProvider("secondary", b"secondary")
+        hedged = HedgedProvider(primary, secondary, default_delay=1.0)
+
+        self.assertEqual(hedged.fetch(1, 2), b"secondary")
+
+    def test_raises_when_both_providers_fail(self):
+        primary = FakeProvider("primary", error=RuntimeError("primary down"))
+        secondary = FakeProvider("secondary", error=RuntimeError("secondary down"))
+        hedged = HedgedProvider(primary, secondary, default_delay=0.0)
+
+        with self.assertRaises(RuntimeError):
+            hedged.fetch(1, 2)
+
+    def test_rate_limit_wait_is_not_latency(self):
+        primary = QueuedProvider("primary", queue_delay=0.3, delay=0.01)
+        secondary = FakeProvider("secondary", b"secondary")
+        hedged = HedgedProvider(primary, secondary, default_delay=0.1)
+
+        self.assertEqual(hedged.fetch(1, 2), b"primary")
+        self.assertEqual(secondary.calls, 0)
+        self.assertLess(hedged._latencies[0], 0.1)
+
+    def test_close_shuts_the_executor_down(self):
+        hedged = HedgedProvider(FakeProvider("primary"), FakeProvider("secondary"))
+        hedged.fetch(1, 2)
+        executor = hedged._executor
+
+        hedged.close()
+
+        self.assertIsNone(hedged._executor)
+        self.assertTrue(executor._shutdown)
+        self.assertEqual(hedged.fetch(1, 2), b"{}")
+
+    def test_hedge_delay_tracks_primary_latency_percentile(self):
+        primary = FakeProvider("primary")
+        hedged = HedgedProvider(
+            primary, FakeProvider("secondary"), min_samples=3, default_delay=5.0
+        )
+        self.assertEqual(hedged.hedge_delay(), 5.0)
+
+        hedged._latencies.extend([0.1, 0.2, 0.3, 0.4])
+        self.assertAlmostEqual(hedged.hedge_delay(), 0.385)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -43,8 +43,17 @@ with DAG(
     def run_city_config():
         CityConfigStep(city_list).run()
 
-    def run_extract():
-        ExtractStep().run()
+    def run_extract(**kwargs):
+        dag_run = kwargs.get("dag_run")
+        # Extraction features are opt-in: the Variable sets them for every run,
+        # a triggered run's config for that run only.
+        options = {
+            **Variable.get(
+                "toetrandro_extract_options", default_var={}, deserialize_json=True
+            ),
+            **((dag_run.conf if dag_run else None) or {}),
+        }
+        ExtractStep.from_options(options).run()
 
     def run_merge_step(step_class, **kwargs):
         execution_date = kwargs["ds"]
@@ -0,0 +1,39 @@
+import argparse
+
+from src.core.backfill import Backfill
+from src.utils.logger import get_logger
+from workflows.scripts.base import ETLStep
+
+logger = get_logger(__name__)
+
+
+class BackfillStep(ETLStep):
+    def __init__(self, start=None, end=None, max_workers=None, force=False):
+        self.start = start
+        self.end = end
+        self.max_workers = max_workers
+        self.force = force
+
+    def run(self):
+        logger.info(f"Backfilling data/processed from {self.start} to {self.end}...")
+        backfill = Backfill(
+            start=self.start,
+            end=self.end,
+            max_workers=self.max_workers,
+            force=self.force,
+        )
+        backfill.apply()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-run Transform over a range of data/raw date partitions."
+    )
+    parser.add_argument("--start", help="first date, YYYY-MM-DD (inclusive)")
+    parser.add_argument("--end", help="last date, YYYY-MM-DD (inclusive)")
+    parser.add_argument("--workers", type=int, help="process count (default: CPUs)")
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild dates that look up to date"
+    )
+    args = parser.parse_args()
+    BackfillStep(args.start, args.end, args.workers, args.force).run()
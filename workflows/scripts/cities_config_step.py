@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from src.core.city_config import CityConfigurer
 from src.utils.logger import get_logger
 from workflows.scripts.base import ETLStep
@@ -6,11 +8,21 @@ logger = get_logger(__name__)
 
 
 class CityConfigStep(ETLStep):
-    def __init__(self, city_names):
+    GAZETTEER_PATH = (
+        Path(__file__).resolve().parents[2] / "data" / "gazetteer" / "cities500.txt"
+    )
+
+    def __init__(self, city_names, use_cache=True, gazetteer_path=GAZETTEER_PATH):
         self.city_names = city_names
+        self.use_cache = use_cache
+        self.gazetteer_path = gazetteer_path
 
     def run(self):
         logger.info("🌍 Starting city configuration step...")
-        configurer = CityConfigurer(self.city_names)
+        configurer = CityConfigurer(
+            self.city_names,
+            use_cache=self.use_cache,
+            gazetteer_path=self.gazetteer_path,
+        )
         configurer.apply()
         logger.info("✅ City configuration step completed.")
@@ -6,6 +6,59 @@ logger = get_logger(__name__)
 
 
 class ExtractStep(ETLStep):
+    # Options a DAG run can set. Everything beyond the plain OpenWeather
+    # extraction is off unless asked for.
+    OPTIONS = (
+        "max_workers",
+        "use_cache",
+        "fast_decode",
+        "forecast_horizon",
+        "log_responses",
+        "resume",
+        "retry_failed_only",
+        "hedged",
+        "grid_resolution",
+    )
+
+    def __init__(
+        self,
+        max_workers=Extract.DEFAULT_MAX_WORKERS,
+        use_cache=False,
+        fast_decode=False,
+        forecast_horizon=False,
+        log_responses=False,
+        resume=False,
+        retry_failed_only=False,
+        hedged=False,
+        grid_resolution=None,
+    ):
+        self.max_workers = max_workers
+        self.use_cache = use_cache
+        self.fast_decode = fast_decode
+        self.forecast_horizon = forecast_horizon
+        self.log_responses = log_responses
+        self.resume = resume
+        self.retry_failed_only = retry_failed_only
+        self.hedged = hedged
+        self.grid_resolution = grid_resolution
+
+    @classmethod
+    def from_options(cls, options):
+        unknown = set(options) - set(cls.OPTIONS)
+        if unknown:
+            logger.warning(f"Ignoring unknown extract options: {sorted(unknown)}")
+        return cls(**{key: options[key] for key in cls.OPTIONS if key in options})
+
     def run(self):
-        extractor = Extract()
+        extractor = Extract(
+            max_workers=self.max_workers,
+            use_cache=self.use_cache,
+            fast_decode=self.fast_decode,
+            forecast_horizon=self.forecast_horizon,
+            log_responses=self.log_responses,
+            resume=self.resume,
+            retry_failed_only=self.retry_failed_only,
+            hedged=self.hedged,
+            grid_resolution=self.grid_resolution,
+        )
         extractor.apply()
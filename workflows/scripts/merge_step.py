@@ -1,14 +1,29 @@
 from src.core.final_merge import FinalMerge
 from src.core.merge import Merge
+from src.utils import external_sort, storage
 from workflows.scripts.base import ETLStep
 
 
 class MergeStep(ETLStep):
-    def __init__(self, execution_date):
+    def __init__(self, execution_date, full_rebuild=False):
         self.execution_date = execution_date
+        self.full_rebuild = full_rebuild
 
     def run(self):
-        merger = Merge()
-        final_merge = FinalMerge()
+        merger = Merge(
+            incremental=True,
+            full_rebuild=self.full_rebuild,
+            backend=storage.DEFAULT_BACKEND,
+            max_workers=Merge.DEFAULT_MAX_WORKERS,
+            key_index=True,
+            memory_budget=external_sort.DEFAULT_MEMORY_BUDGET,
+        )
+        final_merge = FinalMerge(
+            backend="segments",
+            key_index=True,
+            memory_budget=external_sort.DEFAULT_MEMORY_BUDGET,
+            full_rebuild=self.full_rebuild,
+        )
         merger.apply()
         final_merge.apply()
+        final_merge.compact()
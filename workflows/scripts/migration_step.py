@@ -8,7 +8,7 @@ logger = get_logger(__name__)
 class MigrationStep(ETLStep):
     def __init__(self, db_config):
         self.db_config = db_config
-        self.migration = Migration(db_config)
+        self.migration = Migration(db_config, backend="segments")
 
     def run(self):
         logger.info("Starting MigrationStep...")
@@ -0,0 +1,16 @@
+from src.core.replay import Replay
+from src.utils.logger import get_logger
+from workflows.scripts.base import ETLStep
+
+logger = get_logger(__name__)
+
+
+class ReplayStep(ETLStep):
+    def __init__(self, dates=None, max_workers=None):
+        self.dates = dates
+        self.max_workers = max_workers
+
+    def run(self):
+        logger.info("Rebuilding data/raw from the raw response log...")
+        replay = Replay(dates=self.dates, max_workers=self.max_workers)
+        replay.apply()
@@ -3,6 +3,10 @@ from workflows.scripts.base import ETLStep
 
 
 class TransformStep(ETLStep):
+    def __init__(self, batch=True, single_file=False):
+        self.batch = batch
+        self.single_file = single_file
+
     def run(self):
-        transform = Transform()
+        transform = Transform(batch=self.batch, single_file=self.single_file)
         transform.apply()